@@ -0,0 +1,19 @@
+# archive_orders.py
+# 將已結案的舊訂單移到封存目錄，讓 orders 資料表只保留近期的資料（建議以排程每天執行一次）
+
+from src.app.core.config import get_settings
+from src.app.core.database import SessionLocal
+from src.app.orders.archive import archive_cutoff, archive_orders
+
+
+def archive():
+    settings = get_settings()
+    cutoff = archive_cutoff(settings.order_archive_after_months)
+    print(f"🗄️  正在封存 {cutoff:%Y-%m-%d} 以前建立、已結案的訂單...")
+    with SessionLocal() as db:
+        archived = archive_orders(db, settings.order_archive_dir, cutoff)
+    print(f"✅ 已封存 {archived} 筆訂單到 {settings.order_archive_dir}/")
+
+
+if __name__ == "__main__":
+    archive()
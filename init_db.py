@@ -1,7 +1,19 @@
 # init_db.py
 
-from src.app.core.database import engine
-from src.app.orders.models import Order  # 先 import 你要建的 model
+from sqlalchemy import text
+from src.app.core.database import engine, SessionLocal
+from src.app.orders.models import Order, OrderItem, OrderSequence, OrderEvent, OrderTombstone, PG_TRGM_EXTENSION  # 先 import 你要建的 model
+from src.app.orders.crud import backfill_order_items
+from src.app.orders.migrations import add_updated_at_column, add_total_amount_column, convert_created_at_to_utc, drop_raw_phone_trgm_index
+from src.app.orders.sequence import sync_order_sequences
+from src.app.reports.models import DailySales, DailyProductSales, DailyStatusCount
+from src.app.reports.rollup import rebuild_rollups
+from src.app.orders.archive import iter_archived_orders
+from src.app.core.config import get_settings
+from src.app.idempotency.models import IdempotencyKey
+from src.app.idempotency.migrations import add_locked_until_column
+from src.app.inventory.models import InventoryItem
+from src.app.products.models import Product, CatalogVersion
 from src.app.core.database import Base
 
 
@@ -10,6 +22,44 @@ def init():
     Base.metadata.create_all(bind=engine)
     print("✅ 資料表已建立完成！")
 
+    # 顧客搜尋的 trigram 索引需要 pg_trgm（新建 orders 資料表時會自動啟用，既有資料庫在這裡補上）
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(PG_TRGM_EXTENSION))
+
+    # create_all 不會替既有資料表補上新欄位（新索引需要這些欄位，必須先補上）
+    if add_updated_at_column(engine):
+        print("🕒 已替既有訂單補上 updated_at 欄位")
+    if add_total_amount_column(engine):
+        print("💰 已替既有訂單補上 total_amount 欄位")
+    if convert_created_at_to_utc(engine):
+        print("🕒 已將既有訂單的 created_at 轉為含時區的 UTC 時間")
+    if add_locked_until_column(engine):
+        print("🔑 已替 Idempotency-Key 補上處理租約欄位")
+    if drop_raw_phone_trgm_index(engine):
+        print("📞 已移除舊版的電話搜尋索引")
+
+    # create_all 不會替既有資料表補上新索引，逐一檢查並建立
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print("✅ 索引已建立完成！")
+
+    # 從舊版（查詢最新訂單編號）升級時，讓序號表接續既有訂單的流水號
+    with SessionLocal() as db:
+        days = sync_order_sequences(db)
+    print(f"🔢 已同步 {days} 天的訂單序號")
+
+    # 舊訂單的品項只存在 item JSON 中，拆成 order_items 明細供商品統計使用
+    with SessionLocal() as db:
+        orders = backfill_order_items(db)
+    print(f"🧾 已回填 {orders} 筆訂單的品項明細")
+
+    # 由既有訂單（含已封存的訂單）重新計算報表彙總表，之後由訂單寫入增量更新
+    with SessionLocal() as db:
+        days = rebuild_rollups(db, iter_archived_orders(get_settings().order_archive_dir))
+    print(f"📊 已重建 {days} 天的營業報表彙總")
+
 
 if __name__ == "__main__":
     init()
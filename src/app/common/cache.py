@@ -0,0 +1,251 @@
+"""
+小型食品公司庫存訂單管理系統 - 快取後端
+
+此模組提供可替換的鍵值快取：
+1. MemoryCache：行程內 LRU 快取，有存活時間（TTL）與筆數上限
+2. RedisCache：透過 Redis 協定（RESP）存取外部快取，任何相容 Redis 協定的服務都可使用
+3. NullCache：停用快取
+
+所有後端都以 bytes 存放值；快取失敗（例如 Redis 無法連線）只記錄警告並視為未命中，
+不會影響 API 的正常回應。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """快取後端介面"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """停用快取：永遠未命中"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        return None
+
+    async def delete(self, *keys: str) -> None:
+        return None
+
+    async def clear(self) -> None:
+        return None
+
+
+class MemoryCache(CacheBackend):
+    """行程內 LRU 快取
+
+    超過 maxsize 時淘汰最久未使用的項目；項目超過 ttl 秒後視為過期。
+    只在單一行程內有效，多個 worker 之間不共享（失效也不會同步），
+    多 worker 部署時應改用 RedisCache 或縮短 ttl。
+    """
+
+    def __init__(self, ttl: float = 10.0, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisError(Exception):
+    """Redis 伺服器回傳的錯誤回應"""
+
+
+class RedisCache(CacheBackend):
+    """以 Redis 協定（RESP2）存取的快取
+
+    只實作快取需要的 GET / SET PX / DEL / SCAN 指令，不需額外安裝 Redis 套件；
+    連線以簡單的連線池重複使用。
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl: float = 10.0,
+                 key_prefix: str = "tamago:", timeout: float = 0.5, pool_size: int = 10):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._pool_loop = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._safe_execute(b"GET", self._key(key))
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._safe_execute(b"SET", self._key(key), value, b"PX", str(int(self.ttl * 1000)).encode())
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._safe_execute(b"DEL", *(self._key(key) for key in keys))
+
+    async def clear(self) -> None:
+        # 只清除本系統前綴的鍵，不影響共用同一個 Redis 的其他服務
+        cursor = b"0"
+        while True:
+            reply = await self._safe_execute(b"SCAN", cursor, b"MATCH", self._key("*"), b"COUNT", b"500")
+            if not reply:
+                return
+            cursor, keys = reply
+            if keys:
+                await self._safe_execute(b"DEL", *keys)
+            if cursor == b"0":
+                return
+
+    def _key(self, key: str) -> bytes:
+        return (self.key_prefix + key).encode()
+
+    async def _safe_execute(self, *args: bytes):
+        try:
+            return await asyncio.wait_for(self.execute(*args), self.timeout)
+        except (OSError, asyncio.TimeoutError, RedisError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Redis cache unavailable ({args[0].decode()}): {e}")
+            return None
+
+    async def execute(self, *args: bytes):
+        """送出一個指令並回傳解析後的回應"""
+        reader, writer = await self._acquire()
+        try:
+            writer.write(_encode_command(*args))
+            await writer.drain()
+            reply = await _read_reply(reader)
+        except BaseException:
+            # 連線狀態不明，直接關閉不放回連線池
+            writer.close()
+            raise
+        self._release(reader, writer)
+        return reply
+
+    async def _acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        loop = asyncio.get_running_loop()
+        if self._pool_loop is not loop:
+            # 連線綁定在建立它的事件迴圈上，換了事件迴圈就不能再沿用
+            self._pool, self._pool_loop = [], loop
+        while self._pool:
+            reader, writer = self._pool.pop()
+            if not writer.is_closing():
+                return reader, writer
+
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                writer.write(_encode_command(b"AUTH", self.password.encode()))
+                await _read_reply(reader)
+            if self.db:
+                writer.write(_encode_command(b"SELECT", str(self.db).encode()))
+                await _read_reply(reader)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    def _release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if len(self._pool) < self.pool_size:
+            self._pool.append((reader, writer))
+        else:
+            writer.close()
+
+
+def _encode_command(*args: bytes) -> bytes:
+    """將指令編碼為 RESP 陣列"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    """讀取並解析一個 RESP 回應"""
+    line = await reader.readuntil(b"\r\n")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload
+    if prefix == b"-":
+        raise RedisError(payload.decode())
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"無法解析的 Redis 回應: {line!r}")
+
+
+def create_cache(backend: str, ttl: float, maxsize: int, redis_url: Optional[str] = None) -> CacheBackend:
+    """依設定建立快取後端
+
+    Args:
+        backend (str): memory、redis 或 none
+        ttl (float): 項目存活秒數
+        maxsize (int): 行程內快取的筆數上限（僅 memory）
+        redis_url (Optional[str]): Redis 連線位址（僅 redis）
+    """
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, maxsize=maxsize)
+    if backend == "redis":
+        return RedisCache(url=redis_url or "redis://localhost:6379/0", ttl=ttl)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"不支援的快取後端: {backend}")
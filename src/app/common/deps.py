@@ -1,6 +1,13 @@
-from typing import Generator
+import logging
+from typing import AsyncGenerator, Generator
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal, SessionLocal, replica_set
+from app.core.replicas import read_primary_requested
+
+logger = logging.getLogger(__name__)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -19,3 +26,71 @@ def get_db() -> Generator[Session, None, None]:
         yield db  # 將 session 提供給呼叫者使用
     finally:
         db.close()  # 確保 session 在使用完畢後被正確關閉
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依賴注入：取得一個非同步資料庫 session，請求結束自動關閉
+
+    與 get_db 相同的生命週期管理，但查詢透過 asyncpg 進行，
+    等待資料庫回應時事件迴圈可以繼續處理其他請求。
+
+    Returns:
+        AsyncGenerator[AsyncSession, None]: 非同步資料庫 session 的生成器
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """FastAPI 依賴注入：取得非同步 session factory
+
+    StreamingResponse 會在路由函數回傳之後才開始產生內容，此時 get_async_db
+    提供的 session 已經關閉；串流回應應改用這個 factory 在產生器內自行開關 session。
+
+    Returns:
+        async_sessionmaker: 非同步 session factory
+    """
+    return AsyncSessionLocal
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依賴注入：取得唯讀查詢用的非同步 session
+
+    有設定讀取副本時輪流使用副本；副本無法連線時暫停使用該副本並改試下一個，
+    最後退回主資料庫。用戶端剛寫入過（read-your-writes cookie 未過期）時直接使用主資料庫，
+    並在 session.info["read_primary"] 標記，讓呼叫端可以略過可能較舊的快取。
+
+    只能用在不寫入資料的路由。
+
+    Returns:
+        AsyncGenerator[AsyncSession, None]: 非同步資料庫 session 的生成器
+    """
+    read_primary = read_primary_requested(request.cookies)
+    for index, factory in replica_set.candidates(read_primary):
+        db = factory()
+        if index is not None:
+            try:
+                # 先取得連線確認副本可用，失敗時還能改用下一個
+                await db.connection()
+            except (DBAPIError, OSError) as e:
+                logger.warning(f"讀取副本 #{index} 無法連線，暫停使用: {e}")
+                replica_set.mark_down(index)
+                await db.close()
+                continue
+        db.info["read_primary"] = read_primary
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+
+def get_async_read_sessionmaker(request: Request) -> async_sessionmaker:
+    """FastAPI 依賴注入：取得唯讀串流查詢用的非同步 session factory
+
+    與 get_async_read_db 相同的副本選擇規則，但不預先連線確認（串流會在回應開始後才連線）。
+
+    Returns:
+        async_sessionmaker: 非同步 session factory
+    """
+    return replica_set.pick(read_primary_requested(request.cookies))
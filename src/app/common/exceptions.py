@@ -58,6 +58,14 @@ class BadRequestException(AppException):
         super().__init__(self.message)
 
 
+class ConflictException(AppException):
+    """請求與目前的資源狀態衝突（例如相同的請求仍在處理中）"""
+
+    def __init__(self, message="請求與目前狀態衝突"):
+        self.message = message
+        super().__init__(self.message)
+
+
 # ==================== 統一錯誤回應格式 ====================
 
 def create_error_response(
@@ -101,6 +109,10 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
         status_code = status.HTTP_400_BAD_REQUEST
         error_code = "BAD_REQUEST"
         logger.error(f"Bad request: {exc.message}")
+    elif isinstance(exc, ConflictException):
+        status_code = status.HTTP_409_CONFLICT
+        error_code = "CONFLICT"
+        logger.info(f"Conflict: {exc.message}")
     else:
         status_code = status.HTTP_400_BAD_REQUEST
         error_code = "BAD_REQUEST"
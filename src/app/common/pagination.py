@@ -0,0 +1,31 @@
+"""
+小型食品公司庫存訂單管理系統 - 游標分頁工具
+
+此模組提供 keyset（游標）分頁使用的不透明游標編碼：
+游標內容為「時間戳 + 主鍵」，對應資料表上的複合索引，
+下一頁直接從上一頁最後一筆之後開始掃描，成本不隨頁數增加。
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+
+from .exceptions import BadRequestException
+
+
+def encode_cursor(timestamp: datetime, key: str) -> str:
+    """將排序鍵（時間戳, 主鍵）編碼為 URL 安全的不透明游標字串"""
+    raw = json.dumps([timestamp.isoformat(), key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析 encode_cursor 產生的游標，格式錯誤時拋出 BadRequestException"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, key = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(key)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequestException(f"無效的分頁游標: {cursor}")
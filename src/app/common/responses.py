@@ -2,11 +2,20 @@
 小型食品公司庫存訂單管理系統 - 統一回應產生器
 
 此模組提供函數來建立標準化的 API 回應格式。
+
+除了回傳 dict 的 create_success_response 之外，也提供直接以 orjson 序列化為
+bytes 的快速版本：路由直接回傳 Response 時，FastAPI 不會再對內容執行
+jsonable_encoder，大量資料的列表回應可以省下大部分序列化時間。
+兩種寫法產生的 JSON 內容逐位元組相同。
 """
 
 from typing import Any, Dict, Optional
 from datetime import datetime
 
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
 
 def create_success_response(
     data: Any,
@@ -33,3 +42,55 @@ def create_success_response(
         "message": message,
         "data": data
     }
+
+
+def _orjson_default(obj: Any) -> Any:
+    """orjson 無法直接序列化的型別（例如 Pydantic 模型、Decimal）交給 jsonable_encoder 處理"""
+    return jsonable_encoder(obj)
+
+
+def create_success_json_response(
+    data: Any,
+    message: str = "請求成功",
+    status_code: int = 200,
+    timestamp: Optional[str] = None
+) -> Response:
+    """
+    建立統一格式的成功回應，並直接以 orjson 序列化為 JSON Response。
+
+    Args:
+        data (Any): 要回傳的主要資料（dict、list、datetime、Enum 等 orjson 可直接處理的型別）。
+        message (str, optional): 成功訊息。預設為 "請求成功"。
+        status_code (int, optional): HTTP 狀態碼。預設為 200。
+        timestamp (Optional[str], optional): 時間戳。預設為當前時間。
+
+    Returns:
+        Response: 內容與 create_success_response 經 FastAPI 預設編碼後相同的 JSON 回應。
+    """
+    content = orjson.dumps(create_success_response(data, message, status_code, timestamp), default=_orjson_default)
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def create_success_raw_response(
+    data_json: bytes,
+    message: str = "請求成功",
+    status_code: int = 200,
+    timestamp: Optional[str] = None
+) -> Response:
+    """
+    建立統一格式的成功回應，data 欄位直接嵌入已序列化的 JSON（例如快取內容），不再解析與重新序列化。
+
+    Args:
+        data_json (bytes): 已序列化為緊湊格式的 JSON。
+        message (str, optional): 成功訊息。預設為 "請求成功"。
+        status_code (int, optional): HTTP 狀態碼。預設為 200。
+        timestamp (Optional[str], optional): 時間戳。預設為當前時間。
+
+    Returns:
+        Response: 內容與 create_success_json_response 相同的 JSON 回應。
+    """
+    envelope = create_success_response(None, message, status_code, timestamp)
+    del envelope["data"]
+    # data 是信封的最後一個欄位，直接接在其他欄位之後
+    content = orjson.dumps(envelope)[:-1] + b',"data":' + data_json + b"}"
+    return Response(content=content, status_code=status_code, media_type="application/json")
@@ -16,6 +16,72 @@ class Settings:
         if not self.db_uri:
             raise ValueError("必須設定環境變數: SUPABASE_DB_URL")
 
+        # 讀取副本：以逗號分隔的連線字串，唯讀查詢輪流使用；未設定時所有查詢都使用主資料庫
+        self.replica_db_urls = [url.strip() for url in os.getenv("SUPABASE_REPLICA_URLS", "").split(",") if url.strip()]
+        # 副本連線失敗後暫停使用的秒數
+        self.replica_retry_seconds = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+        # 用戶端寫入後改讀主資料庫的秒數（需大於副本的複寫延遲）
+        self.read_your_writes_seconds = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+        # 連線池（每個 worker 行程、每個 engine 各自一個連線池，總連線數約為
+        # workers × 2 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)，需低於資料庫的連線上限）
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # 連線使用超過此秒數後重建，避免被資料庫或中間的連線池伺服器單方面關閉；-1 表示不限制
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        # 單一 SQL 的執行時間上限（毫秒，僅 PostgreSQL），0 表示不限制
+        self.db_statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+        if self.db_pool_size < 1:
+            raise ValueError("DB_POOL_SIZE 必須大於等於 1")
+
+        # 訂單編號配發：block 以獨立短交易預留序號區段（預設）；transaction 在訂單交易中逐筆配發（不跳號，但同一天的下單會排隊）
+        self.order_id_mode = os.getenv("ORDER_ID_MODE", "block")
+        if self.order_id_mode not in ("block", "transaction"):
+            raise ValueError("ORDER_ID_MODE 必須是 block 或 transaction")
+        # block 模式每次向資料庫預留的序號數量
+        self.order_id_block_size = int(os.getenv("ORDER_ID_BLOCK_SIZE", "20"))
+        if self.order_id_block_size < 1:
+            raise ValueError("ORDER_ID_BLOCK_SIZE 必須大於等於 1")
+
+        # 訂單快取：memory（行程內 LRU）、redis（Redis 協定）或 none（停用）
+        self.order_cache_backend = os.getenv("ORDER_CACHE_BACKEND", "memory")
+        self.order_cache_ttl = float(os.getenv("ORDER_CACHE_TTL", "10"))
+        self.order_cache_maxsize = int(os.getenv("ORDER_CACHE_MAXSIZE", "10000"))
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+        # Idempotency-Key：保存建立訂單回應的秒數，期間內相同 key 的重送直接回傳保存的回應
+        self.idempotency_ttl_seconds = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        # 處理中的請求持有 key 的秒數，超過仍未完成（例如行程中途結束）時重送可以重新處理
+        self.idempotency_lock_seconds = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+        # 清除過期 key 的間隔秒數（0 表示不在 API 行程內清除）與每批刪除的筆數
+        self.idempotency_evict_interval = float(os.getenv("IDEMPOTENCY_EVICT_INTERVAL", "300"))
+        self.idempotency_evict_batch = int(os.getenv("IDEMPOTENCY_EVICT_BATCH", "1000"))
+        if self.idempotency_evict_batch < 1:
+            raise ValueError("IDEMPOTENCY_EVICT_BATCH 必須大於等於 1")
+
+        # 訂單即時事件（SSE）：無法使用 PostgreSQL LISTEN 時的輪詢間隔秒數、每個訂閱者最多暫存的事件數
+        self.order_events_poll_interval = float(os.getenv("ORDER_EVENTS_POLL_INTERVAL", "1"))
+        self.order_events_queue_size = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "1000"))
+        # outbox 事件保留時數（用戶端斷線超過這段時間就無法補回漏掉的事件）與清除間隔秒數（0 表示不在 API 行程內清除）
+        self.order_events_retention_hours = float(os.getenv("ORDER_EVENTS_RETENTION_HOURS", "72"))
+        self.order_events_purge_interval = float(os.getenv("ORDER_EVENTS_PURGE_INTERVAL", "600"))
+
+        # 增量同步（/orders/changes）只回傳這麼多秒以前的異動，需大於寫入交易的最長執行時間
+        self.order_changes_settle_seconds = float(os.getenv("ORDER_CHANGES_SETTLE_SECONDS", "2"))
+
+        # 冷資料封存：建立超過這麼多個月、已結案的訂單移到封存目錄（每月一個壓縮檔），由 archive_orders.py 執行
+        self.order_archive_dir = os.getenv("ORDER_ARCHIVE_DIR", "archive")
+        self.order_archive_after_months = int(os.getenv("ORDER_ARCHIVE_AFTER_MONTHS", "12"))
+        if self.order_archive_after_months < 1:
+            raise ValueError("ORDER_ARCHIVE_AFTER_MONTHS 必須大於等於 1")
+
+        # 商品目錄快照：最多每隔這麼多秒確認一次目錄版本號（其他行程修改價格後，最晚這麼久才生效）
+        self.product_catalog_check_seconds = float(os.getenv("PRODUCT_CATALOG_CHECK_SECONDS", "1"))
+
+        # 慢查詢記錄：超過此毫秒數的 SQL 連同 EXPLAIN 執行計畫記錄到日誌，0 表示停用（建議只在 staging 開啟）
+        self.slow_query_log_ms = float(os.getenv("SLOW_QUERY_LOG_MS", "0"))
+
 
 # 改為在需要時才建立實例
 def get_settings() -> Settings:
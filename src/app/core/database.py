@@ -1,15 +1,207 @@
-from sqlalchemy import create_engine
+import os
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TypeDecorator
 from app.core.config import get_settings
+from app.core.metrics import instrument_engine
+from app.core.querylog import log_slow_queries
+from app.core.replicas import ReplicaSet
 
 # 取得設定實例
 settings = get_settings()
 
+
+def engine_options(db_uri: str, async_driver: bool = False) -> dict:
+    """依設定組出 create_engine 的連線池與連線參數
+
+    SQLite 使用 SQLAlchemy 預設的連線池（記憶體資料庫不支援 pool_size 等參數），
+    因此連線池設定只套用在其他資料庫；statement timeout 只支援 PostgreSQL，
+    psycopg2 與 asyncpg 傳入的方式不同。
+    """
+    options = {"pool_pre_ping": True}
+    backend = make_url(db_uri).get_backend_name()
+    if backend == "sqlite":
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if backend == "postgresql" and settings.db_statement_timeout_ms > 0:
+        timeout = str(settings.db_statement_timeout_ms)
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
 # 資料庫引擎（透過 .env 設定）
-engine = create_engine(settings.db_uri, pool_pre_ping=True)
+engine = create_engine(settings.db_uri, **engine_options(settings.db_uri))
+
+
+def enable_sqlite_foreign_keys(target_engine) -> None:
+    """SQLite 預設不檢查外鍵，開啟後 ON DELETE CASCADE 才會生效（其他資料庫不受影響）"""
+    if target_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+enable_sqlite_foreign_keys(engine)
+instrument_engine(engine, "sync")
+if settings.slow_query_log_ms > 0:
+    log_slow_queries(engine, settings.slow_query_log_ms)
 
 # 建立 session factory，每次 get_db() 都會用這個
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def to_async_uri(db_uri: str) -> str:
+    """將同步驅動的連線字串轉換為對應的非同步驅動（PostgreSQL -> asyncpg、SQLite -> aiosqlite）
+
+    asyncpg 不認得 libpq 的 `sslmode` 參數，改以同義的 `ssl` 參數傳入。
+    """
+    url = make_url(db_uri)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        if "sslmode" in url.query:
+            sslmode = url.query["sslmode"]
+            url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+# 非同步資料庫引擎：與同步引擎連到同一個資料庫，供 API 路由使用，查詢期間不會阻塞事件迴圈
+async_engine = create_async_engine(to_async_uri(settings.db_uri), **engine_options(settings.db_uri, async_driver=True))
+enable_sqlite_foreign_keys(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+if settings.slow_query_log_ms > 0:
+    log_slow_queries(async_engine.sync_engine, settings.slow_query_log_ms)
+
+# 非同步 session factory，每次 get_async_db() 都會用這個
+# commit 後不讓物件過期，避免在事件迴圈中存取屬性時觸發隱性的同步查詢
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# 讀取副本：每個副本一個非同步 engine，唯讀查詢由 replica_set 輪流分配
+replica_engines = []
+for replica_index, replica_url in enumerate(settings.replica_db_urls):
+    replica_engine = create_async_engine(to_async_uri(replica_url), **engine_options(replica_url, async_driver=True))
+    enable_sqlite_foreign_keys(replica_engine.sync_engine)
+    instrument_engine(replica_engine.sync_engine, f"replica{replica_index}")
+    if settings.slow_query_log_ms > 0:
+        log_slow_queries(replica_engine.sync_engine, settings.slow_query_log_ms)
+    replica_engines.append(replica_engine)
+
+replica_set = ReplicaSet(
+    primary=AsyncSessionLocal,
+    replicas=[async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False) for replica in replica_engines],
+    retry_after=settings.replica_retry_seconds,
+)
+
+
+def _dispose_inherited_pools() -> None:
+    """fork 出的子行程不能沿用父行程連線池中的連線（socket 會被兩個行程共用），
+    捨棄繼承來的連線池而不關閉連線，子行程第一次查詢時再建立自己的連線。
+
+    uvicorn --workers 以 spawn 啟動 worker，每個 worker 會重新匯入並建立 engine；
+    這裡是給 gunicorn --preload 等先匯入 app 再 fork 的部署方式使用。
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in replica_engines:
+        replica.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_pools)
+
 # 所有 models 要繼承這個 Base
 Base = declarative_base()
+
+
+def dialect_insert(bind, table):
+    """依資料庫方言取得支援 ON CONFLICT（upsert）的 insert 語句
+
+    PostgreSQL 與 SQLite 都支援 `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`，
+    兩者的 insert 建構函式介面相同，呼叫端只需要處理一種寫法。
+
+    Args:
+        bind: Session、Connection 或 Engine，用來判斷目前的資料庫方言
+        table: 要寫入的 model 或 Table
+
+    Returns:
+        方言專屬的 Insert 物件
+    """
+    dialect_name = bind.get_bind().dialect.name if hasattr(bind, "get_bind") else bind.dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"不支援的資料庫方言: {dialect_name}")
+    return insert(table)
+
+
+def utc_now() -> datetime:
+    """應用程式端的目前時間（UTC，帶時區），供 Python 端的欄位預設值與時間比較使用"""
+    return datetime.now(timezone.utc)
+
+
+class UTCDateTime(TypeDecorator):
+    """含時區的時間欄位（PostgreSQL 為 timestamptz），寫入前一律換算成 UTC，讀出的值一律帶時區
+
+    SQLite 不保存時區，存的是 UTC 時間，讀出時補上 UTC 時區；不含時區的輸入值視為 UTC。
+    查詢條件中與此欄位比較的值同樣會先換算，呼叫端可以直接傳入任何時區的時間。
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+
+class utcnow(FunctionElement):
+    """資料庫端的目前時間，作為 UTCDateTime 欄位的 server_default
+
+    SQLite 的 CURRENT_TIMESTAMP 只到秒、格式也與 SQLAlchemy 寫入的不同（字串比較會出錯），
+    改以 strftime 產生相同格式（微秒六位數）的 UTC 時間。
+    """
+    type = UTCDateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "now()"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
@@ -0,0 +1,268 @@
+# src/app/core/metrics.py
+"""
+請求耗時與資料庫查詢的監控指標
+
+1. MetricsMiddleware：ASGI 中介層，記錄每個路由的請求耗時、查詢次數與資料庫耗時，
+   並在回應加上 `Server-Timing` 標頭（瀏覽器開發者工具可直接顯示）
+2. instrument_engine：在 SQLAlchemy engine 上掛事件，累計查詢次數、查詢耗時與
+   連線池取得連線的等待時間
+3. render_metrics：以 Prometheus 文字格式輸出所有指標，供 `/metrics` 使用
+
+每個請求的統計存放在 contextvar 中；`AsyncSession.run_sync` 的 greenlet 會沿用
+呼叫端的 context，因此非同步路由中的查詢也會計入發出它的請求。
+
+指標存放在行程的記憶體中：以多個 worker 行程啟動時，每個行程各自累計，
+`/metrics` 只回傳處理該次請求的行程的數字。
+"""
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .querylog import check_query_budget
+
+# 預設的耗時分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每個請求的查詢次數分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# 連線池等待時間分桶（秒）
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class RequestStats:
+    """單一請求期間累計的資料庫統計"""
+
+    __slots__ = ("query_count", "db_time", "pool_wait")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """取得目前請求的統計；不在請求中（例如 init_db）時為 None"""
+    return _request_stats.get()
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不減的計數器"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """固定分桶的直方圖（Prometheus 累積分桶格式）"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [各分桶計數..., +Inf 計數], 總和
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(float(bound))}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+# ==================== 指標定義 ====================
+
+REQUESTS_TOTAL = Counter(
+    "http_requests_total", "HTTP 請求數", ("method", "route", "status"),
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP 請求耗時（秒）", ("method", "route"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "每個請求執行的 SQL 語句數", ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "每個請求累計的 SQL 執行時間（秒）", ("method", "route"),
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_seconds", "從連線池取得連線的等待時間（秒，含建立新連線）", ("engine",), POOL_WAIT_BUCKETS,
+)
+
+METRICS = [REQUESTS_TOTAL, REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_TIME, POOL_CHECKOUT_WAIT]
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文字格式輸出所有指標"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==================== 資料庫事件 ====================
+
+_instrumented_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+def instrument_engine(target_engine: Engine, name: str = "sync") -> None:
+    """在同步 engine（非同步 engine 請傳入 `async_engine.sync_engine`）上掛監控事件
+
+    查詢耗時以 before/after_cursor_execute 計算；SQLAlchemy 沒有「開始取得連線」的事件，
+    連線池等待時間改以包裝 `Engine.raw_connection` 量測（engine.dispose() 重建連線池後仍然有效）。
+    """
+    if target_engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(target_engine)
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        # 慢查詢記錄補查的 EXPLAIN 不是請求本身的查詢，不計入
+        if stats is not None and not conn.info.get("explaining"):
+            stats.query_count += 1
+            stats.db_time += time.perf_counter() - context._metrics_start
+
+    raw_connection = target_engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            waited = time.perf_counter() - start
+            POOL_CHECKOUT_WAIT.observe(waited, name)
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.pool_wait += waited
+
+    target_engine.raw_connection = timed_raw_connection
+
+
+# ==================== 中介層 ====================
+
+def _route_label(scope) -> str:
+    """以路由樣板（例如 /orders/get_order_by_id/{order_id}）當標籤，避免每個訂單編號各成一組指標"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def server_timing_header(total: float, stats: RequestStats) -> str:
+    """組成 Server-Timing 標頭值（毫秒）"""
+    return (
+        f"app;dur={total * 1000:.1f}, "
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", '
+        f"pool;dur={stats.pool_wait * 1000:.1f}"
+    )
+
+
+class MetricsMiddleware:
+    """記錄請求指標並加上 Server-Timing 標頭的 ASGI 中介層
+
+    Server-Timing 在回應開始時送出，只包含到那時為止的耗時；串流回應的總耗時與
+    串流期間的查詢仍會在回應結束時計入直方圖。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(time.perf_counter() - start, stats).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - start
+            labels = (scope["method"], _route_label(scope))
+            REQUESTS_TOTAL.inc(*labels, str(status_code))
+            REQUEST_DURATION.observe(duration, *labels)
+            REQUEST_DB_QUERIES.observe(stats.query_count, *labels)
+            REQUEST_DB_TIME.observe(stats.db_time, *labels)
+            if "route" in scope:
+                check_query_budget(scope["method"], scope["route"], stats.query_count)
+            _request_stats.reset(token)
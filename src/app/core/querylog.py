@@ -0,0 +1,148 @@
+# src/app/core/querylog.py
+"""
+查詢次數預算與慢查詢記錄
+
+1. query_budget：宣告路由每個請求最多可以執行幾條 SQL；由 `MetricsMiddleware`
+   在請求結束時檢查，超出時記錄警告並通知 collect_budget_violations() 的收集者
+   （測試以此讓超出預算的請求直接失敗，及早發現逐筆查詢的 N+1 問題）
+2. count_queries：計算區塊內送到資料庫的 SQL 語句
+3. log_slow_queries：超過門檻的語句連同 EXPLAIN 執行計畫一起記錄（供 staging 使用）
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 查詢預算 ====================
+
+class BudgetViolation(NamedTuple):
+    """超出查詢預算的請求"""
+    method: str
+    route: str
+    budget: int
+    query_count: int
+
+
+_collectors: List[List[BudgetViolation]] = []
+_collectors_lock = threading.Lock()
+
+
+def query_budget(max_queries: int) -> Callable:
+    """宣告路由每個請求最多執行的 SQL 語句數，寫在路由函式上：
+
+        @router.get("/get_order_by_id/{order_id}")
+        @query_budget(1)
+        async def get_order_by_id(...): ...
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+def get_query_budget(route) -> Optional[int]:
+    """取得路由宣告的查詢預算，未宣告時為 None"""
+    return getattr(getattr(route, "endpoint", None), "query_budget", None)
+
+
+def check_query_budget(method: str, route, query_count: int) -> Optional[BudgetViolation]:
+    """檢查請求的查詢次數是否超出路由宣告的預算，超出時記錄警告並回傳違規資料"""
+    budget = get_query_budget(route)
+    if budget is None or query_count <= budget:
+        return None
+    violation = BudgetViolation(method, route.path, budget, query_count)
+    logger.warning(f"查詢次數超出預算: {method} {route.path} 執行了 {query_count} 條 SQL（預算 {budget}）")
+    with _collectors_lock:
+        for collector in _collectors:
+            collector.append(violation)
+    return violation
+
+
+@contextmanager
+def collect_budget_violations() -> Iterator[List[BudgetViolation]]:
+    """收集區塊內所有超出查詢預算的請求"""
+    violations: List[BudgetViolation] = []
+    with _collectors_lock:
+        _collectors.append(violations)
+    try:
+        yield violations
+    finally:
+        with _collectors_lock:
+            # 以 identity 移除：內容相同的收集者也是不同的收集者
+            _collectors[:] = [collector for collector in _collectors if collector is not violations]
+
+
+# ==================== 查詢計數 ====================
+
+@contextmanager
+def count_queries(target_engine: Engine) -> Iterator[List[str]]:
+    """計算區塊內送到資料庫的 SQL 語句（不含 BEGIN/COMMIT），回傳語句列表"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(target_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target_engine, "before_cursor_execute", before_cursor_execute)
+
+
+# ==================== 慢查詢記錄 ====================
+
+# 只替這些語句取得執行計畫（DDL、交易控制等不需要）
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def _explain_prefix(dialect_name: str) -> Optional[str]:
+    if dialect_name == "postgresql":
+        return "EXPLAIN "
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return None
+
+
+def log_slow_queries(target_engine: Engine, threshold_ms: float) -> None:
+    """記錄執行時間超過 threshold_ms 的語句與其 EXPLAIN 執行計畫
+
+    EXPLAIN 不含 ANALYZE，只取得計畫而不會再執行一次語句；
+    executemany（批次寫入）與非 DML 語句只記錄耗時。
+    """
+    threshold = threshold_ms / 1000
+    explain_prefix = _explain_prefix(target_engine.dialect.name)
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_start = time.perf_counter()
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("explaining"):
+            return
+        elapsed = time.perf_counter() - context._slow_query_start
+        if elapsed < threshold:
+            return
+
+        plan = None
+        if explain_prefix and not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            conn.info["explaining"] = True
+            try:
+                rows = conn.exec_driver_sql(explain_prefix + statement, parameters).all()
+                plan = "\n".join(" ".join(str(value) for value in row) for row in rows)
+            except Exception as e:
+                plan = f"（無法取得執行計畫: {e}）"
+            finally:
+                conn.info["explaining"] = False
+        logger.warning(
+            f"慢查詢 {elapsed * 1000:.1f} ms（門檻 {threshold_ms:g} ms）: {statement}"
+            + (f"\n執行計畫:\n{plan}" if plan else "")
+        )
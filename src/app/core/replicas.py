@@ -0,0 +1,100 @@
+# src/app/core/replicas.py
+"""
+讀取副本（read replica）路由
+
+唯讀的查詢路由透過 `common.deps.get_async_read_db` 取得 session：
+1. 依序輪流（round-robin）使用健康的副本，連線失敗的副本暫停使用一段時間，
+   改用下一個副本，全部不可用時退回主資料庫
+2. 寫入一律使用主資料庫（`get_async_db`）
+3. 讀取自己的寫入（read-your-writes）：寫入請求成功後，ReadYourWritesMiddleware
+   在回應設定一個短效 cookie，該用戶端在副本追上之前的讀取都改走主資料庫
+
+未設定副本時所有讀取都使用主資料庫，行為與原本相同。
+"""
+
+import itertools
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+# 寫入後改讀主資料庫的 cookie 名稱，值為截止時間（epoch 秒）
+READ_PRIMARY_COOKIE = "tamago_read_primary_until"
+
+# 會改變資料的 HTTP 方法
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReplicaSet:
+    """主資料庫與讀取副本的 session factory 集合"""
+
+    def __init__(self, primary: async_sessionmaker, replicas: List[async_sessionmaker], retry_after: float = 30.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        # 副本索引 -> 恢復使用的時間（monotonic）
+        self._down_until = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def candidates(self, primary_only: bool = False) -> List[Tuple[Optional[int], async_sessionmaker]]:
+        """回傳這次讀取依序嘗試的 (副本索引, session factory)，最後一個一定是主資料庫（索引 None）"""
+        if primary_only or not self.replicas:
+            return [(None, self.primary)]
+        now = time.monotonic()
+        start = next(self._counter) % len(self.replicas)
+        order = [(start + offset) % len(self.replicas) for offset in range(len(self.replicas))]
+        with self._lock:
+            healthy = [index for index in order if self._down_until.get(index, 0) <= now]
+        return [(index, self.replicas[index]) for index in healthy] + [(None, self.primary)]
+
+    def pick(self, primary_only: bool = False) -> async_sessionmaker:
+        """不預先連線，直接取得這次讀取要使用的 session factory"""
+        return self.candidates(primary_only)[0][1]
+
+    def mark_down(self, index: int) -> None:
+        """副本連線失敗，retry_after 秒內不再使用"""
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+
+
+def read_primary_requested(cookies) -> bool:
+    """用戶端最近有寫入（cookie 尚未過期）時回傳 True"""
+    value = cookies.get(READ_PRIMARY_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """寫入請求成功後設定 cookie，讓同一個用戶端在 window 秒內的讀取改走主資料庫
+
+    未設定副本時不做任何事。
+    """
+
+    def __init__(self, app, replica_set: ReplicaSet, window: float = 5.0):
+        self.app = app
+        self.replica_set = replica_set
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in _WRITE_METHODS or not self.replica_set.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time() + self.window) + 1
+                cookie = f"{READ_PRIMARY_COOKIE}={until}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
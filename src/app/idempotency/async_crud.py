@@ -0,0 +1,43 @@
+# src/app/idempotency/async_crud.py
+"""
+idempotency CRUD 的非同步版本，透過 `AsyncSession.run_sync` 執行 `crud.py` 中的同名函式，
+另外提供定期清除過期 key 的背景工作
+"""
+
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from . import crud, models
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_key(
+    db: AsyncSession, key: str, request_hash: str, ttl_seconds: float, lock_seconds: float = 30.0
+) -> Optional[models.IdempotencyKey]:
+    """非同步版本的 crud.claim_key"""
+    return await db.run_sync(crud.claim_key, key, request_hash, ttl_seconds, lock_seconds)
+
+
+async def complete_key(db: AsyncSession, key: str, status_code: int, response_body: bytes) -> None:
+    """非同步版本的 crud.complete_key"""
+    await db.run_sync(crud.complete_key, key, status_code, response_body)
+
+
+async def release_key(db: AsyncSession, key: str) -> None:
+    """非同步版本的 crud.release_key"""
+    await db.run_sync(crud.release_key, key)
+
+
+async def evict_expired_keys_periodically(session_factory: async_sessionmaker, interval: float, batch_size: int) -> None:
+    """每 interval 秒分批清除一次過期的 key，直到被取消；單次失敗只記錄錯誤，不會中止背景工作"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                evicted = await db.run_sync(crud.evict_expired_keys, batch_size)
+            if evicted:
+                logger.info(f"已清除 {evicted} 筆過期的 Idempotency-Key")
+        except Exception as e:
+            logger.error(f"清除過期 Idempotency-Key 失敗: {e}")
@@ -0,0 +1,114 @@
+# src/app/idempotency/crud.py
+
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from . import models
+from ..core.database import dialect_insert, utc_now
+from ..common.exceptions import BadRequestException, ConflictException, DatabaseException
+
+
+def claim_key(
+    db: Session, key: str, request_hash: str, ttl_seconds: float, lock_seconds: float = 30.0
+) -> Optional[models.IdempotencyKey]:
+    """取得 key 的處理權。
+
+    - 成功取得（第一次使用、舊紀錄已過期，或處理中的請求超過 lock_seconds 秒的租約仍未完成）時回傳 None，
+      呼叫端應處理請求並呼叫 complete_key
+    - key 已處理完成且請求內容相同時，回傳保存的紀錄，呼叫端直接回傳保存的回應
+    - key 已用於內容不同的請求時拋出 BadRequestException
+    - 相同的請求仍在處理中時拋出 ConflictException
+
+    取得處理權只用一條 `INSERT ... ON CONFLICT DO UPDATE ... WHERE 已過期或租約到期 RETURNING`，
+    由資料庫的唯一鍵保證並發的重送只有一個會取得處理權。處理權只租借 lock_seconds 秒：
+    行程在處理途中結束、或保存回應失敗時，重送最晚在租約到期後就能重新處理，不必等到 key 過期。
+    """
+    now = utc_now()
+    try:
+        stmt = dialect_insert(db, models.IdempotencyKey).values(
+            key=key, request_hash=request_hash,
+            locked_until=now + timedelta(seconds=lock_seconds), expires_at=now + timedelta(seconds=ttl_seconds),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.IdempotencyKey.key],
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "status_code": None,
+                "response_body": None,
+                "locked_until": stmt.excluded.locked_until,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=or_(
+                models.IdempotencyKey.expires_at <= now,
+                and_(models.IdempotencyKey.status_code.is_(None), models.IdempotencyKey.locked_until <= now),
+            ),
+        ).returning(models.IdempotencyKey.key)
+        claimed = db.execute(stmt).scalar_one_or_none()
+        existing = None if claimed else db.get(models.IdempotencyKey, key)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"取得 Idempotency-Key 時發生錯誤: {e}")
+
+    if claimed:
+        return None
+    if existing is None or existing.status_code is None:
+        # existing 為 None：其他請求剛好在兩條語句之間釋放了 key，請用戶端稍後重試
+        raise ConflictException("相同 Idempotency-Key 的請求仍在處理中，請稍後再試")
+    if existing.request_hash != request_hash:
+        raise BadRequestException("Idempotency-Key 已用於內容不同的請求")
+    return existing
+
+
+def complete_key(db: Session, key: str, status_code: int, response_body: bytes) -> None:
+    """保存請求的處理結果，之後相同 key 的重送會直接回傳這個回應"""
+    try:
+        db.execute(
+            update(models.IdempotencyKey)
+            .where(models.IdempotencyKey.key == key)
+            .values(status_code=status_code, response_body=response_body)
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"保存 Idempotency-Key 回應時發生錯誤: {e}")
+
+
+def release_key(db: Session, key: str) -> None:
+    """處理失敗時釋放尚未完成的 key，讓用戶端可以用同一把 key 重試"""
+    try:
+        db.execute(
+            delete(models.IdempotencyKey)
+            .where(models.IdempotencyKey.key == key, models.IdempotencyKey.status_code.is_(None))
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"釋放 Idempotency-Key 時發生錯誤: {e}")
+
+
+def evict_expired_keys(db: Session, batch_size: int = 1000) -> int:
+    """分批刪除已過期的 key，每批 commit 一次（避免長交易與大量鎖定），回傳刪除的筆數
+
+    多個 worker 同時清除時，以 SKIP LOCKED 跳過其他 worker 正在刪除的資料列（僅 PostgreSQL）。
+    """
+    now = utc_now()
+    evicted = 0
+    try:
+        while True:
+            expired = (
+                select(models.IdempotencyKey.key)
+                .where(models.IdempotencyKey.expires_at <= now)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            deleted = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.key.in_(expired))).rowcount
+            db.commit()
+            evicted += deleted
+            if deleted < batch_size:
+                return evicted
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"清除過期 Idempotency-Key 時發生錯誤: {e}")
@@ -0,0 +1,23 @@
+# src/app/idempotency/migrations.py
+"""
+idempotency_keys 資料表的結構升級
+
+由 `init_db.py` 呼叫，檢查既有資料表並補上欄位，重複執行不會有影響。
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+
+def add_locked_until_column(target_engine: Engine) -> bool:
+    """替既有的 idempotency_keys 資料表加上 locked_until，回傳是否有變更
+
+    既有的處理中紀錄沒有租約（NULL），仍要等到 expires_at 才能重新使用。
+    """
+    columns = {column["name"] for column in inspect(target_engine).get_columns("idempotency_keys")}
+    if "locked_until" in columns:
+        return False
+    column_type = "TIMESTAMP WITH TIME ZONE" if target_engine.dialect.name == "postgresql" else "DATETIME"
+    with target_engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE idempotency_keys ADD COLUMN locked_until {column_type}"))
+    return True
@@ -0,0 +1,16 @@
+# src/app/idempotency/models.py
+
+from sqlalchemy import Column, Integer, LargeBinary, String
+from ..core.database import Base, UTCDateTime
+
+
+class IdempotencyKey(Base):
+    """Idempotency-Key 與第一次處理結果，重送的請求直接回傳保存的回應"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)                          # "<範圍>:<Idempotency-Key 標頭值>"
+    request_hash = Column(String(64), nullable=False)               # 請求內容的 SHA-256，用來拒絕同一把 key 搭配不同內容
+    status_code = Column(Integer)                                   # 回應狀態碼，None 表示仍在處理中
+    locked_until = Column(UTCDateTime)                              # 處理權的租約到期時間（UTC），處理中的請求逾時未完成時可被重送取回
+    response_body = Column(LargeBinary)                             # 回應內容
+    expires_at = Column(UTCDateTime, nullable=False, index=True)  # 過期時間（UTC），過期後可重新使用並會被批次清除
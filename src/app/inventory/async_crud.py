@@ -0,0 +1,31 @@
+# src/app/inventory/async_crud.py
+"""inventory CRUD 的非同步版本，透過 `AsyncSession.run_sync` 執行 `crud.py` 中的同名函式"""
+
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models
+
+
+async def get_stock(db: AsyncSession, product_id: str) -> models.InventoryItem:
+    """非同步版本的 crud.get_stock"""
+    return await db.run_sync(crud.get_stock, product_id)
+
+
+async def list_stock(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.InventoryItem]:
+    """非同步版本的 crud.list_stock"""
+    return await db.run_sync(crud.list_stock, skip, limit)
+
+
+async def set_stock(db: AsyncSession, product_id: str, quantity: int) -> models.InventoryItem:
+    """非同步版本的 crud.set_stock"""
+    return await db.run_sync(crud.set_stock, product_id, quantity)
+
+
+async def adjust_stock(db: AsyncSession, product_id: str, delta: int) -> models.InventoryItem:
+    """非同步版本的 crud.adjust_stock"""
+    return await db.run_sync(crud.adjust_stock, product_id, delta)
+
+
+async def delete_stock(db: AsyncSession, product_id: str) -> None:
+    """非同步版本的 crud.delete_stock"""
+    await db.run_sync(crud.delete_stock, product_id)
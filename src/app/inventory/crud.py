@@ -0,0 +1,190 @@
+# src/app/inventory/crud.py
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from . import models
+from ..core.database import dialect_insert
+from ..common.exceptions import ConflictException, DatabaseException, NotFoundException
+
+
+def get_stock(db: Session, product_id: str) -> models.InventoryItem:
+    """取得商品的庫存，未追蹤庫存的商品拋出 NotFoundException。"""
+    try:
+        stock = db.get(models.InventoryItem, product_id)
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品庫存 (ID: {product_id}) 時發生錯誤: {e}")
+    if stock is None:
+        raise NotFoundException(resource_name="Inventory", resource_id=product_id)
+    return stock
+
+
+def list_stock(db: Session, skip: int = 0, limit: int = 100) -> List[models.InventoryItem]:
+    """依商品 ID 排序列出所有追蹤中的庫存。"""
+    try:
+        return db.scalars(
+            select(models.InventoryItem).order_by(models.InventoryItem.product_id).offset(skip).limit(limit)
+        ).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢庫存清單時發生錯誤: {e}")
+
+
+def set_stock(db: Session, product_id: str, quantity: int) -> models.InventoryItem:
+    """以單一 upsert 設定商品的可售數量（盤點），尚未追蹤的商品會開始追蹤。"""
+    try:
+        stmt = dialect_insert(db, models.InventoryItem).values(product_id=product_id, quantity=quantity)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.InventoryItem.product_id],
+            set_={"quantity": stmt.excluded.quantity, "updated_at": stmt.excluded.updated_at},
+        ).returning(models.InventoryItem)
+        stock = db.scalars(stmt).one()
+        db.commit()
+        return stock
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"設定商品庫存 (ID: {product_id}) 時發生錯誤: {e}")
+
+
+def adjust_stock(db: Session, product_id: str, delta: int) -> models.InventoryItem:
+    """以單一 UPDATE ... RETURNING 原子增減商品的可售數量（進貨、報廢），扣到負數時拋出 ConflictException。"""
+    try:
+        stock = db.scalars(
+            update(models.InventoryItem)
+            .where(models.InventoryItem.product_id == product_id)
+            .values(quantity=models.InventoryItem.quantity + delta)
+            .returning(models.InventoryItem)
+        ).one_or_none()
+        if stock is None:
+            raise NotFoundException(resource_name="Inventory", resource_id=product_id)
+        db.commit()
+        return stock
+    except IntegrityError as e:
+        db.rollback()
+        if models.QUANTITY_CHECK not in str(e.orig):
+            raise DatabaseException(f"調整商品庫存 (ID: {product_id}) 時發生錯誤: {e}")
+        raise ConflictException(f"庫存不足: {product_id}")
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"調整商品庫存 (ID: {product_id}) 時發生錯誤: {e}")
+
+
+def delete_stock(db: Session, product_id: str) -> None:
+    """停止追蹤商品的庫存（之後不限量販售）。"""
+    try:
+        deleted = db.execute(
+            delete(models.InventoryItem).where(models.InventoryItem.product_id == product_id)
+        ).rowcount
+        if not deleted:
+            raise NotFoundException(resource_name="Inventory", resource_id=product_id)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"刪除商品庫存 (ID: {product_id}) 時發生錯誤: {e}")
+
+
+# ==================== 訂單保留庫存 ====================
+# 以下函式在訂單寫入的交易中呼叫，不 commit；庫存不足時回滾整個交易並拋出 ConflictException。
+
+def _quantities(items: Iterable[dict]) -> Counter:
+    """依商品合併品項數量"""
+    quantities = Counter()
+    for item in items:
+        quantities[item["product_id"]] += item["quantity"]
+    return quantities
+
+
+def apply_stock_changes(db: Session, changes: Dict[str, int]) -> None:
+    """以單一 UPDATE 原子套用多個商品的庫存增減（負數為扣除），未追蹤庫存的商品略過
+
+    語句不先查詢剩餘數量：每列的新數量直接由資料庫以 quantity + 增減量計算，
+    由 CHECK (quantity >= 0) 擋下會扣成負數的寫入，整條語句連同呼叫端的交易一起回滾。
+    並發下單時同一商品的資料列由資料庫的列鎖依序處理，不需要鎖整張表；
+    多個商品依商品 ID 順序鎖定，同時扣相同幾個商品的交易不會互相死結。
+    """
+    changes = {product_id: delta for product_id, delta in changes.items() if delta}
+    if not changes:
+        return
+    product_id = models.InventoryItem.product_id
+    locked = select(product_id).where(product_id.in_(changes)).order_by(product_id).with_for_update()
+    try:
+        db.execute(
+            update(models.InventoryItem)
+            .where(product_id.in_(locked))
+            .values(quantity=models.InventoryItem.quantity + case(changes, value=product_id))
+        )
+    except IntegrityError as e:
+        if models.QUANTITY_CHECK not in str(e.orig):
+            raise
+        db.rollback()
+        raise ConflictException(f"庫存不足: {_describe_shortage(db, changes)}")
+
+
+def _describe_shortage(db: Session, changes: Dict[str, int]) -> str:
+    """列出庫存不足的商品（只在下單失敗時查詢一次）"""
+    needed = {product_id: -delta for product_id, delta in changes.items() if delta < 0}
+    rows = db.execute(
+        select(models.InventoryItem.product_id, models.InventoryItem.quantity)
+        .where(models.InventoryItem.product_id.in_(needed))
+        .order_by(models.InventoryItem.product_id)
+    ).all()
+    db.rollback()
+    short = [f"{pid}（剩餘 {quantity}，需要 {needed[pid]}）" for pid, quantity in rows if quantity < needed[pid]]
+    # 查詢時其他交易可能已經補貨或取消，找不到不足的商品時列出所有要扣的商品
+    return "、".join(short) or "、".join(sorted(needed))
+
+
+def reserve_stock(db: Session, items: Iterable[dict]) -> None:
+    """下單時保留品項的庫存"""
+    apply_stock_changes(db, {product_id: -quantity for product_id, quantity in _quantities(items).items()})
+
+
+def reserve_available_stock(db: Session, orders: List[Iterable[dict]]) -> List[Optional[str]]:
+    """批次下單時逐筆保留庫存：庫存足夠的訂單保留，不足的訂單不保留，回傳每筆訂單的不足原因（足夠時為 None）
+
+    先依商品 ID 順序以一次 SELECT ... FOR UPDATE 鎖定並讀取相關商品的庫存，在記憶體中依輸入順序分配，
+    最後以一次 UPDATE 扣除保留的數量，語句數不隨訂單筆數增加。
+    SQLite 不支援 FOR UPDATE，並發扣到不足時由 CHECK 擋下，整批拋出 ConflictException。
+    """
+    needs = [_quantities(items) for items in orders]
+    product_ids = set().union(*needs)
+    available = {}
+    if product_ids:
+        product_id = models.InventoryItem.product_id
+        available = dict(db.execute(
+            select(product_id, models.InventoryItem.quantity)
+            .where(product_id.in_(product_ids))
+            .order_by(product_id)
+            .with_for_update()
+        ).all())
+
+    shortages = []
+    reserved = Counter()
+    for need in needs:
+        short = [
+            f"{pid}（剩餘 {available[pid]}，需要 {quantity}）"
+            for pid, quantity in sorted(need.items()) if pid in available and available[pid] < quantity
+        ]
+        if short:
+            shortages.append(f"庫存不足: {'、'.join(short)}")
+            continue
+        for pid, quantity in need.items():
+            if pid in available:
+                available[pid] -= quantity
+                reserved[pid] += quantity
+        shortages.append(None)
+    apply_stock_changes(db, {pid: -quantity for pid, quantity in reserved.items()})
+    return shortages
+
+
+def release_stock(db: Session, items: Iterable[dict]) -> None:
+    """訂單取消、退貨或刪除時歸還品項的庫存"""
+    apply_stock_changes(db, dict(_quantities(items)))
+
+
+def replace_reserved_stock(db: Session, old_items: Iterable[dict], new_items: Iterable[dict]) -> None:
+    """訂單品項被替換時，只套用新舊品項的差額"""
+    changes = _quantities(old_items)
+    changes.subtract(_quantities(new_items))
+    apply_stock_changes(db, dict(changes))
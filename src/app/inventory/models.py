@@ -0,0 +1,22 @@
+# src/app/inventory/models.py
+
+from sqlalchemy import CheckConstraint, Column, Integer, String
+from ..core.database import Base, UTCDateTime, utc_now
+
+
+# 可售數量不可為負的檢查條件名稱，庫存不足時的錯誤以此辨識
+QUANTITY_CHECK = "ck_inventory_quantity_nonnegative"
+
+
+class InventoryItem(Base):
+    """商品庫存，一個商品一列；沒有資料列的商品不追蹤庫存（不限量）"""
+    __tablename__ = "inventory"
+
+    product_id = Column(String, primary_key=True)                 # 商品 ID
+    quantity = Column(Integer, nullable=False, default=0)         # 可售數量（已扣除未取消訂單的保留量）
+    updated_at = Column(UTCDateTime, nullable=False, default=utc_now, onupdate=utc_now)  # 最後異動時間（UTC）
+
+    __table_args__ = (
+        # 扣庫存的語句不先查詢剩餘數量，由資料庫在寫入時檢查，並發的下單也不會超賣
+        CheckConstraint("quantity >= 0", name=QUANTITY_CHECK),
+    )
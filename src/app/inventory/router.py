@@ -0,0 +1,116 @@
+# src/app/inventory/router.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..common.deps import get_async_db, get_async_read_db
+from ..common.responses import create_success_json_response
+from ..core.querylog import query_budget
+from . import async_crud, schemas
+
+# 建立路由器
+router = APIRouter(
+    prefix="/inventory",
+    tags=["庫存管理"],
+    responses={
+        404: {"description": "商品未追蹤庫存"},
+        409: {"description": "庫存不足"},
+    }
+)
+
+
+def _stock_out(stock) -> dict:
+    return schemas.StockOut.model_validate(stock).model_dump()
+
+
+@router.get("")
+@query_budget(1)
+async def list_stock(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    列出所有追蹤中的商品庫存
+
+    Args:
+        skip (int, optional): 跳過的筆數. Defaults to 0.
+        limit (int, optional): 限制回傳的筆數. Defaults to 100.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        List[schemas.StockOut]: 依商品 ID 排序的庫存
+    """
+    stocks = await async_crud.list_stock(db, skip, limit)
+    return create_success_json_response([_stock_out(stock) for stock in stocks], message="成功取得庫存清單")
+
+
+@router.get("/{product_id}")
+@query_budget(1)
+async def get_stock(product_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    取得商品的可售數量
+
+    Args:
+        product_id (str): 商品 ID
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        schemas.StockOut: 商品庫存
+    """
+    stock = await async_crud.get_stock(db, product_id)
+    return create_success_json_response(_stock_out(stock), message=f"成功取得商品 {product_id} 的庫存")
+
+
+@router.put("/{product_id}")
+@query_budget(1)
+async def set_stock(product_id: str, stock: schemas.StockSet, db: AsyncSession = Depends(get_async_db)):
+    """
+    設定商品的可售數量（盤點）
+
+    尚未追蹤庫存的商品會開始追蹤，之後下單時檢查並扣除庫存。
+
+    Args:
+        product_id (str): 商品 ID
+        stock (schemas.StockSet): 可售數量
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+
+    Returns:
+        schemas.StockOut: 設定後的庫存
+    """
+    updated = await async_crud.set_stock(db, product_id, stock.quantity)
+    return create_success_json_response(_stock_out(updated), message=f"已設定商品 {product_id} 的庫存")
+
+
+@router.post("/{product_id}/adjust")
+@query_budget(1)
+async def adjust_stock(product_id: str, adjustment: schemas.StockAdjust, db: AsyncSession = Depends(get_async_db)):
+    """
+    增減商品的可售數量（進貨、報廢）
+
+    以原子的加減更新，不會覆蓋同時間下單扣除的數量；扣到負數時回傳 409。
+
+    Args:
+        product_id (str): 商品 ID
+        adjustment (schemas.StockAdjust): 增減的數量
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+
+    Returns:
+        schemas.StockOut: 調整後的庫存
+    """
+    updated = await async_crud.adjust_stock(db, product_id, adjustment.delta)
+    return create_success_json_response(_stock_out(updated), message=f"已調整商品 {product_id} 的庫存")
+
+
+@router.delete("/{product_id}")
+@query_budget(1)
+async def delete_stock(product_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    停止追蹤商品的庫存，之後下單不再檢查該商品的數量
+
+    Args:
+        product_id (str): 商品 ID
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+    """
+    await async_crud.delete_stock(db, product_id)
+    return create_success_json_response(None, message=f"已停止追蹤商品 {product_id} 的庫存")
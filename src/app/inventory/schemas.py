@@ -0,0 +1,20 @@
+# src/app/inventory/schemas.py
+
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+
+
+class StockSet(BaseModel):
+    quantity: int = Field(..., ge=0, description="可售數量")
+
+
+class StockAdjust(BaseModel):
+    delta: int = Field(..., description="增減的數量，正數為進貨，負數為報廢或盤損")
+
+
+class StockOut(BaseModel):
+    product_id: str = Field(..., description="商品 ID")
+    quantity: int = Field(..., description="可售數量")
+    updated_at: datetime = Field(..., description="最後異動時間")
+
+    model_config = ConfigDict(from_attributes=True)
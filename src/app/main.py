@@ -1,10 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 # 匯入路由器 - 使用相對導入
 from app.orders import router as orders_router
+from app.inventory import router as inventory_router
+from app.products import router as products_router
+from app.reports import router as reports_router
 from app.common.exceptions import app_exception_handler, AppException
+from app.core.database import AsyncSessionLocal, replica_set, settings
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.replicas import ReadYourWritesMiddleware
+from app.idempotency.async_crud import evict_expired_keys_periodically
+from app.orders.events import purge_order_events_periodically
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """啟動時開始背景清除工作（過期的 Idempotency-Key、舊的訂單事件），關閉時停止"""
+    tasks = []
+    if settings.idempotency_evict_interval > 0:
+        tasks.append(asyncio.create_task(evict_expired_keys_periodically(
+            AsyncSessionLocal, settings.idempotency_evict_interval, settings.idempotency_evict_batch,
+        )))
+    if settings.order_events_purge_interval > 0:
+        tasks.append(asyncio.create_task(purge_order_events_periodically(
+            AsyncSessionLocal, settings.order_events_purge_interval, settings.order_events_retention_hours,
+        )))
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
 
 # 建立 FastAPI 應用程式實例
 app = FastAPI(
@@ -12,7 +44,9 @@ app = FastAPI(
     description="提供庫存、訂單等管理功能的 API 系統",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI 文件路徑
-    redoc_url="/redoc"  # ReDoc 文件路徑
+    redoc_url="/redoc",  # ReDoc 文件路徑
+    default_response_class=ORJSONResponse,  # 以 orjson 序列化回應
+    lifespan=lifespan
 )
 
 # 設定 CORS（跨域請求）
@@ -24,11 +58,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 寫入後短時間內讓同一個用戶端改讀主資料庫（未設定讀取副本時不作用）
+app.add_middleware(ReadYourWritesMiddleware, replica_set=replica_set, window=settings.read_your_writes_seconds)
+
+# 請求耗時與資料庫查詢監控（最後加入的中介層在最外層，耗時包含 CORS 等其他中介層）
+app.add_middleware(MetricsMiddleware)
+
 # 註冊例外處理器
 app.add_exception_handler(AppException, app_exception_handler)
 
 # 註冊路由器
 app.include_router(orders_router.router)
+app.include_router(inventory_router.router)
+app.include_router(products_router.router)
+app.include_router(reports_router.router)
 
 # 基本的測試類別（保留原有的）
 
@@ -54,3 +97,13 @@ async def root():
         "status": "healthy",
         "docs": "/docs"
     }
+
+
+@app.get("/metrics", tags=["系統"], include_in_schema=False)
+async def metrics():
+    """
+    Prometheus 監控指標
+
+    回傳各路由的請求耗時、查詢次數、資料庫耗時與連線池等待時間（僅限處理這個請求的 worker 行程）
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,183 @@
+# src/app/orders/archive.py
+"""
+已結案舊訂單的冷資料封存
+
+orders 資料表只保留近期與尚未結案的訂單：建立時間早於保留月數、且已結案
+（ARCHIVABLE_STATUSES）的訂單，依建立月份寫入封存檔後從資料庫刪除（品項明細由
+ON DELETE CASCADE 一併刪除），讓日期篩選與游標分頁掃描的資料量不再隨時間成長。
+
+- 每批的每個月份（依台灣時間）寫成一個不再修改的分段檔 `orders-YYYY-MM-<第一筆訂單 ID>-<亂數>.json.gz`，
+  同一個月份的所有分段檔相當於該月的冷資料分區；內容依欄位存放（每個欄位一個陣列）再以 gzip 壓縮，
+  重複值多的欄位壓縮率高
+- 分段檔寫入後不再讀取或改寫：同時執行的封存工作各寫各的檔案，不會互相覆蓋，
+  每批的成本也只與批次大小有關
+- 先寫檔（寫入暫存檔後改名）再刪除資料列；刪除失敗時下次重跑會再寫一次，
+  讀取時以訂單 ID 去除重複
+- 報表彙總表（reports）不受封存影響，/reports 仍涵蓋封存的月份；
+  重建彙總表時以 iter_archived_orders() 把封存的訂單一併計入
+- 封存不是刪除：不寫入 outbox 事件與刪除紀錄，也不歸還庫存（已結案的訂單早已處理完畢）；
+  但每批 commit 後讓封存訂單的讀取快取失效，封存後不會再讀到舊的快取
+"""
+
+import gzip
+import os
+import secrets
+import tempfile
+from collections import defaultdict
+from contextlib import suppress
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import mark_orders_changed
+from .enums import ARCHIVABLE_STATUSES
+from ..common.exceptions import DatabaseException
+from ..reports.rollup import BUSINESS_TZ, business_day, business_day_start
+
+# 封存檔格式識別，日後欄位有變動時遞增版本
+ARCHIVE_FORMAT = "orders-archive/2"
+# 第 1 版沒有 total_amount，讀取時由品項計算
+LEGACY_ARCHIVE_FORMAT = "orders-archive/1"
+# 封存的欄位（依序）
+COLUMNS = (
+    "id", "customer_name", "phone", "email", "item", "total_amount",
+    "created_at", "updated_at", "status", "payment_status",
+)
+
+
+def archive_cutoff(months: int, now: datetime = None) -> datetime:
+    """回傳封存的截止時間：往前 months 個月的那個月一日零時（台灣時間）
+
+    只封存完整的月份，同一個月份的訂單不會一部分在資料庫、一部分在封存檔。
+    """
+    today = business_day(now)
+    index = today.year * 12 + today.month - 1 - months
+    return business_day_start(date(index // 12, index % 12 + 1, 1))
+
+
+def _month_of(path: Path) -> str:
+    """由分段檔名 orders-YYYY-MM-....json.gz 取出月份"""
+    return path.name[len("orders-"):len("orders-YYYY-MM")]
+
+
+def archive_parts(directory, month: str = None) -> List[Path]:
+    """目錄中的封存分段檔（依檔名排序），指定 month（YYYY-MM）時只列出該月份"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"orders-{month or '*'}-*.json.gz"))
+
+
+def _order_row(order: models.Order) -> dict:
+    return {
+        "id": order.id,
+        "customer_name": order.customer_name,
+        "phone": order.phone,
+        "email": order.email,
+        "item": order.item,
+        "total_amount": order.total_amount,
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+        "status": order.status.value,
+        "payment_status": order.payment_status.value,
+    }
+
+
+def read_archive(path) -> List[dict]:
+    """讀取一個封存分段檔，回傳依建立時間排序的訂單 dict（時間為 ISO 8601 字串）"""
+    data = orjson.loads(gzip.decompress(Path(path).read_bytes()))
+    columns = data["columns"]
+    if data.get("format") == LEGACY_ARCHIVE_FORMAT:
+        columns["total_amount"] = [
+            sum(item["quantity"] * item["price"] for item in items) for items in columns["item"]
+        ]
+    elif data.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"不支援的封存檔格式: {path}")
+    return [dict(zip(COLUMNS, values)) for values in zip(*(columns[column] for column in COLUMNS))]
+
+
+def read_month(directory, month: str) -> List[dict]:
+    """讀取月份（YYYY-MM）的所有分段檔，以訂單 ID 去除重複後依建立時間排序"""
+    merged: Dict[str, dict] = {}
+    for path in archive_parts(directory, month):
+        merged.update((row["id"], row) for row in read_archive(path))
+    return sorted(merged.values(), key=lambda row: (row["created_at"], row["id"]))
+
+
+def iter_archived_orders(directory) -> Iterator[dict]:
+    """依月份順序逐筆讀出目錄中所有封存的訂單（一次只載入一個月份）；目錄不存在時不產生任何資料"""
+    for month in sorted({_month_of(path) for path in archive_parts(directory)}):
+        yield from read_month(directory, month)
+
+
+def _write_part(directory, month: str, rows: List[dict]) -> Path:
+    """將一批訂單寫成新的分段檔（不覆蓋任何既有檔案），回傳檔案路徑"""
+    content = gzip.compress(orjson.dumps({
+        "format": ARCHIVE_FORMAT,
+        "month": month,
+        "columns": {column: [row[column] for row in rows] for column in COLUMNS},
+    }))
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"orders-{month}-{rows[0]['id']}-{secrets.token_hex(4)}.json.gz"
+    # 暫存檔名以 . 開頭，不會被 archive_parts 讀到寫到一半的內容
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".orders-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temporary)
+        raise
+    return path
+
+
+def archive_orders(db: Session, directory, cutoff: datetime, batch_size: int = 1000) -> int:
+    """分批將 cutoff 以前建立、已結案的訂單寫入封存檔並從資料庫刪除，每批 commit 一次，回傳封存的筆數
+
+    多個封存工作同時執行時，以 SKIP LOCKED 跳過其他工作正在處理的訂單（僅 PostgreSQL）；
+    即使兩個工作處理到同一筆訂單（例如 SQLite），各自寫入獨立的分段檔，讀取時去除重複，不會遺失資料。
+    """
+    archived = 0
+    try:
+        while True:
+            orders = db.scalars(
+                select(models.Order)
+                .where(models.Order.created_at < cutoff, models.Order.status.in_(ARCHIVABLE_STATUSES))
+                .order_by(models.Order.created_at, models.Order.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not orders:
+                return archived
+
+            by_month = defaultdict(list)
+            for order in orders:
+                by_month[order.created_at.astimezone(BUSINESS_TZ).strftime("%Y-%m")].append(_order_row(order))
+            for month, rows in by_month.items():
+                _write_part(directory, month, rows)
+
+            order_ids = [order.id for order in orders]
+            db.execute(delete(models.Order).where(models.Order.id.in_(order_ids)))
+            mark_orders_changed(db, order_ids)
+            db.commit()
+            db.expunge_all()
+            archived += len(orders)
+            if len(orders) < batch_size:
+                return archived
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"封存舊訂單時發生錯誤: {e}")
+    except OSError:
+        db.rollback()
+        raise
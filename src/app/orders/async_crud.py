@@ -0,0 +1,158 @@
+# src/app/orders/async_crud.py
+"""
+orders CRUD 的非同步版本
+
+每個函式都對應 `crud.py` 中的同名函式，透過 `AsyncSession.run_sync` 執行：
+查詢邏輯與例外處理只維護在 `crud.py` 一份，實際的資料庫 I/O 則由 asyncpg
+非同步完成，等待資料庫時不會阻塞事件迴圈。
+
+寫入函式在 run_sync 結束後讓 crud 記下的異動訂單的讀取快取失效（見 `cache.py`）。
+
+例外：串流匯出需要逐批把資料交給呼叫端，無法包在 run_sync 中，
+因此直接以 `AsyncSession.stream` 讀取伺服器端游標。
+"""
+
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from . import crud, models, schemas, enums
+from .cache import cache_order, get_cached_order, invalidate_committed_orders
+from ..common.exceptions import DatabaseException
+
+
+async def get_order_by_id(db: AsyncSession, order_id: str) -> models.Order:
+    """非同步版本的 crud.get_order_by_id"""
+    return await db.run_sync(crud.get_order_by_id, order_id)
+
+
+async def get_order_json(db: AsyncSession, order_id: str) -> bytes:
+    """取得訂單序列化後的 JSON：先查快取，未命中才查資料庫並寫回快取
+
+    用戶端剛寫入過（session 為 get_async_read_db 標記的 read_primary）時略過快取，
+    直接讀主資料庫並更新快取，避免讀到從副本填入的舊資料。
+    """
+    payload = None if db.info.get("read_primary") else await get_cached_order(order_id)
+    if payload is None:
+        payload = await cache_order(await get_order_by_id(db, order_id))
+    return payload
+
+
+async def get_all_orders(
+    db: AsyncSession,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100,
+    columns: Optional[Sequence[str]] = None,
+) -> list:
+    """非同步版本的 crud.get_all_orders"""
+    return await db.run_sync(crud.get_all_orders, date_start, date_end, skip, limit, columns)
+
+
+async def get_orders_page(
+    db: AsyncSession,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    columns: Optional[Sequence[str]] = None,
+) -> Tuple[list, Optional[str]]:
+    """非同步版本的 crud.get_orders_page"""
+    return await db.run_sync(crud.get_orders_page, date_start, date_end, cursor, limit, columns)
+
+
+async def get_changes(
+    db: AsyncSession,
+    since: Optional[str] = None,
+    limit: int = 500,
+    settle_seconds: float = 2.0,
+) -> Tuple[List[models.Order], List[str], Optional[str], bool]:
+    """非同步版本的 crud.get_changes"""
+    return await db.run_sync(crud.get_changes, since, limit, settle_seconds)
+
+
+async def search_orders(db: AsyncSession, q: str, field: enums.SearchField = enums.SearchField.ALL, limit: int = 50) -> List[models.Order]:
+    """非同步版本的 crud.search_orders"""
+    return await db.run_sync(crud.search_orders, q, field, limit)
+
+
+async def stream_orders_for_export(
+    db: AsyncSession,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[Row]:
+    """以伺服器端游標逐批讀取匯出用的訂單資料列，記憶體用量只與 batch_size 有關"""
+    query = crud.build_export_query(date_start, date_end).execution_options(yield_per=batch_size)
+    try:
+        result = await db.stream(query)
+        async for row in result:
+            yield row
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"匯出訂單時發生錯誤: {e}")
+
+
+async def create_order(db: AsyncSession, order: schemas.OrderCreate, order_id: str) -> models.Order:
+    """非同步版本的 crud.create_order"""
+    return await db.run_sync(crud.create_order, order, order_id)
+
+
+async def bulk_create_orders(
+    db: AsyncSession, orders: List[schemas.OrderCreate], order_ids: List[str]
+) -> Tuple[List[models.Order], Dict[int, str]]:
+    """非同步版本的 crud.bulk_create_orders"""
+    return await db.run_sync(crud.bulk_create_orders, orders, order_ids)
+
+
+async def update_order_by_id(db: AsyncSession, order_id: str, update_data: schemas.OrderCreate) -> models.Order:
+    """非同步版本的 crud.update_order_by_id"""
+    order = await db.run_sync(crud.update_order_by_id, order_id, update_data)
+    await invalidate_committed_orders(db)
+    return order
+
+
+async def update_order_status(db: AsyncSession, order_id: str, status: enums.OrderStatus) -> models.Order:
+    """非同步版本的 crud.update_order_status"""
+    order = await db.run_sync(crud.update_order_status, order_id, status)
+    await invalidate_committed_orders(db)
+    return order
+
+
+async def update_payment_status(db: AsyncSession, order_id: str, payment_status: enums.PaymentStatus) -> models.Order:
+    """非同步版本的 crud.update_payment_status"""
+    order = await db.run_sync(crud.update_payment_status, order_id, payment_status)
+    await invalidate_committed_orders(db)
+    return order
+
+
+async def bulk_update_order_status(db: AsyncSession, order_ids: List[str], status: enums.OrderStatus) -> Tuple[List[models.Order], List[schemas.SkippedOrder]]:
+    """非同步版本的 crud.bulk_update_order_status"""
+    updated, skipped = await db.run_sync(crud.bulk_update_order_status, order_ids, status)
+    await invalidate_committed_orders(db)
+    return updated, skipped
+
+
+async def bulk_update_payment_status(db: AsyncSession, order_ids: List[str], payment_status: enums.PaymentStatus) -> Tuple[List[models.Order], List[schemas.SkippedOrder]]:
+    """非同步版本的 crud.bulk_update_payment_status"""
+    updated, skipped = await db.run_sync(crud.bulk_update_payment_status, order_ids, payment_status)
+    await invalidate_committed_orders(db)
+    return updated, skipped
+
+
+async def delete_order_by_id(db: AsyncSession, order_id: str) -> models.Order:
+    """非同步版本的 crud.delete_order_by_id"""
+    order = await db.run_sync(crud.delete_order_by_id, order_id)
+    await invalidate_committed_orders(db)
+    return order
+
+
+async def get_product_sales(
+    db: AsyncSession,
+    product_id: Optional[str] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+) -> List[Row]:
+    """非同步版本的 crud.get_product_sales"""
+    return await db.run_sync(crud.get_product_sales, product_id, date_start, date_end)
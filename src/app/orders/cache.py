@@ -0,0 +1,90 @@
+# src/app/orders/cache.py
+"""
+訂單讀取快取
+
+以訂單編號為鍵，快取訂單序列化後的 JSON（與 `schemas.OrderOut` 輸出相同）：
+讀取時先查快取，未命中才查資料庫並寫回。
+
+寫入路徑（`crud` 的更新、狀態、付款狀態、刪除，以及 `archive.archive_orders`）在交易中以
+mark_orders_changed 記下異動的訂單，交易 commit 後才讓快取失效（rollback 時捨棄）：
+- 沒有事件迴圈的同步呼叫端（封存工作、腳本）在 commit 時直接讓快取失效
+- 非同步請求中（`async_crud` 透過 run_sync 執行 crud）不能在 commit 時等待快取，
+  改由 `async_crud` 在 run_sync 結束後呼叫 invalidate_committed_orders
+"""
+
+import asyncio
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import models
+from .serializers import order_to_json
+from ..common.cache import create_cache
+from ..core.config import get_settings
+
+settings = get_settings()
+
+# 全域共用的訂單快取後端（依 ORDER_CACHE_BACKEND 設定）
+order_cache = create_cache(
+    settings.order_cache_backend,
+    ttl=settings.order_cache_ttl,
+    maxsize=settings.order_cache_maxsize,
+    redis_url=settings.redis_url,
+)
+
+
+def _key(order_id: str) -> str:
+    return f"order:{order_id}"
+
+
+async def get_cached_order(order_id: str) -> Optional[bytes]:
+    """從快取取得訂單的 JSON，未命中時回傳 None"""
+    return await order_cache.get(_key(order_id))
+
+
+async def cache_order(order: models.Order) -> bytes:
+    """將訂單序列化為 JSON 寫入快取，並回傳該 JSON（可直接嵌入 API 回應的 data 欄位）"""
+    payload = order_to_json(order)
+    await order_cache.set(_key(order.id), payload)
+    return payload
+
+
+async def invalidate_orders(*order_ids: str) -> None:
+    """讓指定訂單的快取失效"""
+    await order_cache.delete(*(_key(order_id) for order_id in order_ids))
+
+
+# session.info 中的鍵：交易中異動的訂單、已 commit 但尚未讓快取失效的訂單
+_CHANGED = "orders_changed"
+_COMMITTED = "orders_committed"
+
+
+def mark_orders_changed(db: Session, order_ids) -> None:
+    """記下交易中異動的訂單，commit 後讓它們的快取失效"""
+    db.info.setdefault(_CHANGED, set()).update(order_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    order_ids = session.info.pop(_CHANGED, None)
+    if not order_ids:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(invalidate_orders(*order_ids))
+        return
+    session.info.setdefault(_COMMITTED, set()).update(order_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+async def invalidate_committed_orders(db) -> None:
+    """讓 session 中已 commit 的異動訂單的快取失效（非同步請求在寫入後呼叫）"""
+    order_ids = db.info.pop(_COMMITTED, None)
+    if order_ids:
+        await invalidate_orders(*order_ids)
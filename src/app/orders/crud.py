@@ -1,11 +1,34 @@
 # src/app/orders/crud.py
 
-from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, Select, bindparam, delete, exists, func, insert, or_, select, tuple_, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime
 from . import models, schemas, enums
-from ..common.exceptions import NotFoundException, DatabaseException
+from .cache import mark_orders_changed
+from ..common.exceptions import BadRequestException, NotFoundException, DatabaseException
+from ..common.pagination import encode_cursor, decode_cursor
+from ..core.database import dialect_insert, utc_now
+from ..inventory import crud as inventory
+from ..reports import rollup
+from .outbox import record_order_events
+
+
+def created_between(date_start: Optional[date] = None, date_end: Optional[date] = None) -> list:
+    """將營業日區間（含頭尾，台灣時間）轉為 created_at 的篩選條件
+
+    條件為半開區間 [起日 00:00, 迄日隔天 00:00)，迄日當天的訂單全部包含在內，
+    並可直接在 ix_orders_created_at_id 索引上做範圍掃描。
+    """
+    if date_start and date_end and date_start > date_end:
+        raise BadRequestException(f"起始日期 {date_start} 晚於結束日期 {date_end}")
+    conditions = []
+    if date_start:
+        conditions.append(models.Order.created_at >= rollup.business_day_start(date_start))
+    if date_end:
+        conditions.append(models.Order.created_at < rollup.business_day_start(date_end + timedelta(days=1)))
+    return conditions
 
 
 def get_order_by_id(db: Session, order_id: int) -> models.Order:
@@ -21,25 +44,210 @@ def get_order_by_id(db: Session, order_id: int) -> models.Order:
         raise DatabaseException(f"查詢訂單資料 (ID: {order_id}) 時發生錯誤")
 
 
+def order_total(items: List[dict]) -> int:
+    """計算品項的總額（數量 × 單價的合計）"""
+    return sum(item["quantity"] * item["price"] for item in items)
+
+
+def _select_orders(columns: Optional[Sequence[str]]) -> Select:
+    """未指定欄位時查詢完整的 Order 物件，否則只 SELECT 指定的欄位"""
+    if columns is None:
+        return select(models.Order)
+    return select(*(getattr(models.Order, column) for column in columns))
+
+
+def _fetch_orders(db: Session, query: Select, columns: Optional[Sequence[str]]) -> list:
+    return db.scalars(query).all() if columns is None else db.execute(query).all()
+
+
 def get_all_orders(
     db: Session,
-    date_start: Optional[str] = None,
-    date_end: Optional[str] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
-) -> List[models.Order]:
-    """從 Order 資料表中篩選並導出訂單清單，可依照建立時間過濾、並支援分頁查詢。"""
+    columns: Optional[Sequence[str]] = None,
+) -> list:
+    """從 Order 資料表中篩選並導出訂單清單，可依照建立時間過濾、並支援分頁查詢。
+
+    指定 columns 時只 SELECT 這些欄位，回傳資料列（Row）而不是 Order 物件。
+    """
     try:
-        query = db.query(models.Order)
-        if date_start:
-            query = query.filter(models.Order.created_at >= date_start)
-        if date_end:
-            query = query.filter(models.Order.created_at <= date_end)
-        return query.offset(skip).limit(limit).all()
+        query = _select_orders(columns).where(*created_between(date_start, date_end))
+        return _fetch_orders(db, query.offset(skip).limit(limit), columns)
     except SQLAlchemyError as e:
         raise DatabaseException(f"查詢所有訂單時發生錯誤: {e}")
 
 
+def get_orders_page(
+    db: Session,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    columns: Optional[Sequence[str]] = None,
+) -> Tuple[list, Optional[str]]:
+    """以 (created_at, id) 游標分頁查詢訂單（新到舊），回傳該頁訂單與下一頁游標（沒有下一頁時為 None）。
+
+    每頁都從游標位置沿著 ix_orders_created_at_id 索引往下掃描 limit 筆，
+    不論翻到第幾頁成本都相同，分頁期間新增的訂單也不會造成資料重複或遺漏。
+    指定 columns 時只 SELECT 這些欄位（另外加上游標需要的 created_at 與 id），回傳資料列（Row）。
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys([*columns, "created_at", "id"]))
+    query = _select_orders(columns).where(*created_between(date_start, date_end))
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.Order.created_at, models.Order.id) < (created_at, order_id))
+    try:
+        # 多取一筆用來判斷是否還有下一頁
+        orders = _fetch_orders(
+            db, query.order_by(models.Order.created_at.desc(), models.Order.id.desc()).limit(limit + 1), columns
+        )
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"分頁查詢訂單時發生錯誤: {e}")
+
+    if len(orders) <= limit:
+        return orders, None
+    orders = orders[:limit]
+    return orders, encode_cursor(orders[-1].created_at, orders[-1].id)
+
+
+def get_changes(
+    db: Session,
+    since: Optional[str] = None,
+    limit: int = 500,
+    settle_seconds: float = 2.0,
+) -> Tuple[List[models.Order], List[str], Optional[str], bool]:
+    """增量同步：依 (異動時間, 訂單 ID) 順序取得游標之後異動或刪除的訂單。
+
+    訂單沿著 ix_orders_updated_at_id、刪除紀錄沿著 ix_order_tombstones_deleted_at_order_id
+    各自從游標位置往後掃描，再依相同順序合併成一頁，兩者共用同一個游標。
+    異動時間在寫入當下決定、commit 後才看得到，因此只回傳 settle_seconds 秒以前的異動，
+    避免較早開始但較晚 commit 的交易落在已經回傳過的游標之前而被漏掉。
+
+    Args:
+        since (Optional[str]): 上次回傳的 next_cursor，未提供時從頭開始（初次完整同步）
+        limit (int): 每頁最多筆數（訂單加刪除紀錄）
+        settle_seconds (float): 只回傳這麼多秒以前的異動
+
+    Returns:
+        (異動的訂單, 被刪除的訂單 ID, 下一次請求使用的游標（沒有新異動時與 since 相同）, 是否還有下一頁)
+    """
+    horizon = utc_now() - timedelta(seconds=settle_seconds)
+    order_query = select(models.Order).where(models.Order.updated_at <= horizon)
+    tombstone_query = select(models.OrderTombstone).where(models.OrderTombstone.deleted_at <= horizon)
+    if since:
+        changed_at, order_id = decode_cursor(since)
+        if changed_at.tzinfo is None:
+            changed_at = changed_at.replace(tzinfo=timezone.utc)
+        order_query = order_query.where(tuple_(models.Order.updated_at, models.Order.id) > (changed_at, order_id))
+        tombstone_query = tombstone_query.where(
+            tuple_(models.OrderTombstone.deleted_at, models.OrderTombstone.order_id) > (changed_at, order_id)
+        )
+    try:
+        # 各多取一筆用來判斷是否還有下一頁
+        orders = db.scalars(order_query.order_by(models.Order.updated_at, models.Order.id).limit(limit + 1)).all()
+        tombstones = db.scalars(
+            tombstone_query.order_by(models.OrderTombstone.deleted_at, models.OrderTombstone.order_id).limit(limit + 1)
+        ).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢訂單異動時發生錯誤: {e}")
+
+    changes = sorted(
+        [(_as_utc(order.updated_at), order.id, order) for order in orders]
+        + [(_as_utc(tombstone.deleted_at), tombstone.order_id, None) for tombstone in tombstones],
+        key=lambda change: change[:2],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return [], [], since, False
+    changed_at, order_id, _ = changes[-1]
+    return (
+        [order for _, _, order in changes if order is not None],
+        [order_id for _, order_id, order in changes if order is None],
+        encode_cursor(changed_at, order_id),
+        has_more,
+    )
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """SQLite 讀回的時間不含時區（存入時已是 UTC），補上時區以便與 PostgreSQL 的結果一致比較"""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+# pg_trgm 以 3 個字為單位建立索引，短於此長度的搜尋字串取不出三連字，改為前綴比對
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _escape_like(term: str) -> str:
+    """跳脫 LIKE 的萬用字元，讓使用者輸入的 % 與 _ 依字面比對"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_pattern(term: str) -> str:
+    """將使用者輸入轉成子字串比對的 LIKE 樣式，跳脫 LIKE 的萬用字元"""
+    return f"%{_escape_like(term)}%"
+
+
+def _match_condition(expression, term: str, lowercase: bool):
+    """搜尋字串的比對條件：3 個字以上為子字串比對（trigram 索引），較短時為前綴比對（B-tree 前綴索引）
+
+    前綴比對的樣式直接寫入 SQL（literal_execute），PostgreSQL 規劃時才知道樣式是固定前綴、能使用索引；
+    lowercase 為 True 時比對 lower(欄位)，與前綴索引的運算式相同。
+    """
+    if len(term) >= TRIGRAM_MIN_LENGTH:
+        return expression.ilike(_like_pattern(term), escape="\\")
+    if lowercase:
+        expression, term = func.lower(expression), term.lower()
+    return expression.like(bindparam(None, f"{_escape_like(term)}%", literal_execute=True), escape="\\")
+
+
+def search_orders(db: Session, q: str, field: enums.SearchField = enums.SearchField.ALL, limit: int = 50) -> List[models.Order]:
+    """依顧客姓名、電話或電子郵件的部分內容（不分大小寫）搜尋訂單，依建立時間新到舊回傳最多 limit 筆。
+
+    3 個字以上的搜尋字串比對欄位中任何位置，PostgreSQL 上走 pg_trgm 的 GIN 索引；
+    2 個字的搜尋字串取不出三連字，只比對開頭，走 text_pattern_ops 的 B-tree 索引。
+    SQLite（測試環境）沒有對應索引，以相同的查詢逐列比對。
+    電話比對時查詢字串與資料庫中的電話都去除空白、連字號與括號，例如 "0912-345" 也能找到 "0912 345 678"。
+    """
+    term = q.strip()
+    conditions = []
+    if field in (enums.SearchField.ALL, enums.SearchField.NAME):
+        conditions.append(_match_condition(models.Order.customer_name, term, lowercase=True))
+    if field in (enums.SearchField.ALL, enums.SearchField.EMAIL):
+        conditions.append(_match_condition(models.Order.email, term, lowercase=True))
+    if field in (enums.SearchField.ALL, enums.SearchField.PHONE):
+        phone_term = term.translate(str.maketrans("", "", models.PHONE_SEPARATORS)) or term
+        conditions.append(_match_condition(models.phone_digits(models.Order.phone), phone_term, lowercase=False))
+    try:
+        query = (
+            select(models.Order)
+            .where(or_(*conditions))
+            .order_by(models.Order.created_at.desc(), models.Order.id.desc())
+            .limit(limit)
+        )
+        return db.scalars(query).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"搜尋訂單時發生錯誤: {e}")
+
+
+def build_export_query(date_start: Optional[date] = None, date_end: Optional[date] = None) -> Select:
+    """建立匯出訂單用的查詢：只選取匯出需要的欄位（不建立 ORM 物件），依建立時間舊到新排序。"""
+    query = select(
+        models.Order.id,
+        models.Order.created_at,
+        models.Order.customer_name,
+        models.Order.phone,
+        models.Order.email,
+        models.Order.status,
+        models.Order.payment_status,
+        models.Order.item,
+    ).where(*created_between(date_start, date_end))
+    return query.order_by(models.Order.created_at, models.Order.id)
+
+
 def create_order(db: Session, order: schemas.OrderCreate, order_id: str) -> models.Order:
     """根據使用者輸入的訂單資料（包含顧客資訊與品項），將其轉換為資料庫格式並插入 Order 資料表中，回傳建立完成的訂單資料。"""
     try:
@@ -49,9 +257,17 @@ def create_order(db: Session, order: schemas.OrderCreate, order_id: str) -> mode
             customer_name=order.customer_name,
             phone=order.phone,
             email=order.email,
-            item=items_json
+            item=items_json,
+            total_amount=order_total(items_json),
         )
         db.add(db_order)
+        db.flush()  # 先寫入訂單（品項明細的外鍵需要），並取得預設的建立時間，報表依此歸屬營業日
+        # 品項明細以一次 executemany 寫入，不經過 ORM 逐筆 INSERT
+        if items_json:
+            db.execute(insert(models.OrderItem), [{"order_id": order_id, **item} for item in items_json])
+        inventory.reserve_stock(db, items_json)
+        rollup.record_orders_created(db, [(db_order.created_at, items_json)], db_order.status.value)
+        record_order_events(db, enums.OrderEventType.CREATED, [db_order])
         db.commit()
         db.refresh(db_order)
         return db_order
@@ -60,87 +276,291 @@ def create_order(db: Session, order: schemas.OrderCreate, order_id: str) -> mode
         raise DatabaseException(f"建立新訂單時發生錯誤: {e}")
 
 
+def bulk_create_orders(
+    db: Session, orders: List[schemas.OrderCreate], order_ids: List[str]
+) -> Tuple[List[models.Order], Dict[int, str]]:
+    """在同一個交易中批次建立多筆訂單：訂單與品項明細各以一次多列 INSERT 寫入。
+
+    庫存逐筆保留：庫存不足的訂單不建立，其他訂單照常建立（不足的訂單已配發的訂單編號不再使用）。
+    其他寫入失敗時整批回滾。
+
+    Returns:
+        (依輸入順序排列的已建立訂單, {庫存不足的訂單在輸入中的索引: 原因})
+    """
+    try:
+        all_items = [[item.model_dump() for item in order.item] for order in orders]
+        shortages = inventory.reserve_available_stock(db, all_items)
+        rejected = {index: reason for index, reason in enumerate(shortages) if reason is not None}
+
+        order_rows = []
+        item_rows = []
+        for index, (order, order_id, items_json) in enumerate(zip(orders, order_ids, all_items)):
+            if index in rejected:
+                continue
+            order_rows.append({
+                "id": order_id,
+                "customer_name": order.customer_name,
+                "phone": order.phone,
+                "email": order.email,
+                "item": items_json,
+                "total_amount": order_total(items_json),
+            })
+            item_rows.extend({"order_id": order_id, **item} for item in items_json)
+        if not order_rows:
+            db.commit()
+            return [], rejected
+
+        # INSERT ... RETURNING 直接取回含預設值的完整資料列，不需要逐筆 refresh
+        created = db.scalars(
+            insert(models.Order).returning(models.Order, sort_by_parameter_order=True),
+            order_rows,
+        ).all()
+        if item_rows:
+            db.execute(insert(models.OrderItem), item_rows)
+        rollup.record_orders_created(db, [(order.created_at, order.item) for order in created], enums.OrderStatus.PENDING.value)
+        record_order_events(db, enums.OrderEventType.CREATED, created)
+        db.commit()
+        return created, rejected
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"批次建立訂單時發生錯誤: {e}")
+
+
+def _update_returning(db: Session, order_id: str, values: dict, *conditions) -> Optional[models.Order]:
+    """以單一 UPDATE ... RETURNING 更新訂單並取回更新後的資料列，無此訂單時拋出 NotFoundException。
+
+    有額外條件時，訂單存在但不符合條件回傳 None（只在沒有更新時多查詢一次）。
+    """
+    order = db.scalars(
+        update(models.Order).where(models.Order.id == order_id, *conditions).values(values).returning(models.Order)
+    ).one_or_none()
+    if order is None and conditions and db.scalar(select(exists().where(models.Order.id == order_id))):
+        return None
+    if order is None:
+        raise NotFoundException(resource_name="Order", resource_id=order_id)
+    return order
+
+
 def update_order_by_id(db: Session, order_id: str, update_data: schemas.OrderCreate) -> models.Order:
-    """從 Order 資料表中根據 id 找到對應的訂單，依照傳入的 JSON 資料進行同層欄位更新，若無此訂單則拋出異常。"""
-    db_order = get_order_by_id(db, order_id)
+    """根據 id 以 UPDATE ... RETURNING 更新訂單的同層欄位並同步替換品項明細，若無此訂單則拋出異常。"""
     try:
-        update_data_dict = update_data.model_dump()
-        for key, value in update_data_dict.items():
-            if hasattr(db_order, key):
-                if key == 'item':
-                    setattr(db_order, key, [item.model_dump() for item in value])
-                else:
-                    setattr(db_order, key, value)
+        update_data_dict = update_data.model_dump()  # model_dump() 已將品項轉成 dict，可直接存入 JSON 欄位
+        update_data_dict["total_amount"] = order_total(update_data_dict["item"])
+        db_order = _update_returning(db, order_id, update_data_dict)
+        # 品項明細整批替換，刪除時一併取回舊品項供報表扣除
+        old_items = db.execute(
+            delete(models.OrderItem)
+            .where(models.OrderItem.order_id == order_id)
+            .returning(models.OrderItem.product_id, models.OrderItem.quantity, models.OrderItem.price)
+        ).mappings().all()
+        if update_data_dict["item"]:
+            db.execute(insert(models.OrderItem), [{"order_id": order_id, **item} for item in update_data_dict["item"]])
+        if db_order.status in enums.STOCK_HOLDING_STATUSES:
+            inventory.replace_reserved_stock(db, old_items, update_data_dict["item"])
+        rollup.record_items_replaced(db, db_order.created_at, old_items, update_data_dict["item"])
+        record_order_events(db, enums.OrderEventType.UPDATED, [db_order])
+        mark_orders_changed(db, [order_id])
         db.commit()
-        db.refresh(db_order)
         return db_order
     except SQLAlchemyError as e:
         db.rollback()
         raise DatabaseException(f"更新訂單資料 (ID: {order_id}) 時發生錯誤: {e}")
 
 
-def update_order_status(db: Session, order_id: int, status: enums.OrderStatus) -> models.Order:
-    """從 Order 資料表中根據 id 找到對應的訂單，並更新其狀態欄位為新的 status，回傳更新後的訂單資料。若無此訂單則拋出異常。"""
-    db_order = get_order_by_id(db, order_id)
+def update_order_status(db: Session, order_id: str, status: enums.OrderStatus) -> models.Order:
+    """根據 id 以單一 UPDATE ... RETURNING 更新訂單狀態，回傳更新後的訂單資料。若無此訂單則拋出異常。
+
+    與批次更新相同，狀態轉換規則（ORDER_STATUS_TRANSITIONS）在 SQL 的 WHERE 條件中檢查：
+    訂單已經是目標狀態時不更新、不計入報表，直接回傳訂單；其他不允許的轉換拋出 BadRequestException。
+    轉為 CANCELLED 或 RETURNED 時歸還庫存（允許的來源狀態只會轉入一次，不會重複歸還）。
+    """
     try:
-        db_order.status = status
+        db_order = _update_returning(
+            db, order_id, {"status": status},
+            models.Order.status.in_(enums.allowed_sources(enums.ORDER_STATUS_TRANSITIONS, status)),
+        )
+        if db_order is None:
+            current = db.scalar(select(models.Order.status).where(models.Order.id == order_id))
+            db.rollback()
+            if current == status:
+                return get_order_by_id(db, order_id)
+            raise BadRequestException(f"訂單 #{order_id} 的狀態不能從 {current.value} 轉換為 {status.value}")
+        if status in enums.STOCK_RELEASING_STATUSES:
+            inventory.release_stock(db, db_order.item)
+        rollup.record_status_changes(db, status.value, 1)
+        record_order_events(db, enums.OrderEventType.STATUS_CHANGED, [db_order])
+        mark_orders_changed(db, [order_id])
         db.commit()
-        db.refresh(db_order)
         return db_order
     except SQLAlchemyError as e:
         db.rollback()
         raise DatabaseException(f"更新訂單狀態 (ID: {order_id}) 時發生錯誤: {e}")
 
 
-def update_payment_status(db: Session, order_id: int, payment_status: enums.PaymentStatus) -> models.Order:
-    """從 Order 資料表中根據 id 找到對應的訂單，並更新其付款狀態欄位為新的 payment_status，回傳更新後的訂單資料。若無此訂單則拋出異常。"""
-    db_order = get_order_by_id(db, order_id)
+def update_payment_status(db: Session, order_id: str, payment_status: enums.PaymentStatus) -> models.Order:
+    """根據 id 以單一 UPDATE ... RETURNING 更新付款狀態，回傳更新後的訂單資料。若無此訂單則拋出異常。"""
     try:
-        db_order.payment_status = payment_status
+        db_order = _update_returning(db, order_id, {"payment_status": payment_status})
+        record_order_events(db, enums.OrderEventType.PAYMENT_CHANGED, [db_order])
+        mark_orders_changed(db, [order_id])
         db.commit()
-        db.refresh(db_order)
         return db_order
     except SQLAlchemyError as e:
         db.rollback()
         raise DatabaseException(f"更新訂單付款狀態 (ID: {order_id}) 時發生錯誤: {e}")
 
 
-def delete_order_by_id(db: Session, order_id: int):
+def _bulk_transition(db: Session, order_ids: List[str], column, target, transitions: dict) -> Tuple[List[models.Order], List[schemas.SkippedOrder]]:
+    """以單一 UPDATE ... WHERE id IN (...) AND 狀態 IN (允許的來源狀態) RETURNING 批次轉換狀態。
+
+    狀態轉換規則在 SQL 的 WHERE 條件中檢查，並發的更新也不會繞過規則；
+    只有在有訂單未被更新時，才額外查詢一次找出原因（不存在或不允許的轉換）。
+    """
+    order_ids = list(dict.fromkeys(order_ids))  # 去除重複並保留順序
+    stmt = (
+        update(models.Order)
+        .where(models.Order.id.in_(order_ids), column.in_(enums.allowed_sources(transitions, target)))
+        .values({column.key: target})
+        .returning(models.Order)
+    )
+    updated = db.scalars(stmt).all()
+
+    skipped = []
+    updated_ids = {order.id for order in updated}
+    missing_ids = [order_id for order_id in order_ids if order_id not in updated_ids]
+    if missing_ids:
+        current = dict(db.execute(select(models.Order.id, column).where(models.Order.id.in_(missing_ids))).all())
+        for order_id in missing_ids:
+            if order_id in current:
+                skipped.append(schemas.SkippedOrder(id=order_id, reason="invalid_transition", current=current[order_id].value))
+            else:
+                skipped.append(schemas.SkippedOrder(id=order_id, reason="not_found"))
+    return updated, skipped
+
+
+def bulk_update_order_status(db: Session, order_ids: List[str], status: enums.OrderStatus) -> Tuple[List[models.Order], List[schemas.SkippedOrder]]:
+    """批次將多筆訂單轉換為新的狀態，不符合 ORDER_STATUS_TRANSITIONS 的訂單會被略過，回傳已更新的訂單與略過的訂單。"""
+    try:
+        result = _bulk_transition(db, order_ids, models.Order.status, status, enums.ORDER_STATUS_TRANSITIONS)
+        if status in enums.STOCK_RELEASING_STATUSES:
+            # 可以轉換到 CANCELLED、RETURNED 的來源狀態都還保留著庫存
+            inventory.release_stock(db, (item for order in result[0] for item in order.item))
+        rollup.record_status_changes(db, status.value, len(result[0]))
+        record_order_events(db, enums.OrderEventType.STATUS_CHANGED, result[0])
+        mark_orders_changed(db, (order.id for order in result[0]))
+        db.commit()
+        return result
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"批次更新訂單狀態時發生錯誤: {e}")
+
+
+def bulk_update_payment_status(db: Session, order_ids: List[str], payment_status: enums.PaymentStatus) -> Tuple[List[models.Order], List[schemas.SkippedOrder]]:
+    """批次將多筆訂單轉換為新的付款狀態，不符合 PAYMENT_STATUS_TRANSITIONS 的訂單會被略過，回傳已更新的訂單與略過的訂單。"""
+    try:
+        result = _bulk_transition(db, order_ids, models.Order.payment_status, payment_status, enums.PAYMENT_STATUS_TRANSITIONS)
+        record_order_events(db, enums.OrderEventType.PAYMENT_CHANGED, result[0])
+        mark_orders_changed(db, (order.id for order in result[0]))
+        db.commit()
+        return result
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"批次更新付款狀態時發生錯誤: {e}")
+
+
+def delete_order_by_id(db: Session, order_id: str) -> models.Order:
     """
-    根據訂單編號刪除訂單
+    根據訂單編號以單一 DELETE ... RETURNING 刪除訂單（品項明細由資料庫 ON DELETE CASCADE 一併刪除）
 
     Args:
         db (Session): 資料庫連線
-        order_id (int): 訂單編號
+        order_id (str): 訂單編號
+
+    Returns:
+        models.Order: 被刪除的訂單物件
     """
-    order = get_order_by_id(db, order_id)
     try:
-        db.delete(order)
+        order = db.scalars(
+            delete(models.Order).where(models.Order.id == order_id).returning(models.Order)
+        ).one_or_none()
+        if order is None:
+            raise NotFoundException(resource_name="Order", resource_id=order_id)
+        rollup.record_order_deleted(db, order.created_at, order.item or [])
+        if order.status in enums.STOCK_HOLDING_STATUSES:
+            inventory.release_stock(db, order.item or [])
+        record_order_events(db, enums.OrderEventType.DELETED, [order])
+        mark_orders_changed(db, [order_id])
+        # 留下刪除紀錄，增量同步的用戶端才知道要移除這筆訂單
+        tombstone = dialect_insert(db, models.OrderTombstone).values(order_id=order_id)
+        db.execute(tombstone.on_conflict_do_update(
+            index_elements=[models.OrderTombstone.order_id],
+            set_={"deleted_at": tombstone.excluded.deleted_at},
+        ))
+        # 脫離 session，commit 後仍可讀取被刪除訂單的欄位
+        db.expunge(order)
         db.commit()
-        return order  # 回傳被刪除的訂單物件
+        return order
     except SQLAlchemyError as e:
         db.rollback()
         raise DatabaseException(f"刪除訂單 (ID: {order_id}) 時發生錯誤: {e}")
 
 
-def get_latest_order_id_number(db: Session) -> int:
-    """從 Order 資料表中取得最新的訂單編號，並回傳該編號。"""
+def get_product_sales(
+    db: Session,
+    product_id: Optional[str] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+) -> List[Row]:
+    """從 OrderItem 資料表以 SQL 彙總各商品的銷售數量、營業額與訂單數，可指定商品與訂單建立時間區間。"""
     try:
-        # 獲取今日的訂單 ID 來計算下一個序號
-        today = datetime.now().strftime('%Y%m%d')
-        prefix = f"ORD-{today}-"
-
-        # 查詢今日最新的訂單
-        latest_order = db.query(models.Order).filter(
-            models.Order.id.like(f"{prefix}%")
-        ).order_by(models.Order.id.desc()).first()
-
-        if not latest_order:
-            return 0  # 今日第一筆訂單
-
-        # 從訂單 ID 中提取序號 (例如: "ORD-20231201-0001" -> 1)
-        last_number = int(latest_order.id.split('-')[-1])
-        return last_number
-    except (SQLAlchemyError, ValueError, IndexError) as e:
-        # 捕獲所有可能的錯誤
-        raise DatabaseException(f"取得最新訂單編號時發生錯誤: {e}")
+        query = (
+            select(
+                models.OrderItem.product_id,
+                func.sum(models.OrderItem.quantity).label("quantity"),
+                func.sum(models.OrderItem.quantity * models.OrderItem.price).label("revenue"),
+                func.count(func.distinct(models.OrderItem.order_id)).label("order_count"),
+            )
+            .join(models.Order, models.Order.id == models.OrderItem.order_id)
+            .group_by(models.OrderItem.product_id)
+            .order_by(models.OrderItem.product_id)
+        )
+        if product_id:
+            query = query.where(models.OrderItem.product_id == product_id)
+        return db.execute(query.where(*created_between(date_start, date_end))).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品銷售統計時發生錯誤: {e}")
+
+
+def backfill_order_items(db: Session, batch_size: int = 500) -> int:
+    """將尚未建立品項明細的舊訂單，從 item JSON 拆成 OrderItem 資料列，每批 commit 一次，回傳處理的訂單數。"""
+    backfilled = 0
+    last_id = ""
+    try:
+        while True:
+            orders = db.execute(
+                select(models.Order.id, models.Order.item)
+                .where(models.Order.id > last_id)
+                .where(~exists().where(models.OrderItem.order_id == models.Order.id))
+                .order_by(models.Order.id)
+                .limit(batch_size)
+            ).all()
+            if not orders:
+                return backfilled
+
+            db.add_all(
+                models.OrderItem(
+                    order_id=order.id,
+                    product_id=item["product_id"],
+                    name=item["name"],
+                    quantity=item["quantity"],
+                    price=item["price"],
+                )
+                for order in orders
+                for item in order.item or []
+            )
+            db.commit()
+            backfilled += len(orders)
+            last_id = orders[-1].id
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"回填訂單品項明細時發生錯誤: {e}")
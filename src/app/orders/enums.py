@@ -15,3 +15,64 @@ class PaymentStatus(str, PyEnum):
     UNPAID = "UNPAID"
     PAID = "PAID"
     REFUNDED = "REFUNDED"
+
+
+class OrderEventType(str, PyEnum):
+    CREATED = "created"                         # 新建立
+    UPDATED = "updated"                         # 顧客資訊或品項被修改
+    STATUS_CHANGED = "status_changed"           # 訂單狀態異動
+    PAYMENT_CHANGED = "payment_changed"         # 付款狀態異動
+    DELETED = "deleted"                         # 被刪除（內容為刪除前的訂單）
+
+
+# 允許的狀態轉換：目前狀態 -> 可以轉換到的狀態（CANCELLED、RETURNED、REFUNDED 為終止狀態）
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED, OrderStatus.RETURNED},
+    OrderStatus.DELIVERED: {OrderStatus.RETURNED},
+    OrderStatus.CANCELLED: set(),
+    OrderStatus.RETURNED: set(),
+}
+
+# 進入這些狀態時歸還訂單保留的庫存（兩者都是終止狀態，不會重複歸還）
+STOCK_RELEASING_STATUSES = {OrderStatus.CANCELLED, OrderStatus.RETURNED}
+
+# 仍保留庫存的狀態：出貨後庫存已實際出庫，修改品項或刪除訂單時只有這些狀態需要調整保留的庫存
+STOCK_HOLDING_STATUSES = {OrderStatus.PENDING, OrderStatus.CONFIRMED}
+
+# 已結案的狀態：建立超過保留月數後可以封存（`orders.archive`）
+ARCHIVABLE_STATUSES = {OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.RETURNED}
+
+PAYMENT_STATUS_TRANSITIONS = {
+    PaymentStatus.UNPAID: {PaymentStatus.PAID},
+    PaymentStatus.PAID: {PaymentStatus.REFUNDED},
+    PaymentStatus.REFUNDED: set(),
+}
+
+
+def allowed_sources(transitions: dict, target: PyEnum) -> list:
+    """回傳可以轉換到 target 的所有來源狀態"""
+    return [source for source, targets in transitions.items() if target in targets]
+
+
+class PaginationMode(str, PyEnum):
+    OFFSET = "offset"   # 以 skip/limit 分頁
+    CURSOR = "cursor"   # 以 (created_at, id) 游標分頁
+
+
+class OrderView(str, PyEnum):
+    FULL = "full"           # 完整訂單（含品項）
+    SUMMARY = "summary"     # 列表摘要：訂單編號、顧客姓名、狀態、總額與建立時間，不載入品項
+
+
+class SearchField(str, PyEnum):
+    ALL = "all"             # 姓名、電話、電子郵件任一符合
+    NAME = "name"           # 顧客姓名
+    PHONE = "phone"         # 聯絡電話
+    EMAIL = "email"         # 電子郵件
+
+
+class ExportFormat(str, PyEnum):
+    NDJSON = "ndjson"   # 每行一筆訂單（JSON 物件，品項為陣列）
+    CSV = "csv"         # 每行一個品項（訂單欄位重複展開）
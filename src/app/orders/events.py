@@ -0,0 +1,251 @@
+# src/app/orders/events.py
+"""
+訂單即時事件推送（Server-Sent Events）
+
+廚房看板等用戶端訂閱 `GET /orders/events`，不再每隔幾秒輪詢 get_all_orders：
+1. 每個 worker 行程只有一個 OrderEventBroker 讀取 outbox（order_events），
+   新事件只查詢一次，再分送（fan-out）給該行程的所有訂閱者
+2. PostgreSQL 上以 LISTEN 等待 outbox 觸發器送出的 NOTIFY，有新事件才查詢；
+   其他資料庫或 LISTEN 連線失敗時改為每 poll_interval 秒輪詢一次
+3. 沒有訂閱者時停止監聽，不佔用資料庫連線
+4. 用戶端斷線重連時帶 Last-Event-ID，先從 outbox 補回漏掉的事件再接續即時事件
+
+訂閱者處理太慢、佇列滿了時會被中斷連線，由用戶端重連並以 Last-Event-ID 補回，
+不會拖慢其他訂閱者。
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Optional, Set
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from . import models, outbox
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal, utc_now
+
+logger = logging.getLogger(__name__)
+
+# 沒有事件時定期送出的註解行，避免連線被代理伺服器當成閒置而關閉
+HEARTBEAT = b": keep-alive\n\n"
+
+
+def format_event(event: models.OrderEvent) -> bytes:
+    """將 outbox 事件轉為 SSE 格式，data 為訂單 JSON（orjson 輸出不含換行）"""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event.id, event.event_type.value.encode(), event.payload)
+
+
+class OrderEventBroker:
+    """單一行程內的 outbox 監聽者，將新事件分送給所有訂閱者"""
+
+    def __init__(self, session_factory: async_sessionmaker, poll_interval: float = 1.0, listen_timeout: float = 30.0,
+                 queue_size: int = 1000, batch_size: int = 500, gap_timeout: float = 10.0):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        # 使用 LISTEN 時仍每隔這麼久查詢一次，以防漏接通知
+        self.listen_timeout = listen_timeout
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        # 事件編號在 INSERT 時配發、commit 時才看得到，較小的編號可能晚一點才出現；
+        # 跳過的編號在這段時間內會持續補查（回滾的交易留下的空號則逾時後放棄）
+        self.gap_timeout = gap_timeout
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._gaps: Dict[int, float] = {}
+        # 已分送到的最大事件編號，監聽開始前為 None
+        self._last_id: Optional[int] = None
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """訂閱之後 commit 的事件；第一個訂閱者開始監聽，最後一個離開時停止
+
+        佇列的內容為 (事件編號, SSE 格式的內容)；編號為 None 表示訂閱者處理太慢，已被中斷
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._last_id = None
+            # 在空白的 context 中建立監聽工作：它服務所有訂閱者，查詢不應計入觸發它的那個請求的統計與查詢預算
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers and self._task is not None:
+                task, self._task = self._task, None
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
+    def low_water_mark(self) -> Optional[int]:
+        """之後還可能分送的最小事件編號（尚未補到的跳號或下一個新編號）；監聽開始前為 None
+
+        編號小於此值的事件已分送過或已放棄，不會再出現在訂閱者的佇列中。
+        """
+        if self._last_id is None:
+            return None
+        return min(self._gaps, default=self._last_id + 1)
+
+    def wake(self) -> None:
+        """立即查詢一次新事件（LISTEN 收到通知時呼叫）"""
+        self._wake.set()
+
+    def publish(self, events) -> None:
+        """將事件分送給所有訂閱者；佇列已滿的訂閱者改為收到中斷通知"""
+        frames = [(event.id, format_event(event)) for event in events]
+        for queue in list(self._subscribers):
+            try:
+                for frame in frames:
+                    queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((None, b""))
+                self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        async with self.session_factory() as db:
+            last_id = await db.run_sync(outbox.get_latest_event_id)
+        self._gaps = {}
+        self._last_id = last_id
+        while True:
+            try:
+                async with self._listen() as listening:
+                    timeout = self.listen_timeout if listening else self.poll_interval
+                    while True:
+                        last_id = await self._poll(last_id)
+                        with suppress(asyncio.TimeoutError):
+                            await asyncio.wait_for(self._wake.wait(), timeout)
+                        self._wake.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"讀取訂單事件失敗，{self.poll_interval:g} 秒後重試: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self, last_id: int) -> int:
+        """查詢並分送 last_id 之後的新事件（以及尚未出現的跳號），回傳新的 last_id"""
+        while True:
+            async with self.session_factory() as db:
+                events = await db.run_sync(outbox.get_events_after, last_id, self.batch_size, list(self._gaps))
+            now = time.monotonic()
+            self._gaps = {event_id: deadline for event_id, deadline in self._gaps.items() if deadline > now}
+            new_events = []
+            for event in events:
+                if event.id > last_id:
+                    self._gaps.update((skipped, now + self.gap_timeout) for skipped in range(last_id + 1, event.id))
+                    last_id = event.id
+                elif self._gaps.pop(event.id, None) is None:
+                    continue
+                new_events.append(event)
+            self.publish(new_events)
+            self._last_id = last_id
+            if len(events) < self.batch_size:
+                return last_id
+
+    @asynccontextmanager
+    async def _listen(self) -> AsyncIterator[bool]:
+        """PostgreSQL（asyncpg）上以專用連線 LISTEN，回傳是否成功；其他情況改為輪詢"""
+        bind = self.session_factory.kw.get("bind")
+        if bind is None or bind.dialect.name != "postgresql":
+            yield False
+            return
+
+        def on_notify(*args):
+            self.wake()
+
+        try:
+            connection = await bind.connect()
+            raw = await connection.get_raw_connection()
+            driver = raw.driver_connection
+            await driver.add_listener(models.ORDER_EVENTS_CHANNEL, on_notify)
+        except Exception as e:
+            logger.warning(f"無法 LISTEN 訂單事件，改為每 {self.poll_interval:g} 秒輪詢: {e}")
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with suppress(Exception):
+                await driver.remove_listener(models.ORDER_EVENTS_CHANNEL, on_notify)
+            await connection.close()
+
+
+async def stream_order_events(broker: OrderEventBroker, session_factory: async_sessionmaker,
+                              last_event_id: Optional[int] = None, heartbeat: float = 15.0) -> AsyncIterator[bytes]:
+    """產生 SSE 串流：先補回 last_event_id 之後的事件，再接續即時事件
+
+    先訂閱再補查，補查期間 commit 的事件會同時出現在兩邊，以補查送出的事件編號集合去除重複。
+    不能只比較補查到的最大編號：編號較小的事件可能較晚 commit（跳號之後才補上），
+    由分送器稍後送來時仍要送給用戶端。集合中低於分送器 low_water_mark() 的編號不會再出現，
+    在佇列清空時移除，集合只保留仍在跳號等待期間內的編號。
+    """
+    async with broker.subscribe() as queue:
+        yield b"retry: 3000\n\n"
+        replayed: Set[int] = set()
+        if last_event_id is not None:
+            while True:
+                async with session_factory() as db:
+                    events = await db.run_sync(outbox.get_events_after, last_event_id, broker.batch_size)
+                for event in events:
+                    yield format_event(event)
+                    replayed.add(event.id)
+                    last_event_id = event.id
+                if len(events) < broker.batch_size:
+                    break
+
+        while True:
+            if replayed and queue.empty():
+                # 佇列已清空，之後收到的事件編號都不小於 low_water_mark()
+                floor = broker.low_water_mark()
+                if floor is not None:
+                    replayed = {replayed_id for replayed_id in replayed if replayed_id >= floor}
+            try:
+                event_id, frame = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if event_id is None:
+                # 處理太慢被中斷，用戶端會自動重連並以 Last-Event-ID 補回
+                return
+            if event_id in replayed:
+                # 分送器對每個編號只分送一次，重複出現過的編號不會再來
+                replayed.discard(event_id)
+                continue
+            yield frame
+
+
+async def purge_order_events_periodically(session_factory: async_sessionmaker, interval: float,
+                                          retention_hours: float, batch_size: int = 1000) -> None:
+    """每 interval 秒分批清除超過保留時數的事件，直到被取消；單次失敗只記錄錯誤"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            older_than = utc_now() - timedelta(hours=retention_hours)
+            async with session_factory() as db:
+                purged = await db.run_sync(outbox.purge_order_events, older_than, batch_size)
+            if purged:
+                logger.info(f"已清除 {purged} 筆舊的訂單事件")
+        except Exception as e:
+            logger.error(f"清除舊的訂單事件失敗: {e}")
+
+
+settings = get_settings()
+
+# 本行程的訂單事件分送器
+order_event_broker = OrderEventBroker(
+    AsyncSessionLocal,
+    poll_interval=settings.order_events_poll_interval,
+    queue_size=settings.order_events_queue_size,
+)
+
+
+def get_order_event_broker() -> OrderEventBroker:
+    """FastAPI 依賴注入：取得本行程的訂單事件分送器"""
+    return order_event_broker
@@ -0,0 +1,92 @@
+# src/app/orders/export.py
+"""
+訂單匯出格式轉換
+
+將 `async_crud.stream_orders_for_export` 產生的資料列轉成 NDJSON 或 CSV 位元組區塊，
+直接交給 StreamingResponse 輸出：資料一邊從資料庫讀出一邊寫給用戶端，
+不需要先把整個月份的訂單載入記憶體。
+"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import Row
+
+from .enums import ExportFormat
+
+# 每累積多少行輸出一次，避免每行都觸發一次網路寫入
+CHUNK_LINES = 500
+
+CSV_COLUMNS = [
+    "order_id", "created_at", "customer_name", "phone", "email", "status", "payment_status",
+    "product_id", "product_name", "quantity", "price", "subtotal",
+]
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_lines(row: Row) -> Iterable[str]:
+    """一筆訂單輸出為一行 JSON"""
+    yield json.dumps({
+        "id": row.id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "customer_name": row.customer_name,
+        "phone": row.phone,
+        "email": row.email,
+        "status": row.status.value if row.status else None,
+        "payment_status": row.payment_status.value if row.payment_status else None,
+        "item": row.item,
+    }, ensure_ascii=False) + "\n"
+
+
+def _csv_lines(row: Row) -> Iterable[str]:
+    """一個品項輸出為一行 CSV，訂單欄位在每個品項重複出現，方便試算表直接加總
+
+    沒有品項的訂單仍輸出一行（品項欄位留空），匯出的訂單數與資料庫一致。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    order_fields = [
+        row.id,
+        row.created_at.isoformat() if row.created_at else "",
+        row.customer_name,
+        row.phone,
+        row.email,
+        row.status.value if row.status else "",
+        row.payment_status.value if row.payment_status else "",
+    ]
+    for item in row.item or []:
+        writer.writerow(order_fields + [
+            item.get("product_id"),
+            item.get("name"),
+            item.get("quantity"),
+            item.get("price"),
+            (item.get("quantity") or 0) * (item.get("price") or 0),
+        ])
+    if not row.item:
+        writer.writerow(order_fields + [""] * (len(CSV_COLUMNS) - len(order_fields)))
+    yield buffer.getvalue()
+
+
+async def render_export(rows: AsyncIterator[Row], export_format: ExportFormat) -> AsyncIterator[bytes]:
+    """將資料列串流轉為指定格式的位元組區塊"""
+    to_lines = _csv_lines if export_format == ExportFormat.CSV else _ndjson_lines
+    chunk = []
+    if export_format == ExportFormat.CSV:
+        header = io.StringIO()
+        csv.writer(header).writerow(CSV_COLUMNS)
+        # 加上 BOM 讓 Excel 正確辨識 UTF-8 中文
+        chunk.append("\ufeff" + header.getvalue())
+
+    async for row in rows:
+        chunk.extend(to_lines(row))
+        if len(chunk) >= CHUNK_LINES:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode("utf-8")
@@ -0,0 +1,132 @@
+# src/app/orders/migrations.py
+"""
+orders 資料表的結構升級
+
+`Base.metadata.create_all` 只會建立不存在的資料表，不會替既有資料表補上新欄位；
+這裡的函式由 `init_db.py` 呼叫，檢查既有資料表並補上欄位與資料，重複執行不會有影響。
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+
+from . import models
+
+
+def _column_names(target_engine: Engine, table: str) -> set:
+    return {column["name"] for column in inspect(target_engine).get_columns(table)}
+
+
+def add_updated_at_column(target_engine: Engine) -> bool:
+    """替既有的 orders 資料表加上 updated_at，並以建立時間回填，回傳是否有變更
+
+    舊資料的 created_at 是不含時區的台灣時間（UTC+8），回填時換算成 UTC。
+    """
+    if "updated_at" in _column_names(target_engine, "orders"):
+        return False
+    with target_engine.begin() as conn:
+        if target_engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE orders ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE"))
+            conn.execute(text("UPDATE orders SET updated_at = COALESCE(created_at AT TIME ZONE 'Asia/Taipei', now())"))
+            conn.execute(text("ALTER TABLE orders ALTER COLUMN updated_at SET NOT NULL"))
+        else:
+            # SQLite 無法在既有欄位加上 NOT NULL，改為新增欄位時給預設值
+            conn.execute(text("ALTER TABLE orders ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'"))
+            conn.execute(text("UPDATE orders SET updated_at = COALESCE(datetime(created_at, '-8 hours'), datetime('now'))"))
+    return True
+
+
+def add_total_amount_column(target_engine: Engine) -> bool:
+    """替既有的 orders 資料表加上 total_amount，並由品項 JSON 回填訂單總額，回傳是否有變更
+
+    以 item JSON 計算（不依賴 order_items，尚未回填品項明細的舊訂單也能算出總額）。
+    必須在 convert_created_at_to_utc 之前執行（SQLite 重建資料表時會搬移所有欄位）。
+    """
+    if "total_amount" in _column_names(target_engine, "orders"):
+        return False
+    with target_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE orders ADD COLUMN total_amount INTEGER NOT NULL DEFAULT 0"))
+        if target_engine.dialect.name == "postgresql":
+            conn.execute(text(
+                "UPDATE orders SET total_amount = COALESCE((SELECT SUM((element->>'quantity')::int * (element->>'price')::int) "
+                "FROM json_array_elements(orders.item::json) AS element), 0)"
+            ))
+        else:
+            conn.execute(text(
+                "UPDATE orders SET total_amount = COALESCE((SELECT SUM(json_extract(value, '$.quantity') * json_extract(value, '$.price')) "
+                "FROM json_each(orders.item)), 0)"
+            ))
+    return True
+
+
+def drop_raw_phone_trgm_index(target_engine: Engine) -> bool:
+    """刪除舊版以原始電話欄位建立的 trigram 索引，回傳是否有變更
+
+    電話搜尋改為比對去除分隔符號後的運算式（ix_orders_phone_digits_trgm），舊索引不再被使用。
+    """
+    indexes = {index["name"] for index in inspect(target_engine).get_indexes("orders")}
+    if "ix_orders_phone_trgm" not in indexes:
+        return False
+    with target_engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_orders_phone_trgm"))
+    return True
+
+
+def convert_created_at_to_utc(target_engine: Engine) -> bool:
+    """將既有 orders 資料表的 created_at 改為含時區的 UTC 時間並由資料庫填入預設值，回傳是否有變更
+
+    舊的 created_at 是不含時區的台灣時間（UTC+8），由應用程式寫入、資料庫沒有預設值；
+    以「欄位沒有預設值」判斷尚未轉換。必須在 add_updated_at_column 與 add_total_amount_column 之後執行
+    （沒有建立時間的舊訂單以 updated_at 補上；SQLite 重建資料表時會搬移所有欄位）。
+    """
+    [column] = [column for column in inspect(target_engine).get_columns("orders") if column["name"] == "created_at"]
+    if column["default"] is not None:
+        return False
+
+    if target_engine.dialect.name == "postgresql":
+        with target_engine.begin() as conn:
+            conn.execute(text("UPDATE orders SET created_at = updated_at AT TIME ZONE 'Asia/Taipei' WHERE created_at IS NULL"))
+            # 改變欄位型別會重寫資料表並重建 ix_orders_created_at_id
+            conn.execute(text(
+                "ALTER TABLE orders "
+                "ALTER COLUMN created_at TYPE TIMESTAMP WITH TIME ZONE USING created_at AT TIME ZONE 'Asia/Taipei', "
+                "ALTER COLUMN created_at SET DEFAULT now(), "
+                "ALTER COLUMN created_at SET NOT NULL"
+            ))
+        return True
+
+    # SQLite 無法修改既有欄位的預設值與 NOT NULL，依官方建議的步驟重建資料表：
+    # 關閉外鍵檢查（避免 DROP TABLE 連帶刪除品項明細）後建立新資料表、搬移資料、刪除舊表再改名
+    table = models.Order.__table__
+    columns = [column.name for column in table.columns]
+    select_columns = [
+        "COALESCE(strftime('%Y-%m-%d %H:%M:%f000', created_at, '-8 hours'), updated_at)" if name == "created_at" else name
+        for name in columns
+    ]
+    create_table = str(CreateTable(table).compile(dialect=target_engine.dialect)).strip()
+    create_table = create_table.replace("CREATE TABLE orders ", "CREATE TABLE orders_new ", 1)
+    script = f"""
+        PRAGMA foreign_keys=OFF;
+        BEGIN;
+        {create_table};
+        INSERT INTO orders_new ({", ".join(columns)}) SELECT {", ".join(select_columns)} FROM orders;
+        DROP TABLE orders;
+        ALTER TABLE orders_new RENAME TO orders;
+        COMMIT;
+        PRAGMA foreign_keys=ON;
+    """
+    connection = target_engine.raw_connection()
+    driver = connection.driver_connection
+    try:
+        driver.executescript(script)
+    except Exception:
+        if driver.in_transaction:
+            driver.execute("ROLLBACK")
+        driver.execute("PRAGMA foreign_keys=ON")
+        raise
+    finally:
+        connection.close()
+    # 舊資料表的索引隨 DROP TABLE 一併刪除，在新資料表上重新建立
+    for index in table.indexes:
+        index.create(bind=target_engine, checkfirst=True)
+    return True
@@ -1,9 +1,22 @@
 # src/app/orders/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON
-from datetime import datetime, timezone, timedelta
-from ..core.database import Base
-from .enums import OrderStatus, PaymentStatus
+from sqlalchemy import BigInteger, Column, Integer, LargeBinary, String, Enum, JSON, Index, ForeignKey, DDL, event, func, literal_column
+from sqlalchemy.orm import relationship
+from ..core.database import Base, UTCDateTime, utcnow
+from .enums import OrderStatus, PaymentStatus, OrderEventType
+
+# 電話搜尋時忽略的分隔符號（空白、連字號、括號）
+PHONE_SEPARATORS = " -()"
+
+
+def phone_digits(phone):
+    """去除電話中分隔符號的 SQL 運算式，搜尋條件與運算式索引共用同一個運算式
+
+    分隔符號以 SQL 常值（不是綁定參數）寫入，PostgreSQL 才能把查詢中的運算式對應到運算式索引。
+    """
+    for separator in PHONE_SEPARATORS:
+        phone = func.replace(phone, literal_column(f"'{separator}'"), literal_column("''"))
+    return phone
 
 
 class Order(Base):
@@ -15,9 +28,120 @@ class Order(Base):
     customer_name = Column(String, nullable=False)      # 姓名
     phone = Column(String, nullable=False)              # 聯絡電話
     email = Column(String, nullable=False)              # 電子郵件
-    item = Column(JSON, nullable=False)               # 品項
+    item = Column(JSON, nullable=False)               # 品項（API 回傳用的原始結構，查詢統計請用 line_items）
+    total_amount = Column(Integer, nullable=False, server_default="0")  # 訂單總額（品項數量 × 單價的合計，寫入品項時一併計算），列表摘要不必載入 item
 
     # 系統欄位
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone(timedelta(hours=8))))   # 建立時間
+    # 建立時間，由資料庫在寫入時填入（UTC）；營業日依台灣時間（UTC+8）切分，見 reports.rollup.business_day
+    created_at = Column(UTCDateTime, nullable=False, server_default=utcnow())
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)          # 訂單狀態
     payment_status = Column(Enum(PaymentStatus), default=PaymentStatus.UNPAID)  # 付款狀態
+    # 最後異動時間（UTC），新增時由資料庫填入，之後每次 UPDATE（包含 Core 的 update() 語句）自動更新；增量同步依此找出異動的訂單
+    updated_at = Column(UTCDateTime, nullable=False, default=utcnow(), onupdate=utcnow())
+
+    # 正規化的品項明細，與 item 同步寫入；刪除訂單時由資料庫 ON DELETE CASCADE 一併刪除
+    line_items = relationship("OrderItem", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # 游標分頁依 (created_at, id) 排序與定位；日期區間篩選是 created_at 的半開區間，在這個 B-tree 索引上做範圍掃描
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        # 增量同步依 (updated_at, id) 排序與定位
+        Index("ix_orders_updated_at_id", "updated_at", "id"),
+        # 顧客搜尋（3 個字以上的子字串比對）使用的三連字（trigram）索引，僅 PostgreSQL；SQLite 沒有對應的索引，改為逐列比對
+        # 電話以去除分隔符號後的運算式建立索引，與搜尋條件的運算式相同
+        *(
+            Index(
+                f"ix_orders_{column}_trgm", column,
+                postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in ("customer_name", "email")
+        ),
+        Index(
+            "ix_orders_phone_digits_trgm", phone_digits(phone).label("phone_digits"),
+            postgresql_using="gin", postgresql_ops={"phone_digits": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # 2 個字的搜尋取不出三連字，改為前綴比對（LIKE 'ab%'），使用 text_pattern_ops 的 B-tree 索引，僅 PostgreSQL
+        Index(
+            "ix_orders_customer_name_prefix", func.lower(customer_name).label("customer_name_lower"),
+            postgresql_ops={"customer_name_lower": "text_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_orders_email_prefix", func.lower(email).label("email_lower"),
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_orders_phone_digits_prefix", phone_digits(phone).label("phone_digits"),
+            postgresql_ops={"phone_digits": "text_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+    # INSERT 時以 RETURNING 取回資料庫填入的 created_at，flush 之後讀取不需要再查詢一次
+    __mapper_args__ = {"eager_defaults": True}
+
+
+# trigram 索引需要 pg_trgm 擴充套件，建立 orders 資料表前先啟用
+PG_TRGM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+event.listen(Order.__table__, "before_create", DDL(PG_TRGM_EXTENSION).execute_if(dialect="postgresql"))
+
+
+class OrderItem(Base):
+    """訂單品項明細（由 Order.item 正規化而來），讓商品銷售統計可以直接用索引做 SQL 彙總"""
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(String, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)  # 所屬訂單
+    product_id = Column(String, nullable=False, index=True)  # 商品 ID
+    name = Column(String, nullable=False)                    # 商品名稱（下單當時）
+    quantity = Column(Integer, nullable=False)               # 數量
+    price = Column(Integer, nullable=False)                  # 單價（下單當時）
+
+
+class OrderSequence(Base):
+    """每日訂單流水號計數器，一天一列，由 `orders.sequence` 以單一 upsert 原子遞增"""
+    __tablename__ = "order_sequences"
+
+    day = Column(String(8), primary_key=True)             # 日期 YYYYMMDD
+    last_value = Column(Integer, nullable=False, default=0)  # 當日已配發的最大序號
+
+
+class OrderTombstone(Base):
+    """被刪除的訂單，讓增量同步的用戶端知道要移除本機的副本"""
+    __tablename__ = "order_tombstones"
+
+    order_id = Column(String, primary_key=True)                                 # 被刪除的訂單 ID
+    deleted_at = Column(UTCDateTime, nullable=False, default=utcnow())  # 刪除時間（UTC）
+
+    __table_args__ = (
+        # 增量同步依 (deleted_at, order_id) 排序與定位
+        Index("ix_order_tombstones_deleted_at_order_id", "deleted_at", "order_id"),
+    )
+
+
+class OrderEvent(Base):
+    """訂單異動的 outbox：orders 的每個寫入在同一個交易中附加事件，由 `orders.events` 推送給訂閱者"""
+    __tablename__ = "order_events"
+
+    # 事件編號，同時是 SSE 的 event id（用戶端重連時以 Last-Event-ID 補回漏掉的事件）；SQLite 只有 INTEGER 主鍵會自動遞增
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    order_id = Column(String, nullable=False)                   # 訂單 ID（訂單可能已刪除，不設外鍵）
+    event_type = Column(Enum(OrderEventType), nullable=False)   # 事件類型
+    payload = Column(LargeBinary, nullable=False)               # 異動後的訂單 JSON，刪除事件為刪除前的內容
+    created_at = Column(UTCDateTime, nullable=False, default=utcnow(), index=True)  # 事件時間（UTC），清除舊事件用
+
+
+# PostgreSQL 上新增事件時以 NOTIFY 喚醒各行程的監聽者（交易 commit 時才送出，同一個交易內重複的通知只送一次），
+# 觸發器在資料庫內執行，寫入端不需要多送一條語句
+ORDER_EVENTS_CHANNEL = "order_events"
+ORDER_EVENTS_NOTIFY_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_order_events() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{ORDER_EVENTS_CHANNEL}', '');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+ORDER_EVENTS_NOTIFY_TRIGGER = (
+    "CREATE TRIGGER order_events_notify AFTER INSERT ON order_events "
+    "FOR EACH STATEMENT EXECUTE FUNCTION notify_order_events()"
+)
+event.listen(OrderEvent.__table__, "after_create", DDL(ORDER_EVENTS_NOTIFY_FUNCTION).execute_if(dialect="postgresql"))
+event.listen(OrderEvent.__table__, "after_create", DDL(ORDER_EVENTS_NOTIFY_TRIGGER).execute_if(dialect="postgresql"))
@@ -0,0 +1,70 @@
+# src/app/orders/outbox.py
+"""
+訂單異動的 transactional outbox
+
+orders 的寫入函式在同一個交易中呼叫 record_order_events，把異動後的訂單附加到
+order_events；訂單寫入回滾時事件一併回滾，commit 後訂閱者一定看得到對應的事件。
+事件內容在寫入時就序列化好，推送時不需要再查詢訂單或重新序列化。
+"""
+
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models
+from .enums import OrderEventType
+from .serializers import order_to_json
+from ..common.exceptions import DatabaseException
+
+
+def record_order_events(db: Session, event_type: OrderEventType, orders: Iterable[models.Order]) -> None:
+    """以一次 executemany 為每筆訂單附加一個事件（在呼叫端的交易中，不 commit）"""
+    rows = [{"order_id": order.id, "event_type": event_type, "payload": order_to_json(order)} for order in orders]
+    if rows:
+        db.execute(insert(models.OrderEvent), rows)
+
+
+def get_latest_event_id(db: Session) -> int:
+    """目前最新的事件編號，沒有事件時為 0"""
+    try:
+        return db.scalar(select(func.max(models.OrderEvent.id))) or 0
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢最新的訂單事件時發生錯誤: {e}")
+
+
+def get_events_after(db: Session, after_id: int, limit: int = 500, extra_ids: Iterable[int] = ()) -> List[models.OrderEvent]:
+    """依編號順序取得 after_id 之後的事件（最多 limit 筆），extra_ids 為另外要補查的較舊編號"""
+    condition = models.OrderEvent.id > after_id
+    extra_ids = list(extra_ids)
+    if extra_ids:
+        condition = condition | models.OrderEvent.id.in_(extra_ids)
+    try:
+        return db.scalars(
+            select(models.OrderEvent).where(condition).order_by(models.OrderEvent.id).limit(limit)
+        ).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢訂單事件時發生錯誤: {e}")
+
+
+def purge_order_events(db: Session, older_than: datetime, batch_size: int = 1000) -> int:
+    """分批刪除 older_than 之前的事件，每批 commit 一次，回傳刪除的筆數"""
+    purged = 0
+    try:
+        while True:
+            expired = (
+                select(models.OrderEvent.id)
+                .where(models.OrderEvent.created_at < older_than)
+                .order_by(models.OrderEvent.id)
+                .limit(batch_size)
+            )
+            deleted = db.execute(delete(models.OrderEvent).where(models.OrderEvent.id.in_(expired))).rowcount
+            db.commit()
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"清除舊的訂單事件時發生錯誤: {e}")
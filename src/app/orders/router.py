@@ -1,15 +1,45 @@
 # src/app/orders/router.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+import hashlib
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date
+from pydantic import ValidationError
 
 # 匯入相關模組 - 使用相對導入
-from ..common.deps import get_db
-from ..common.responses import create_success_response
-from . import schemas, crud, models
-from .enums import OrderStatus, PaymentStatus
+from ..common.deps import get_async_db, get_async_read_db, get_async_read_sessionmaker, get_async_sessionmaker
+from ..common.exceptions import BadRequestException
+from ..common.responses import create_success_json_response, create_success_raw_response
+from ..core.config import get_settings
+from ..core.querylog import query_budget
+from ..idempotency import async_crud as idempotency_crud
+from ..products.catalog import CatalogSnapshot, product_catalog
+from . import schemas, async_crud, models
+from .crud import created_between
+from .serializers import order_to_dict, orders_to_dicts, parse_fields, rows_to_dicts
+from .sequence import order_id_allocator
+from .cache import cache_order
+from .enums import OrderStatus, PaymentStatus, PaginationMode, ExportFormat, SearchField, OrderView
+from .export import MEDIA_TYPES, render_export
+from .events import OrderEventBroker, get_order_event_broker, stream_order_events
+
+# 單次批次建立的訂單數上限
+BULK_CREATE_MAX_ORDERS = 1000
+# 建立訂單的 Idempotency-Key 保存秒數
+IDEMPOTENCY_TTL_SECONDS = get_settings().idempotency_ttl_seconds
+# 處理中的建立訂單請求持有 Idempotency-Key 的租約秒數
+IDEMPOTENCY_LOCK_SECONDS = get_settings().idempotency_lock_seconds
+# 增量同步只回傳這麼多秒以前的異動
+CHANGES_SETTLE_SECONDS = get_settings().order_changes_settle_seconds
+
+
+def _resolve_prices(snapshot: CatalogSnapshot, order: schemas.OrderCreate) -> schemas.OrderCreate:
+    """以商品目錄快照填入品項的名稱與單價（不查詢資料庫）"""
+    items = [schemas.OrderItem(**item) for item in snapshot.resolve_items(order.item)]
+    return order.model_copy(update={"item": items})
+
 
 # 建立路由器
 router = APIRouter(
@@ -23,83 +53,394 @@ router = APIRouter(
 
 
 @router.get("/get_all_orders")
+@query_budget(1)
 async def get_all_orders(
-    db: Session = Depends(get_db),
-    date_start: Optional[str] = None,
-    date_end: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
+    pagination: PaginationMode = PaginationMode.OFFSET,
+    cursor: Optional[str] = None,
+    view: OrderView = OrderView.FULL,
+    fields: Optional[str] = Query(None, description="以逗號分隔的欄位，例如 id,customer_name,status,total_amount"),
 ):
     """
     取得所有訂單
 
     Args:
-        db (Session, optional): 資料庫連線. Defaults to Depends(get_db).
-        date_start (Optional[str], optional): 起始日期. Defaults to None.
-        date_end (Optional[str], optional): 結束日期. Defaults to None.
-        skip (int, optional): 跳過的筆數. Defaults to 0.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+        date_start (Optional[date], optional): 起始營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        date_end (Optional[date], optional): 結束營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        skip (int, optional): 跳過的筆數（僅 offset 模式）. Defaults to 0.
         limit (int, optional): 限制回傳的筆數. Defaults to 100.
+        pagination (PaginationMode, optional): 分頁模式，offset 或 cursor. Defaults to offset.
+        cursor (Optional[str], optional): 上一頁回傳的 next_cursor，傳入時自動使用 cursor 模式. Defaults to None.
+        view (OrderView, optional): full 為完整訂單，summary 只回傳 id、customer_name、status、total_amount、created_at. Defaults to full.
+        fields (Optional[str], optional): 只回傳指定的欄位（以逗號分隔），指定時優先於 view. Defaults to None.
+
+    只需要部分欄位時，SQL 只 SELECT 這些欄位，不載入品項 JSON。
+
+    Returns:
+        offset 模式：List[schemas.OrderOut] 訂單列表
+        cursor 模式：{"items": List[schemas.OrderOut], "next_cursor": Optional[str]}，
+        依建立時間新到舊排序，next_cursor 為 None 表示已無下一頁
+    """
+    columns = parse_fields(fields, view)
+    serialize = orders_to_dicts if columns is None else (lambda rows: rows_to_dicts(rows, columns))
+
+    if pagination == PaginationMode.CURSOR or cursor:
+        orders, next_cursor = await async_crud.get_orders_page(db, date_start, date_end, cursor, limit, columns)
+        data = {"items": serialize(orders), "next_cursor": next_cursor}
+        return create_success_json_response(data, message="成功取得所有訂單")
+
+    orders = await async_crud.get_all_orders(db, date_start, date_end, skip, limit, columns)
+    return create_success_json_response(serialize(orders), message="成功取得所有訂單")
+
+
+@router.get("/changes")
+@query_budget(2)
+async def get_order_changes(
+    since: Optional[str] = Query(None, description="上次回傳的 next_cursor，未提供時從頭開始完整同步"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    增量同步：取得游標之後異動或刪除的訂單
+
+    用戶端保存回傳的 next_cursor，下次以 since 帶回，只會收到這段期間新增、修改或刪除的訂單；
+    has_more 為 true 時應立即再以 next_cursor 取下一頁。
+
+    Args:
+        since (Optional[str], optional): 上次回傳的 next_cursor. Defaults to None.
+        limit (int, optional): 每頁最多筆數（訂單加刪除紀錄）. Defaults to 500.
+        db (AsyncSession, optional): 非同步資料庫連線（讀主資料庫，副本延遲可能讓游標跳過尚未複寫的異動）. Defaults to Depends(get_async_db).
+
+    Returns:
+        {"orders": List[schemas.OrderOut], "deleted": List[str], "next_cursor": Optional[str], "has_more": bool}，
+        orders 依異動時間舊到新排序，deleted 為被刪除的訂單 ID
+    """
+    orders, deleted, next_cursor, has_more = await async_crud.get_changes(db, since, limit, CHANGES_SETTLE_SECONDS)
+    data = {"orders": orders_to_dicts(orders), "deleted": deleted, "next_cursor": next_cursor, "has_more": has_more}
+    return create_success_json_response(data, message="成功取得訂單異動")
+
+
+@router.get("/export")
+@query_budget(1)
+async def export_orders(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    session_factory: async_sessionmaker = Depends(get_async_read_sessionmaker),
+):
+    """
+    匯出訂單（串流）
+
+    以伺服器端游標逐批讀取訂單並直接串流輸出，單一請求即可匯出任意數量的訂單，
+    記憶體用量固定。
+
+    Args:
+        export_format (ExportFormat, optional): 匯出格式，ndjson（每行一筆訂單）或 csv（每行一個品項）. Defaults to ndjson.
+        date_start (Optional[date], optional): 起始營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        date_end (Optional[date], optional): 結束營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        session_factory (async_sessionmaker, optional): 唯讀的非同步 session factory（可能來自讀取副本）. Defaults to Depends(get_async_read_sessionmaker).
+
+    Returns:
+        StreamingResponse: 依建立時間舊到新排序的訂單資料
+    """
+    # 串流開始後就無法改回傳錯誤，先檢查日期區間
+    created_between(date_start, date_end)
+
+    async def content():
+        # 回應開始串流時路由函數已經返回，session 必須由產生器自己管理
+        async with session_factory() as db:
+            rows = async_crud.stream_orders_for_export(db, date_start, date_end)
+            async for chunk in render_export(rows, export_format):
+                yield chunk
+
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{export_format.value}"'},
+    )
+
+
+@router.get("/events")
+@query_budget(1)  # 補回漏掉的事件；即時事件由行程共用的監聽者查詢，不計入請求
+async def order_events(
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0, description="瀏覽器 EventSource 重連時自動帶上的最後事件編號"),
+    broker: OrderEventBroker = Depends(get_order_event_broker),
+    session_factory: async_sessionmaker = Depends(get_async_sessionmaker),
+):
+    """
+    訂單即時事件（Server-Sent Events）
+
+    訂單新增、修改、狀態異動與刪除時推送事件（event 為 created、updated、status_changed、
+    payment_changed、deleted，data 為異動後的訂單 JSON），用戶端不需要輪詢 get_all_orders。
+    斷線重連時帶 Last-Event-ID（瀏覽器的 EventSource 會自動處理），伺服器先補回漏掉的事件。
+
+    Args:
+        last_event_id (Optional[int], optional): 最後收到的事件編號. Defaults to None.
+        broker (OrderEventBroker, optional): 本行程的事件分送器. Defaults to Depends(get_order_event_broker).
+        session_factory (async_sessionmaker, optional): 補回事件用的非同步 session factory（outbox 讀主資料庫，避免副本延遲漏掉事件）. Defaults to Depends(get_async_sessionmaker).
+
+    Returns:
+        StreamingResponse: text/event-stream 串流
+    """
+    return StreamingResponse(
+        stream_order_events(broker, session_factory, last_event_id),
+        media_type="text/event-stream",
+        # 關閉代理伺服器（nginx）的緩衝，事件才會即時送達
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/product_sales")
+@query_budget(1)
+async def get_product_sales(
+    product_id: Optional[str] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    商品銷售統計
+
+    只統計資料庫中的訂單；涵蓋已封存月份的統計請使用 /reports/products。
+
+    Args:
+        product_id (Optional[str], optional): 只統計指定商品. Defaults to None.
+        date_start (Optional[date], optional): 訂單起始營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        date_end (Optional[date], optional): 訂單結束營業日（含，台灣時間，YYYY-MM-DD）. Defaults to None.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        List[schemas.ProductSalesOut]: 各商品的銷售數量、營業額與訂單數
+    """
+    rows = await async_crud.get_product_sales(db, product_id, date_start, date_end)
+    sales = [schemas.ProductSalesOut.model_validate(row).model_dump() for row in rows]
+    return create_success_json_response(sales, message="成功取得商品銷售統計")
+
+
+@router.get("/search")
+@query_budget(1)
+async def search_orders(
+    q: str = Query(..., min_length=2, max_length=100, description="姓名、電話或電子郵件的部分內容"),
+    field: SearchField = SearchField.ALL,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    搜尋訂單（依顧客姓名、電話或電子郵件的部分內容，不分大小寫）
+
+    3 個字以上比對欄位中任何位置；2 個字只比對欄位開頭（例如姓氏加名字的第一個字）。
+
+    Args:
+        q (str): 搜尋字串，至少 2 個字
+        field (SearchField, optional): 搜尋的欄位，all 表示任一欄位符合. Defaults to all.
+        limit (int, optional): 回傳的筆數上限. Defaults to 50.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
 
     Returns:
-        List[schemas.OrderOut]: 訂單列表
+        List[schemas.OrderOut]: 符合的訂單，依建立時間新到舊排序
     """
-    orders = crud.get_all_orders(db, date_start, date_end, skip, limit)
-    return create_success_response(orders, message="成功取得所有訂單")
+    orders = await async_crud.search_orders(db, q, field, limit)
+    return create_success_json_response(orders_to_dicts(orders), message=f"找到 {len(orders)} 筆訂單")
 
 
 @router.get("/get_order_by_id/{order_id}")
-async def get_order_by_id(order_id: str, db: Session = Depends(get_db)):
+@query_budget(1)
+async def get_order_by_id(order_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """
     根據訂單編號取得訂單
 
     Args:
         order_id (str): 訂單編號
-        db (Session, optional): 資料庫連線. Defaults to Depends(get_db).
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
 
     Returns:
         schemas.OrderOut: 訂單資料
     """
-    # crud 函式會在上游處理好 not found 的情況
-    order = crud.get_order_by_id(db, order_id)
-    return create_success_response(schemas.OrderOut.model_validate(order).model_dump(), message=f"成功取得訂單 #{order_id}")
+    # async_crud 函式會在上游處理好 not found 的情況，並優先使用訂單快取
+    order_json = await async_crud.get_order_json(db, order_id)
+    return create_success_raw_response(order_json, message=f"成功取得訂單 #{order_id}")
 
 
 @router.post("/create_order", status_code=status.HTTP_201_CREATED)
-async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
+@query_budget(13)
+async def create_order(
+    order: schemas.OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255, description="用戶端產生的唯一值，重送相同請求時帶相同的值"),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     建立一筆新的訂單
 
-    - **order**: 訂單資料，包含顧客資訊與購買品項
+    - **order**: 訂單資料，包含顧客資訊與購買品項；品項的名稱與單價以商品目錄為準，
+      不在目錄中或已下架的商品回傳 400
+    - **Idempotency-Key**: 選填。相同 key 與相同內容的重送在保存期間內直接回傳第一次的回應
+      （回應標頭 `Idempotent-Replayed: true`），不會重複建立訂單；相同 key 搭配不同內容回傳 400，
+      第一次的請求仍在處理中時回傳 409；處理中的請求超過 IDEMPOTENCY_LOCK_SECONDS 秒仍未完成時，重送會重新處理
+    - **db**: 資料庫連線
+    """
+    key = None
+    if idempotency_key is not None:
+        key = f"create_order:{idempotency_key}"
+        request_hash = hashlib.sha256(order.model_dump_json().encode()).hexdigest()
+        stored = await idempotency_crud.claim_key(db, key, request_hash, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LOCK_SECONDS)
+        if stored is not None:
+            return Response(
+                content=stored.response_body,
+                status_code=stored.status_code,
+                media_type="application/json",
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+    try:
+        # 以行程內的目錄快照一次填入所有品項的名稱與單價（最多確認一次版本號，目錄有變動時再載入一次）
+        order = _resolve_prices(await product_catalog.get_async(db), order)
+
+        # 產生訂單編號，格式為 ORD-YYYYMMDD-XXXX (當日流水號)，由序號表原子配發
+        order_id = await db.run_sync(order_id_allocator.next_id)
+
+        # 呼叫 CRUD 函式建立訂單並取得回傳的資料庫物件
+        new_order = await async_crud.create_order(db, order, order_id)
+    except Exception:
+        # 建立失敗時釋放 key，讓用戶端可以用同一把 key 重試
+        if key is not None:
+            await idempotency_crud.release_key(db, key)
+        raise
+
+    # 回傳建立好的訂單資料，同時寫入快取（前台下單後通常會立即查詢訂單狀態）
+    response = create_success_raw_response(await cache_order(new_order), message="訂單已成功建立", status_code=201)
+    if key is not None:
+        await idempotency_crud.complete_key(db, key, response.status_code, response.body)
+    return response
+
+
+@router.post("/bulk_create", status_code=status.HTTP_201_CREATED)
+@query_budget(11)
+async def bulk_create_orders(
+    orders: List[Dict[str, Any]] = Body(..., description="OrderCreate 格式的訂單列表"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    批次建立訂單
+
+    逐筆驗證輸入資料並以同一份商品目錄快照填入品項的名稱與單價，驗證通過的訂單一次配發訂單編號，並在同一個交易中以多列
+    INSERT ... RETURNING 寫入；驗證失敗或庫存不足的訂單不影響其他訂單，會在結果中回報原因。
+    庫存依輸入順序逐筆保留，排在前面的訂單優先。
+
+    - **orders**: 訂單資料列表（格式同 create_order），上限 1000 筆
     - **db**: 資料庫連線
+
+    Returns:
+        {"created": int, "failed": int, "results": [...]}，results 依輸入順序排列，
+        每一筆包含 index、success，以及成功時的 order 或失敗時的 errors
+    """
+    if len(orders) > BULK_CREATE_MAX_ORDERS:
+        raise BadRequestException(f"單次最多建立 {BULK_CREATE_MAX_ORDERS} 筆訂單")
+
+    snapshot = await product_catalog.get_async(db)
+    results: List[Dict[str, Any]] = []
+    valid_orders: List[schemas.OrderCreate] = []
+    for index, raw_order in enumerate(orders):
+        try:
+            valid_orders.append(_resolve_prices(snapshot, schemas.OrderCreate.model_validate(raw_order)))
+            results.append({"index": index, "success": True})
+        except ValidationError as e:
+            errors = [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]
+            results.append({"index": index, "success": False, "errors": errors})
+        except BadRequestException as e:
+            results.append({"index": index, "success": False, "errors": [f"item: {e.message}"]})
+
+    created_count = 0
+    if valid_orders:
+        order_ids = await db.run_sync(order_id_allocator.next_ids, len(valid_orders))
+        created, rejected = await async_crud.bulk_create_orders(db, valid_orders, order_ids)
+        created_count = len(created)
+        created = iter(created)
+        valid_results = (result for result in results if result["success"])
+        for index, result in enumerate(valid_results):
+            if index in rejected:
+                result.update(success=False, errors=[f"item: {rejected[index]}"])
+            else:
+                result["order"] = order_to_dict(next(created))
+
+    return create_success_json_response(
+        {"created": created_count, "failed": len(orders) - created_count, "results": results},
+        message=f"已建立 {created_count} 筆訂單",
+        status_code=201,
+    )
+
+
+@router.post("/bulk_update_status")
+@query_budget(5)
+async def bulk_update_order_status(update: schemas.BulkStatusUpdate, db: AsyncSession = Depends(get_async_db)):
     """
-    # 產生訂單編號，格式為 ORD-YYYYMMDD-XXXX (當日流水號)
-    order_id = f"ORD-{datetime.now().strftime('%Y%m%d')}-{crud.get_latest_order_id_number(db) + 1:04d}"
+    批次更新訂單狀態
 
-    # 呼叫 CRUD 函式建立訂單並取得回傳的資料庫物件
-    new_order = crud.create_order(db, order, order_id)
+    以單一 SQL 語句更新所有符合狀態轉換規則的訂單（例如已送達的訂單不能改回待處理），
+    不符合規則或不存在的訂單會列在 skipped 中。
+
+    - **order_ids**: 訂單編號列表
+    - **status**: 新的訂單狀態
+    """
+    updated, skipped = await async_crud.bulk_update_order_status(db, update.order_ids, update.status)
+    return create_success_json_response(
+        {
+            "updated": orders_to_dicts(updated),
+            "skipped": [order.model_dump() for order in skipped],
+        },
+        message=f"已更新 {len(updated)} 筆訂單狀態",
+    )
 
-    # 回傳建立好的訂單資料
-    return create_success_response(schemas.OrderOut.model_validate(new_order).model_dump(), message="訂單已成功建立", status_code=201)
+
+@router.post("/bulk_update_payment_status")
+@query_budget(3)
+async def bulk_update_payment_status(update: schemas.BulkPaymentStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    批次更新付款狀態
+
+    以單一 SQL 語句更新所有符合付款狀態轉換規則的訂單（例如已退款的訂單不能改回未付款），
+    不符合規則或不存在的訂單會列在 skipped 中。
+
+    - **order_ids**: 訂單編號列表
+    - **payment_status**: 新的付款狀態
+    """
+    updated, skipped = await async_crud.bulk_update_payment_status(db, update.order_ids, update.payment_status)
+    return create_success_json_response(
+        {
+            "updated": orders_to_dicts(updated),
+            "skipped": [order.model_dump() for order in skipped],
+        },
+        message=f"已更新 {len(updated)} 筆付款狀態",
+    )
 
 
 @router.post("/delete_order_by_id/{order_id}")
-async def delete_order_by_id(order_id: str, db: Session = Depends(get_db)):
+@query_budget(6)
+async def delete_order_by_id(order_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     刪除訂單
 
     Args:
         order_id (str): 訂單編號
-        db (Session, optional): 資料庫連線. Defaults to Depends(get_db).
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
     """
-    # crud 函式會處理找不到訂單的例外
-    crud.delete_order_by_id(db, order_id)
-    return create_success_response(None, message=f"訂單 #{order_id} 已成功刪除")
+    # async_crud 函式會處理找不到訂單的例外
+    await async_crud.delete_order_by_id(db, order_id)
+    return create_success_json_response(None, message=f"訂單 #{order_id} 已成功刪除")
 
 
 @router.post("/update_order_by_id/{order_id}")
-async def update_order_by_id(order_id: str, order: schemas.OrderCreate, db: Session = Depends(get_db)):
+@query_budget(9)
+async def update_order_by_id(order_id: str, order: schemas.OrderCreate, db: AsyncSession = Depends(get_async_db)):
     """
     更新訂單
+
+    品項的名稱與單價同樣以目前的商品目錄為準。
     """
-    updated_order = crud.update_order_by_id(db, order_id, order)
-    return create_success_response(schemas.OrderOut.model_validate(updated_order).model_dump(), message=f"訂單 #{order_id} 已成功更新")
+    order = _resolve_prices(await product_catalog.get_async(db), order)
+    updated_order = await async_crud.update_order_by_id(db, order_id, order)
+    return create_success_json_response(order_to_dict(updated_order), message=f"訂單 #{order_id} 已成功更新")
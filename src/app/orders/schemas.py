@@ -1,7 +1,7 @@
 # src/app/orders/schemas.py
 
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from .enums import OrderStatus, PaymentStatus
 
@@ -9,9 +9,10 @@ from .enums import OrderStatus, PaymentStatus
 # 品項結構定義
 class OrderItem(BaseModel):
     product_id: str = Field(..., description="商品 ID")
-    name: str = Field(..., description="商品名稱")
-    quantity: int = Field(..., description="數量")
-    price: int = Field(..., description="單價")
+    # 名稱與單價以商品目錄為準，由伺服器填入；只有商品目錄尚未建立時才採用用戶端送來的值
+    name: Optional[str] = Field(None, description="商品名稱（由商品目錄填入）")
+    quantity: int = Field(..., gt=0, description="數量")
+    price: Optional[int] = Field(None, description="單價（由商品目錄填入）")
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -69,3 +70,44 @@ class OrderOut(OrderCreate):
     email: EmailStr
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# 商品銷售統計回傳時使用
+class ProductSalesOut(BaseModel):
+    product_id: str
+    quantity: int
+    revenue: int
+    order_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 批次更新訂單狀態時使用
+class BulkStatusUpdate(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1, max_length=1000, description="訂單編號列表")
+    status: OrderStatus
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {"order_ids": ["ORD-20231201-0001", "ORD-20231201-0002"], "status": "SHIPPED"}
+        }
+    )
+
+
+# 批次更新付款狀態時使用
+class BulkPaymentStatusUpdate(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1, max_length=1000, description="訂單編號列表")
+    payment_status: PaymentStatus
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {"order_ids": ["ORD-20231201-0001", "ORD-20231201-0002"], "payment_status": "PAID"}
+        }
+    )
+
+
+# 批次更新時未更新的訂單
+class SkippedOrder(BaseModel):
+    id: str
+    reason: str = Field(..., description="not_found 或 invalid_transition")
+    current: Optional[str] = Field(None, description="訂單目前的狀態（invalid_transition 時提供）")
@@ -0,0 +1,155 @@
+# src/app/orders/sequence.py
+"""
+訂單編號配發器
+
+訂單編號格式為 ORD-YYYYMMDD-XXXX（營業日的流水號，日期依台灣時間），流水號由 `order_sequences`
+資料表的每日計數列提供。配發只使用一條
+`INSERT ... ON CONFLICT DO UPDATE ... RETURNING` 語句，由資料庫保證原子性，
+不需要先查詢最新訂單、也不會在並發下重複配發。
+
+兩種模式：
+1. block（預設）：以獨立的短交易一次向資料庫預留 block_size 個序號，之後在行程內
+   直接配發。每日計數列只在預留的短交易中鎖定，不會被訂單交易持有到 commit，
+   並發下單不會排隊等待同一列；block_size 大於 1 時平均每筆訂單也不再需要額外的資料庫往返。
+   訂單寫入失敗或行程重啟時，已預留的序號會被放棄（會跳號，但不會重複）。
+2. transaction（需明確指定）：在呼叫端的 session 交易中配發，與訂單寫入一起 commit，
+   交易失敗時序號一併回滾（不跳號）；代價是每日計數列的鎖會持有到訂單 commit，
+   同一天的並發下單依序排隊。
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+from ..core.config import get_settings
+from ..core.database import dialect_insert
+from ..common.exceptions import DatabaseException
+from ..reports.rollup import business_day
+
+
+def format_order_id(day: str, number: int) -> str:
+    """將日期與流水號組成訂單編號，例如 ("20231201", 1) -> "ORD-20231201-0001" """
+    return f"ORD-{day}-{number:04d}"
+
+
+def order_day(moment: Optional[datetime] = None) -> str:
+    """訂單編號中的日期（YYYYMMDD）：與報表、日期篩選相同，依台灣時間的營業日切分，不受主機時區影響"""
+    return business_day(moment).strftime("%Y%m%d")
+
+
+def _reserve(bind, day: str, count: int) -> int:
+    """向資料庫原子地預留 count 個序號，回傳預留區段的最後一個序號"""
+    stmt = dialect_insert(bind, models.OrderSequence).values(day=day, last_value=count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.OrderSequence.day],
+        set_={"last_value": models.OrderSequence.last_value + count},
+    ).returning(models.OrderSequence.last_value)
+    return bind.execute(stmt).scalar_one()
+
+
+class OrderIdAllocator:
+    """訂單編號配發器，可在多執行緒與多個 worker 行程間共用同一張序號表"""
+
+    def __init__(self, block_size: int = 1, in_transaction: bool = False):
+        self.block_size = block_size
+        self.in_transaction = in_transaction
+        self._lock = threading.Lock()
+        self._day = None
+        # 已向資料庫預留、尚未配發的序號區段 [start, end)
+        self._ranges = deque()
+
+    def next_id(self, db: Session) -> str:
+        """配發一個新的訂單編號"""
+        return self.next_ids(db, 1)[0]
+
+    def next_ids(self, db: Session, count: int) -> List[str]:
+        """一次配發 count 個新的訂單編號（同一天內不重複）"""
+        day = order_day()
+        try:
+            if self.in_transaction:
+                last = _reserve(db, day, count)
+                numbers = range(last - count + 1, last + 1)
+            else:
+                numbers = self._take_from_blocks(db, day, count)
+        except SQLAlchemyError as e:
+            raise DatabaseException(f"配發訂單編號時發生錯誤: {e}")
+        return [format_order_id(day, number) for number in numbers]
+
+    def _take_from_blocks(self, db: Session, day: str, count: int) -> List[int]:
+        while True:
+            with self._lock:
+                if self._day != day:
+                    # 換日後前一天剩下的序號就不再使用
+                    self._day = day
+                    self._ranges.clear()
+                if sum(end - start for start, end in self._ranges) >= count:
+                    return self._pop(count)
+
+            # 預留新區段時不持有鎖：資料庫往返期間其他請求仍可取用既有區段，
+            # 多個請求同時補貨只會多預留幾段，序號仍然唯一
+            size = max(self.block_size, count)
+            with db.get_bind().begin() as conn:
+                last = _reserve(conn, day, size)
+
+            with self._lock:
+                if self._day == day:
+                    self._ranges.append([last - size + 1, last + 1])
+
+    def clear(self) -> None:
+        """丟棄行程內尚未配發的序號區段（測試時每個測試使用新的資料庫，序號會重複）"""
+        with self._lock:
+            self._day = None
+            self._ranges.clear()
+
+    def _pop(self, count: int) -> List[int]:
+        numbers = []
+        while len(numbers) < count:
+            block = self._ranges[0]
+            take = min(count - len(numbers), block[1] - block[0])
+            numbers.extend(range(block[0], block[0] + take))
+            block[0] += take
+            if block[0] == block[1]:
+                self._ranges.popleft()
+        return numbers
+
+
+def sync_order_sequences(db: Session) -> int:
+    """依既有訂單重建每日序號計數（舊版以查詢最新訂單編號產生序號，升級時執行一次）
+
+    Returns:
+        int: 更新的日期筆數
+    """
+    try:
+        last_values = {}
+        for (order_id,) in db.query(models.Order.id).filter(models.Order.id.like("ORD-%")):
+            try:
+                _, day, number = order_id.split('-')
+                last_values[day] = max(last_values.get(day, 0), int(number))
+            except ValueError:
+                continue  # 非系統格式的訂單編號不影響流水號
+
+        for day, last_value in last_values.items():
+            stmt = dialect_insert(db, models.OrderSequence).values(day=day, last_value=last_value)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[models.OrderSequence.day],
+                set_={"last_value": last_value},
+                where=models.OrderSequence.last_value < last_value,
+            )
+            db.execute(stmt)
+        db.commit()
+        return len(last_values)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"同步訂單序號時發生錯誤: {e}")
+
+
+# 全域共用的配發器（區段預留狀態需要跨請求保留）
+order_id_allocator = OrderIdAllocator(
+    block_size=get_settings().order_id_block_size,
+    in_transaction=get_settings().order_id_mode == "transaction",
+)
@@ -0,0 +1,65 @@
+# src/app/orders/serializers.py
+"""
+訂單的快速序列化
+
+直接從 Order 資料列讀取欄位組成 dict，交給 orjson 序列化，
+不經過 schemas.OrderOut.model_validate(...).model_dump() 的驗證與轉換。
+欄位與順序和 OrderOut.model_dump() 相同，輸出的 JSON 內容一致。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from . import models
+from .enums import OrderView
+from ..common.exceptions import BadRequestException
+
+# 列表可以選取的欄位（fields=），依 API 輸出的欄位名稱
+ORDER_FIELDS = (
+    "id", "customer_name", "phone", "email", "item", "total_amount",
+    "created_at", "updated_at", "status", "payment_status",
+)
+# 列表摘要（view=summary）的欄位
+SUMMARY_FIELDS = ("id", "customer_name", "status", "total_amount", "created_at")
+
+
+def order_to_dict(order: models.Order) -> Dict[str, Any]:
+    """將訂單轉為與 OrderOut.model_dump() 相同欄位順序的 dict"""
+    return {
+        "customer_name": order.customer_name,
+        "phone": order.phone,
+        "email": order.email,
+        "item": order.item,
+        "id": order.id,
+        "created_at": order.created_at,
+        "status": order.status,
+        "payment_status": order.payment_status,
+    }
+
+
+def orders_to_dicts(orders: Iterable[models.Order]) -> List[Dict[str, Any]]:
+    """將多筆訂單轉為 dict 列表"""
+    return [order_to_dict(order) for order in orders]
+
+
+def order_to_json(order: models.Order) -> bytes:
+    """將訂單直接序列化為 JSON bytes"""
+    return orjson.dumps(order_to_dict(order))
+
+
+def parse_fields(fields: Optional[str], view: OrderView = OrderView.FULL) -> Optional[Tuple[str, ...]]:
+    """解析以逗號分隔的欄位清單（重複的欄位只保留一次），未指定時依 view 決定；
+    回傳 None 表示完整訂單，欄位不存在時拋出 BadRequestException"""
+    if fields is None:
+        return SUMMARY_FIELDS if view == OrderView.SUMMARY else None
+    selected = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in ORDER_FIELDS]
+    if unknown or not selected:
+        raise BadRequestException(f"不支援的欄位: {', '.join(unknown) or fields}（可用欄位: {', '.join(ORDER_FIELDS)}）")
+    return selected
+
+
+def rows_to_dicts(rows: Iterable, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """將只 SELECT 部分欄位的資料列轉為 dict 列表，只保留 fields 中的欄位（依 fields 的順序）"""
+    return [{field: getattr(row, field) for field in fields} for row in rows]
@@ -0,0 +1,26 @@
+# src/app/products/async_crud.py
+"""products CRUD 的非同步版本，透過 `AsyncSession.run_sync` 執行 `crud.py` 中的同名函式"""
+
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models, schemas
+
+
+async def get_product(db: AsyncSession, product_id: str) -> models.Product:
+    """非同步版本的 crud.get_product"""
+    return await db.run_sync(crud.get_product, product_id)
+
+
+async def list_products(db: AsyncSession, include_inactive: bool = False, skip: int = 0, limit: int = 100) -> List[models.Product]:
+    """非同步版本的 crud.list_products"""
+    return await db.run_sync(crud.list_products, include_inactive, skip, limit)
+
+
+async def create_product(db: AsyncSession, product: schemas.ProductCreate) -> models.Product:
+    """非同步版本的 crud.create_product"""
+    return await db.run_sync(crud.create_product, product)
+
+
+async def update_product(db: AsyncSession, product_id: str, changes: schemas.ProductUpdate) -> models.Product:
+    """非同步版本的 crud.update_product"""
+    return await db.run_sync(crud.update_product, product_id, changes)
@@ -0,0 +1,101 @@
+# src/app/products/catalog.py
+"""
+行程內的商品目錄快照
+
+下單時品項的名稱與單價不採用用戶端送來的值，而是以商品目錄為準。為了不在結帳時
+逐筆查詢商品，每個 worker 行程在記憶體中保留一份不可變的目錄快照：
+1. 快照帶有載入時的目錄版本號（`product_catalog_version`，商品寫入時在同一個交易中遞增）
+2. 取得快照時最多每 check_interval 秒查詢一次版本號；版本沒變就沿用快照，
+   變了才以一次查詢重新載入整份目錄
+3. 本行程寫入商品後呼叫 invalidate()，下一次取得快照時立即檢查版本；
+   其他行程最晚在 check_interval 秒後看到新的價格
+
+目錄中還沒有任何商品時（尚未匯入目錄的過渡期），沿用用戶端送來的名稱與單價。
+"""
+
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import crud
+from ..common.exceptions import BadRequestException
+from ..core.config import get_settings
+
+
+class CatalogSnapshot(NamedTuple):
+    """某個版本的商品目錄，載入後不再修改，可在多個請求間共用"""
+    version: int
+    # 販售中商品的 {商品 ID: (名稱, 單價)}
+    prices: Dict[str, Tuple[str, int]]
+    # 目錄中是否有任何商品（含下架），沒有時為過渡期，沿用用戶端的名稱與單價
+    enabled: bool
+
+    def resolve_items(self, items: Iterable) -> List[dict]:
+        """以目錄的名稱與單價填入品項（含 product_id、quantity、name、price 屬性），回傳品項 dict 列表
+
+        不在目錄中或已下架的商品拋出 BadRequestException；過渡期缺少名稱或單價時也拋出 BadRequestException。
+        """
+        resolved = []
+        unknown = []
+        for item in items:
+            if not self.enabled:
+                if item.name is None or item.price is None:
+                    raise BadRequestException(f"商品目錄尚未建立，品項 {item.product_id} 必須提供名稱與單價")
+                name, price = item.name, item.price
+            elif item.product_id in self.prices:
+                name, price = self.prices[item.product_id]
+            else:
+                unknown.append(item.product_id)
+                continue
+            resolved.append({"product_id": item.product_id, "name": name, "quantity": item.quantity, "price": price})
+        if unknown:
+            raise BadRequestException(f"商品不存在或已下架: {', '.join(dict.fromkeys(unknown))}")
+        return resolved
+
+
+class ProductCatalog:
+    """取得目前的商品目錄快照，依版本號決定是否重新載入"""
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._snapshot = None
+        # 上次確認版本號的時間（time.monotonic()）
+        self._checked_at = float("-inf")
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        """取得商品目錄快照；距離上次確認未超過 check_interval 秒時不查詢資料庫
+
+        不加鎖：非同步 session 的查詢期間會讓出事件迴圈，加鎖會讓同一個執行緒上的其他請求卡住；
+        同時有多個請求重新載入時只是多查一次，結果相同。
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        # 先讀版本號再讀目錄：兩者之間有寫入時快照內容較新、版本號較舊，下一次檢查會再載入一次，不會留下舊價格
+        version = crud.get_catalog_version(db)
+        if snapshot is None or snapshot.version != version:
+            prices, total = crud.get_catalog(db)
+            snapshot = CatalogSnapshot(version, prices, total > 0)
+            self._snapshot = snapshot
+        self._checked_at = now
+        return snapshot
+
+    async def get_async(self, db: AsyncSession) -> CatalogSnapshot:
+        """非同步版本的 get"""
+        return await db.run_sync(self.get)
+
+    def invalidate(self) -> None:
+        """本行程寫入商品後呼叫，下一次取得快照時立即檢查版本號"""
+        self._checked_at = float("-inf")
+
+    def clear(self) -> None:
+        """丟棄快照（測試時每個測試使用新的資料庫，版本號會重複）"""
+        self._snapshot = None
+        self._checked_at = float("-inf")
+
+
+# 本行程的商品目錄
+product_catalog = ProductCatalog(check_interval=get_settings().product_catalog_check_seconds)
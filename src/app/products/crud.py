@@ -0,0 +1,96 @@
+# src/app/products/crud.py
+
+from typing import Dict, List, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from . import models, schemas
+from ..core.database import dialect_insert
+from ..common.exceptions import ConflictException, DatabaseException, NotFoundException
+
+# CatalogVersion 唯一一列的主鍵
+CATALOG_VERSION_ID = 1
+
+
+def _bump_catalog_version(db: Session) -> None:
+    """在呼叫端的交易中遞增目錄版本號（不存在時建立）"""
+    stmt = dialect_insert(db, models.CatalogVersion).values(id=CATALOG_VERSION_ID, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.CatalogVersion.id],
+        set_={"version": models.CatalogVersion.version + 1},
+    ))
+
+
+def get_catalog_version(db: Session) -> int:
+    """目前的目錄版本號，從未寫入過商品時為 0"""
+    try:
+        return db.scalar(select(models.CatalogVersion.version).where(models.CatalogVersion.id == CATALOG_VERSION_ID)) or 0
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品目錄版本時發生錯誤: {e}")
+
+
+def get_catalog(db: Session) -> Tuple[Dict[str, Tuple[str, int]], int]:
+    """以一次查詢取得所有販售中商品的 {商品 ID: (名稱, 單價)} 與商品總數（含下架）"""
+    try:
+        rows = db.execute(select(models.Product.id, models.Product.name, models.Product.price, models.Product.is_active)).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"載入商品目錄時發生錯誤: {e}")
+    return {row.id: (row.name, row.price) for row in rows if row.is_active}, len(rows)
+
+
+def get_product(db: Session, product_id: str) -> models.Product:
+    """根據商品 ID 取得商品，不存在時拋出 NotFoundException。"""
+    try:
+        product = db.get(models.Product, product_id)
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品 (ID: {product_id}) 時發生錯誤: {e}")
+    if product is None:
+        raise NotFoundException(resource_name="Product", resource_id=product_id)
+    return product
+
+
+def list_products(db: Session, include_inactive: bool = False, skip: int = 0, limit: int = 100) -> List[models.Product]:
+    """依商品 ID 排序列出商品，預設只列出販售中的商品。"""
+    query = select(models.Product)
+    if not include_inactive:
+        query = query.where(models.Product.is_active.is_(True))
+    try:
+        return db.scalars(query.order_by(models.Product.id).offset(skip).limit(limit)).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品清單時發生錯誤: {e}")
+
+
+def create_product(db: Session, product: schemas.ProductCreate) -> models.Product:
+    """新增商品並遞增目錄版本，商品 ID 已存在時拋出 ConflictException。"""
+    try:
+        db_product = db.scalars(
+            dialect_insert(db, models.Product).values(**product.model_dump()).returning(models.Product)
+        ).one()
+        _bump_catalog_version(db)
+        db.commit()
+        return db_product
+    except IntegrityError:
+        db.rollback()
+        raise ConflictException(f"商品 ID 已存在: {product.id}")
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"新增商品時發生錯誤: {e}")
+
+
+def update_product(db: Session, product_id: str, changes: schemas.ProductUpdate) -> models.Product:
+    """以單一 UPDATE ... RETURNING 更新商品有提供的欄位並遞增目錄版本，不存在時拋出 NotFoundException。"""
+    values = changes.model_dump(exclude_none=True)
+    if not values:
+        return get_product(db, product_id)
+    try:
+        db_product = db.scalars(
+            update(models.Product).where(models.Product.id == product_id).values(values).returning(models.Product)
+        ).one_or_none()
+        if db_product is None:
+            raise NotFoundException(resource_name="Product", resource_id=product_id)
+        _bump_catalog_version(db)
+        db.commit()
+        return db_product
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseException(f"更新商品 (ID: {product_id}) 時發生錯誤: {e}")
@@ -0,0 +1,23 @@
+# src/app/products/models.py
+
+from sqlalchemy import Boolean, Column, Integer, String
+from ..core.database import Base, UTCDateTime, utc_now
+
+
+class Product(Base):
+    """商品目錄，下單時品項的名稱與單價一律以這裡為準"""
+    __tablename__ = "products"
+
+    id = Column(String, primary_key=True)                             # 商品 ID（對應訂單品項的 product_id）
+    name = Column(String, nullable=False)                             # 商品名稱
+    price = Column(Integer, nullable=False)                           # 單價
+    is_active = Column(Boolean, nullable=False, default=True)         # 是否販售中，下架的商品不能下單
+    updated_at = Column(UTCDateTime, nullable=False, default=utc_now, onupdate=utc_now)  # 最後異動時間（UTC）
+
+
+class CatalogVersion(Base):
+    """商品目錄的版本號，只有一列；每次寫入商品時在同一個交易中遞增，各行程據此判斷記憶體中的目錄是否過期"""
+    __tablename__ = "product_catalog_version"
+
+    id = Column(Integer, primary_key=True)                  # 固定為 1
+    version = Column(Integer, nullable=False, default=0)    # 目錄版本號
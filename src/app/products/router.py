@@ -0,0 +1,117 @@
+# src/app/products/router.py
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..common.deps import get_async_db, get_async_read_db
+from ..common.responses import create_success_json_response
+from ..core.querylog import query_budget
+from . import async_crud, schemas
+from .catalog import product_catalog
+
+# 建立路由器
+router = APIRouter(
+    prefix="/products",
+    tags=["商品目錄"],
+    responses={
+        404: {"description": "商品未找到"},
+        409: {"description": "商品 ID 已存在"},
+    }
+)
+
+
+def _product_out(product) -> dict:
+    return schemas.ProductOut.model_validate(product).model_dump(mode="json")
+
+
+@router.get("")
+@query_budget(1)
+async def list_products(
+    include_inactive: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    列出商品目錄
+
+    Args:
+        include_inactive (bool, optional): 是否包含已下架的商品. Defaults to False.
+        skip (int, optional): 跳過的筆數. Defaults to 0.
+        limit (int, optional): 限制回傳的筆數. Defaults to 100.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        List[schemas.ProductOut]: 依商品 ID 排序的商品
+    """
+    products = await async_crud.list_products(db, include_inactive, skip, limit)
+    return create_success_json_response([_product_out(product) for product in products], message="成功取得商品清單")
+
+
+@router.get("/{product_id}")
+@query_budget(1)
+async def get_product(product_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    取得商品
+
+    Args:
+        product_id (str): 商品 ID
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        schemas.ProductOut: 商品
+    """
+    product = await async_crud.get_product(db, product_id)
+    return create_success_json_response(_product_out(product), message=f"成功取得商品 {product_id}")
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+@query_budget(2)
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    新增商品，之後下單時該商品的名稱與單價以目錄為準
+
+    Args:
+        product (schemas.ProductCreate): 商品資料
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+
+    Returns:
+        schemas.ProductOut: 新增的商品
+    """
+    created = await async_crud.create_product(db, product)
+    product_catalog.invalidate()
+    return create_success_json_response(_product_out(created), message=f"已新增商品 {product.id}", status_code=201)
+
+
+@router.patch("/{product_id}")
+@query_budget(2)
+async def update_product(product_id: str, changes: schemas.ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    更新商品的名稱、單價或販售狀態；已建立的訂單保留下單當時的名稱與單價
+
+    Args:
+        product_id (str): 商品 ID
+        changes (schemas.ProductUpdate): 要更新的欄位
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+
+    Returns:
+        schemas.ProductOut: 更新後的商品
+    """
+    updated = await async_crud.update_product(db, product_id, changes)
+    product_catalog.invalidate()
+    return create_success_json_response(_product_out(updated), message=f"已更新商品 {product_id}")
+
+
+@router.delete("/{product_id}")
+@query_budget(2)
+async def deactivate_product(product_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    下架商品（保留資料，之後不能再下單）
+
+    Args:
+        product_id (str): 商品 ID
+        db (AsyncSession, optional): 非同步資料庫連線. Defaults to Depends(get_async_db).
+    """
+    await async_crud.update_product(db, product_id, schemas.ProductUpdate(is_active=False))
+    product_catalog.invalidate()
+    return create_success_json_response(None, message=f"已下架商品 {product_id}")
@@ -0,0 +1,28 @@
+# src/app/products/schemas.py
+
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+from datetime import datetime
+
+
+class ProductCreate(BaseModel):
+    id: str = Field(..., min_length=1, max_length=100, description="商品 ID")
+    name: str = Field(..., min_length=1, description="商品名稱")
+    price: int = Field(..., ge=0, description="單價")
+    is_active: bool = Field(True, description="是否販售中")
+
+
+class ProductUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, description="商品名稱")
+    price: Optional[int] = Field(None, ge=0, description="單價")
+    is_active: Optional[bool] = Field(None, description="是否販售中")
+
+
+class ProductOut(BaseModel):
+    id: str
+    name: str
+    price: int
+    is_active: bool
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,23 @@
+# src/app/reports/async_crud.py
+"""reports CRUD 的非同步版本，透過 `AsyncSession.run_sync` 執行 `crud.py` 中的同名函式"""
+
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, schemas
+
+
+async def get_daily_report(db: AsyncSession, date_start: Optional[date] = None, date_end: Optional[date] = None) -> List[schemas.DailyReportOut]:
+    """非同步版本的 crud.get_daily_report"""
+    return await db.run_sync(crud.get_daily_report, date_start, date_end)
+
+
+async def get_product_report(
+    db: AsyncSession,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    limit: int = 20,
+) -> List[Row]:
+    """非同步版本的 crud.get_product_report"""
+    return await db.run_sync(crud.get_product_report, date_start, date_end, limit)
@@ -0,0 +1,63 @@
+# src/app/reports/crud.py
+
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import Row, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from . import models, schemas
+from ..common.exceptions import DatabaseException
+
+
+def get_daily_report(db: Session, date_start: Optional[date] = None, date_end: Optional[date] = None) -> List[schemas.DailyReportOut]:
+    """從每日彙總表取出區間內每天的訂單數、營業額與狀態異動次數（舊到新），查詢量只與天數有關。"""
+    try:
+        sales_query = select(models.DailySales).order_by(models.DailySales.day)
+        status_query = select(models.DailyStatusCount)
+        if date_start:
+            sales_query = sales_query.where(models.DailySales.day >= date_start)
+            status_query = status_query.where(models.DailyStatusCount.day >= date_start)
+        if date_end:
+            sales_query = sales_query.where(models.DailySales.day <= date_end)
+            status_query = status_query.where(models.DailyStatusCount.day <= date_end)
+
+        reports = {
+            row.day: schemas.DailyReportOut(day=row.day, order_count=row.order_count, revenue=row.revenue)
+            for row in db.scalars(sales_query)
+        }
+        for row in db.scalars(status_query):
+            if row.count:
+                report = reports.setdefault(row.day, schemas.DailyReportOut(day=row.day, order_count=0, revenue=0))
+                report.status_counts[row.status] = row.count
+        return sorted(reports.values(), key=lambda report: report.day)
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢每日營業報表時發生錯誤: {e}")
+
+
+def get_product_report(
+    db: Session,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    limit: int = 20,
+) -> List[Row]:
+    """從每日商品彙總表加總區間內各商品的銷量與營業額，依營業額由高到低取前 limit 名。"""
+    try:
+        revenue = func.sum(models.DailyProductSales.revenue).label("revenue")
+        query = (
+            select(
+                models.DailyProductSales.product_id,
+                func.sum(models.DailyProductSales.quantity).label("quantity"),
+                revenue,
+            )
+            .group_by(models.DailyProductSales.product_id)
+            .having(func.sum(models.DailyProductSales.quantity) != 0)
+            .order_by(revenue.desc(), models.DailyProductSales.product_id)
+            .limit(limit)
+        )
+        if date_start:
+            query = query.where(models.DailyProductSales.day >= date_start)
+        if date_end:
+            query = query.where(models.DailyProductSales.day <= date_end)
+        return db.execute(query).all()
+    except SQLAlchemyError as e:
+        raise DatabaseException(f"查詢商品銷售排行時發生錯誤: {e}")
@@ -0,0 +1,32 @@
+# src/app/reports/models.py
+
+from sqlalchemy import Column, Date, Integer, String
+from ..core.database import Base
+
+
+class DailySales(Base):
+    """每日營業額彙總（以訂單建立日期歸屬），一天一列，隨訂單建立、修改與刪除增量更新"""
+    __tablename__ = "report_daily_sales"
+
+    day = Column(Date, primary_key=True)                      # 營業日
+    order_count = Column(Integer, nullable=False, default=0)  # 訂單數
+    revenue = Column(Integer, nullable=False, default=0)      # 營業額（數量 × 單價）
+
+
+class DailyProductSales(Base):
+    """每日各商品銷售彙總（以訂單建立日期歸屬）"""
+    __tablename__ = "report_daily_product_sales"
+
+    day = Column(Date, primary_key=True)                   # 營業日
+    product_id = Column(String, primary_key=True)          # 商品 ID
+    quantity = Column(Integer, nullable=False, default=0)  # 銷售數量
+    revenue = Column(Integer, nullable=False, default=0)   # 營業額
+
+
+class DailyStatusCount(Base):
+    """每日訂單狀態異動次數：當天有多少筆訂單進入該狀態（建立訂單算一次進入 PENDING）"""
+    __tablename__ = "report_daily_status_counts"
+
+    day = Column(Date, primary_key=True)                # 異動日
+    status = Column(String, primary_key=True)           # 訂單狀態
+    count = Column(Integer, nullable=False, default=0)  # 進入該狀態的訂單數
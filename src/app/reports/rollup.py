@@ -0,0 +1,175 @@
+# src/app/reports/rollup.py
+"""
+報表彙總表的增量更新
+
+orders 的寫入函式在同一個交易中呼叫這裡的函式，把該次寫入造成的差額
+（訂單數、營業額、商品銷量、狀態異動）以 `INSERT ... ON CONFLICT DO UPDATE`
+累加到彙總表；訂單寫入回滾時彙總一併回滾，兩邊不會不一致。
+
+每種彙總表每次寫入最多一條語句：差額先在 Python 中依主鍵合併，
+同一條多列 upsert 不會重複命中同一列（PostgreSQL 不允許）。
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from ..core.database import dialect_insert
+
+# 營業日以台灣時間（UTC+8）切分，與訂單建立時間的時區相同
+BUSINESS_TZ = timezone(timedelta(hours=8))
+
+
+def business_day(moment: Optional[datetime] = None) -> date:
+    """回傳時間點所屬的營業日；未指定時為現在。不含時區的時間視為已是台灣時間"""
+    if moment is None:
+        moment = datetime.now(BUSINESS_TZ)
+    elif moment.tzinfo is not None:
+        moment = moment.astimezone(BUSINESS_TZ)
+    return moment.date()
+
+
+def business_day_start(day: date) -> datetime:
+    """營業日的開始時間（台灣時間 00:00，含時區）"""
+    return datetime.combine(day, time.min, tzinfo=BUSINESS_TZ)
+
+
+class RollupDelta:
+    """累積一次寫入對彙總表造成的差額，最後以 apply() 一次寫入"""
+
+    def __init__(self):
+        self.sales: Dict[date, List[int]] = defaultdict(lambda: [0, 0])           # day -> [order_count, revenue]
+        self.products: Dict[Tuple[date, str], List[int]] = defaultdict(lambda: [0, 0])  # (day, product_id) -> [quantity, revenue]
+        self.statuses: Dict[Tuple[date, str], int] = defaultdict(int)            # (day, status) -> count
+
+    def add_order(self, day: date, items: Iterable[dict], sign: int = 1) -> None:
+        """計入（sign=1）或扣除（sign=-1）一筆訂單"""
+        self.sales[day][0] += sign
+        self.add_items(day, items, sign)
+
+    def add_items(self, day: date, items: Iterable[dict], sign: int = 1) -> None:
+        """計入或扣除品項的銷量與營業額（不影響訂單數）"""
+        for item in items:
+            quantity = item["quantity"] * sign
+            revenue = item["quantity"] * item["price"] * sign
+            self.sales[day][1] += revenue
+            product = self.products[(day, item["product_id"])]
+            product[0] += quantity
+            product[1] += revenue
+
+    def add_status(self, day: date, status: str, count: int = 1) -> None:
+        """計入進入某狀態的訂單數"""
+        self.statuses[(day, status)] += count
+
+    def apply(self, db: Session) -> None:
+        """將累積的差額寫入彙總表（在呼叫端的交易中，不 commit）"""
+        sales = [
+            {"day": day, "order_count": order_count, "revenue": revenue}
+            for day, (order_count, revenue) in self.sales.items()
+            if order_count or revenue
+        ]
+        products = [
+            {"day": day, "product_id": product_id, "quantity": quantity, "revenue": revenue}
+            for (day, product_id), (quantity, revenue) in self.products.items()
+            if quantity or revenue
+        ]
+        statuses = [
+            {"day": day, "status": status, "count": count}
+            for (day, status), count in self.statuses.items()
+            if count
+        ]
+        _upsert_add(db, models.DailySales, sales, ["day"], ["order_count", "revenue"])
+        _upsert_add(db, models.DailyProductSales, products, ["day", "product_id"], ["quantity", "revenue"])
+        _upsert_add(db, models.DailyStatusCount, statuses, ["day", "status"], ["count"])
+
+
+def _upsert_add(db: Session, model, rows: List[dict], keys: List[str], columns: List[str]) -> None:
+    """以單一多列 upsert 將 rows 的數值累加到既有資料列（不存在時新增）
+
+    rows 依 keys 排序後才寫入，所有交易都以相同的順序鎖定彙總表的資料列，
+    同時寫入相同幾天（或商品、狀態）的交易只會互相等待，不會死結。
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+    stmt = dialect_insert(db, model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, key) for key in keys],
+        set_={column: getattr(model, column) + getattr(stmt.excluded, column) for column in columns},
+    )
+    db.execute(stmt)
+
+
+def record_orders_created(db: Session, orders: Iterable[Tuple[datetime, Iterable[dict]]], status: str) -> None:
+    """計入新建立的訂單：orders 為 (created_at, 品項 dict 列表)，status 為初始狀態"""
+    delta = RollupDelta()
+    for created_at, items in orders:
+        day = business_day(created_at)
+        delta.add_order(day, items)
+        delta.add_status(day, status)
+    delta.apply(db)
+
+
+def record_items_replaced(db: Session, created_at: datetime, old_items: Iterable[dict], new_items: Iterable[dict]) -> None:
+    """訂單品項被整批替換時，扣除舊品項並計入新品項（歸屬於訂單建立日）"""
+    day = business_day(created_at)
+    delta = RollupDelta()
+    delta.add_items(day, old_items, sign=-1)
+    delta.add_items(day, new_items)
+    delta.apply(db)
+
+
+def record_order_deleted(db: Session, created_at: datetime, items: Iterable[dict]) -> None:
+    """扣除被刪除的訂單（狀態異動次數是歷史事件，不扣除）"""
+    delta = RollupDelta()
+    delta.add_order(business_day(created_at), items, sign=-1)
+    delta.apply(db)
+
+
+def record_status_changes(db: Session, status: str, count: int) -> None:
+    """計入今天有 count 筆訂單進入 status
+
+    count 只能包含狀態真的改變的訂單（由帶有轉換規則的 UPDATE ... RETURNING 取得），
+    已經在 status 的訂單重複設定同一個狀態不可計入，否則各狀態的計數會逐漸偏離。
+    """
+    delta = RollupDelta()
+    delta.add_status(business_day(), status, count)
+    delta.apply(db)
+
+
+def rebuild_rollups(db: Session, archived_orders: Iterable[dict] = ()) -> int:
+    """由 orders 與 order_items 重新計算全部彙總表，回傳彙總的天數
+
+    供初次部署或修復使用。狀態異動的歷史無法從訂單還原，
+    重建後的狀態計數改以「各建立日的訂單目前所在狀態」近似。
+    已封存的訂單不在資料庫中，由 archived_orders（`orders.archive.iter_archived_orders()`）一併計入。
+    """
+    from ..orders.models import Order, OrderItem
+
+    delta = RollupDelta()
+    orders = db.execute(select(Order.created_at, Order.status))
+    for created_at, status in orders:
+        day = business_day(created_at)
+        delta.sales[day][0] += 1
+        delta.add_status(day, status.value)
+    items = db.execute(
+        select(Order.created_at, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+        .join(Order, Order.id == OrderItem.order_id)
+    ).mappings()
+    for item in items:
+        delta.add_items(business_day(item["created_at"]), [item])
+    for order in archived_orders:
+        day = business_day(datetime.fromisoformat(order["created_at"]))
+        delta.add_order(day, order["item"])
+        delta.add_status(day, order["status"])
+
+    db.query(models.DailySales).delete()
+    db.query(models.DailyProductSales).delete()
+    db.query(models.DailyStatusCount).delete()
+    delta.apply(db)
+    db.commit()
+    return len(delta.sales)
@@ -0,0 +1,69 @@
+# src/app/reports/router.py
+
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..common.deps import get_async_read_db
+from ..common.responses import create_success_json_response
+from ..core.querylog import query_budget
+from . import async_crud, schemas
+
+# 建立路由器
+router = APIRouter(
+    prefix="/reports",
+    tags=["營業報表"],
+    responses={
+        400: {"description": "請求資料錯誤"},
+    }
+)
+
+
+@router.get("/daily")
+@query_budget(2)
+async def get_daily_report(
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    每日營業報表
+
+    由每日彙總表直接回傳，不掃描訂單資料，查詢時間與訂單總數無關。
+
+    Args:
+        date_start (Optional[date], optional): 起始營業日（含）. Defaults to None.
+        date_end (Optional[date], optional): 結束營業日（含）. Defaults to None.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        List[schemas.DailyReportOut]: 每天的訂單數、營業額與進入各狀態的訂單數
+    """
+    reports = await async_crud.get_daily_report(db, date_start, date_end)
+    return create_success_json_response([report.model_dump() for report in reports], message="成功取得每日營業報表")
+
+
+@router.get("/products")
+@query_budget(1)
+async def get_product_report(
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    商品銷售排行
+
+    Args:
+        date_start (Optional[date], optional): 起始營業日（含）. Defaults to None.
+        date_end (Optional[date], optional): 結束營業日（含）. Defaults to None.
+        limit (int, optional): 回傳的商品數. Defaults to 20.
+        db (AsyncSession, optional): 唯讀的非同步資料庫連線（可能來自讀取副本）. Defaults to Depends(get_async_read_db).
+
+    Returns:
+        List[schemas.ProductReportOut]: 依營業額由高到低排序的商品銷量與營業額
+    """
+    rows = await async_crud.get_product_report(db, date_start, date_end, limit)
+    products = [schemas.ProductReportOut.model_validate(row).model_dump() for row in rows]
+    return create_success_json_response(products, message="成功取得商品銷售排行")
@@ -0,0 +1,20 @@
+# src/app/reports/schemas.py
+
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict
+from datetime import date
+
+
+class DailyReportOut(BaseModel):
+    day: date = Field(..., description="營業日")
+    order_count: int = Field(..., description="訂單數")
+    revenue: int = Field(..., description="營業額")
+    status_counts: Dict[str, int] = Field(default_factory=dict, description="當天進入各狀態的訂單數")
+
+
+class ProductReportOut(BaseModel):
+    product_id: str = Field(..., description="商品 ID")
+    quantity: int = Field(..., description="銷售數量")
+    revenue: int = Field(..., description="營業額")
+
+    model_config = ConfigDict(from_attributes=True)
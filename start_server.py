@@ -3,16 +3,52 @@
 Tamago API 服務器啟動腳本
 
 使用方式:
-    python start_server.py          # 開發模式 (熱重載)
-    python start_server.py --prod   # 生產模式
+    python start_server.py                      # 開發模式 (熱重載)
+    python start_server.py --prod               # 生產模式 (worker 數取自 WEB_CONCURRENCY，預設 1)
+    python start_server.py --prod --workers 0   # 生產模式，每個 CPU 核心一個 worker
 """
 
+import os
 import sys
 import subprocess
 import argparse
 
+from dotenv import load_dotenv
+
+
+def resolve_workers(workers):
+    """決定 worker 行程數：未指定時讀取 WEB_CONCURRENCY，0 表示使用所有 CPU 核心"""
+    if workers is None:
+        workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def max_db_connections(workers):
+    """估算所有 worker 合計最多會開啟的資料庫連線數（每個 worker 有同步與非同步兩個連線池）"""
+    pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    return workers * 2 * (pool_size + max_overflow)
+
+
+def multi_worker_warnings(workers):
+    """多個 worker 行程時，回傳各行程狀態不共享而需要注意的事項"""
+    if workers <= 1:
+        return []
+    warnings = [
+        "/metrics 的指標是每個 worker 行程各自累計的，Prometheus 每次抓取只會拿到其中一個行程的數字",
+    ]
+    if os.getenv("ORDER_CACHE_BACKEND", "memory") == "memory":
+        warnings.insert(0, (
+            "ORDER_CACHE_BACKEND=memory 的訂單快取在 worker 之間不共享，寫入只會讓處理它的行程失效，"
+            "其他行程最長會回傳 ORDER_CACHE_TTL 秒的舊資料；多 worker 部署請改用 ORDER_CACHE_BACKEND=redis"
+        ))
+    return warnings
+
 
 def main():
+    load_dotenv()
     parser = argparse.ArgumentParser(description="啟動 Tamago API 服務器")
     parser.add_argument(
         "--prod",
@@ -31,6 +67,13 @@ def main():
         help="端口號 (預設: 8000)"
     )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="生產模式的 worker 行程數，0 表示每個 CPU 核心一個 (預設: WEB_CONCURRENCY 或 1)"
+    )
+
     args = parser.parse_args()
 
     # 基本指令
@@ -47,7 +90,13 @@ def main():
         print(f"🚀 啟動開發服務器於 http://{args.host}:{args.port}")
         print(f"📝 API 文件：http://{args.host}:{args.port}/docs")
     else:
-        print(f"🏭 啟動生產服務器於 http://{args.host}:{args.port}")
+        # 多個 worker 行程各自匯入 app 並建立自己的 engine 與連線池，不共用連線
+        workers = resolve_workers(args.workers)
+        cmd.extend(["--workers", str(workers)])
+        print(f"🏭 啟動生產服務器於 http://{args.host}:{args.port}（{workers} 個 worker）")
+        print(f"🔌 資料庫連線數上限約 {max_db_connections(workers)}（workers × 2 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)）")
+        for warning in multi_worker_warnings(workers):
+            print(f"⚠️  {warning}")
 
     try:
         subprocess.run(cmd, check=True)
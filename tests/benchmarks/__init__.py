@@ -0,0 +1 @@
+# 讓 benchmarks 目錄成為 Python 套件
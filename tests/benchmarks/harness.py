@@ -0,0 +1,275 @@
+"""
+orders API 效能基準測試工具
+
+1. BenchmarkDatabase：建立（或連到）測試資料庫並灌入指定數量的訂單
+2. run_scenario：以行程內 ASGI 傳輸（httpx.ASGITransport，不經過網路）並發送出請求，
+   量測吞吐量與 p50/p99 延遲
+3. run_benchmarks：依序執行 create、get_by_id、list、update_status、export 各情境
+4. write_results / compare_results：以 JSON 保存結果並與先前的結果比較
+
+資料庫連線以 dependency_overrides 替換，與 tests/conftest.py 的做法相同，
+不會動到 .env 指定的正式資料庫。
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.common.deps import get_async_db, get_async_read_db, get_async_read_sessionmaker, get_async_sessionmaker, get_db
+from app.core.database import Base, enable_sqlite_foreign_keys, to_async_uri
+from app.core.metrics import instrument_engine
+from app.orders import crud, schemas
+from app.orders.sequence import format_order_id
+
+# 灌入的訂單使用固定的日期，不會和基準測試中新建立的訂單編號衝突
+SEED_DAY = "20000101"
+SEED_BATCH_SIZE = 1000
+
+ORDER_PAYLOAD = {
+    "customer_name": "王小明",
+    "phone": "0912345678",
+    "email": "xiao.ming@example.com",
+    "item": [
+        {"product_id": "cake001", "name": "草莓蛋糕", "quantity": 2, "price": 150},
+        {"product_id": "pudding002", "name": "焦糖布丁", "quantity": 1, "price": 80},
+    ],
+}
+
+
+@dataclass
+class ScenarioResult:
+    """單一情境的量測結果（延遲單位為毫秒）"""
+    name: str
+    requests: int
+    concurrency: int
+    errors: int
+    duration_s: float
+    throughput_rps: float
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    extra: Dict[str, float] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近排名法（nearest-rank）百分位數，sorted_values 必須已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # 無條件進位
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(name: str, latencies: List[float], errors: int, duration: float, concurrency: int) -> ScenarioResult:
+    """將每個請求的延遲（秒）彙總為 ScenarioResult"""
+    values = sorted(latency * 1000 for latency in latencies)
+    return ScenarioResult(
+        name=name,
+        requests=len(values),
+        concurrency=concurrency,
+        errors=errors,
+        duration_s=round(duration, 4),
+        throughput_rps=round(len(values) / duration, 2) if duration else 0.0,
+        p50_ms=round(percentile(values, 50), 3),
+        p99_ms=round(percentile(values, 99), 3),
+        mean_ms=round(statistics.fmean(values), 3) if values else 0.0,
+        max_ms=round(values[-1], 3) if values else 0.0,
+    )
+
+
+class BenchmarkDatabase:
+    """基準測試用的資料庫與對應的 API dependency 替換"""
+
+    def __init__(self, db_uri: str):
+        self.db_uri = db_uri
+        connect_args = {"check_same_thread": False} if make_url(db_uri).get_backend_name() == "sqlite" else {}
+        self.engine = create_engine(db_uri, connect_args=connect_args)
+        enable_sqlite_foreign_keys(self.engine)
+        self.async_engine = create_async_engine(to_async_uri(db_uri))
+        enable_sqlite_foreign_keys(self.async_engine.sync_engine)
+        instrument_engine(self.engine, "sync")
+        instrument_engine(self.async_engine.sync_engine, "async")
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_session_factory = async_sessionmaker(bind=self.async_engine, autoflush=False, expire_on_commit=False)
+
+    def reset(self) -> None:
+        """重建所有資料表（會清除既有資料）"""
+        Base.metadata.drop_all(bind=self.engine)
+        Base.metadata.create_all(bind=self.engine)
+
+    def seed(self, count: int) -> List[str]:
+        """以批次寫入灌入 count 筆訂單，回傳訂單編號"""
+        order_ids = [format_order_id(SEED_DAY, n) for n in range(1, count + 1)]
+        order = schemas.OrderCreate(**ORDER_PAYLOAD)
+        with self.session_factory() as db:
+            for start in range(0, count, SEED_BATCH_SIZE):
+                batch = order_ids[start:start + SEED_BATCH_SIZE]
+                crud.bulk_create_orders(db, [order] * len(batch), batch)
+        return order_ids
+
+    def install(self, app) -> None:
+        """將 app 的資料庫依賴替換為基準測試資料庫"""
+        def override_get_db():
+            with self.session_factory() as session:
+                yield session
+
+        async def override_get_async_db():
+            async with self.async_session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_async_sessionmaker] = lambda: self.async_session_factory
+        app.dependency_overrides[get_async_read_db] = override_get_async_db
+        app.dependency_overrides[get_async_read_sessionmaker] = lambda: self.async_session_factory
+
+    def dispose(self, app) -> None:
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+        asyncio.run(self.async_engine.dispose())
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    make_request: Callable[[httpx.AsyncClient, int], "asyncio.Future"],
+    requests: int,
+    concurrency: int,
+) -> ScenarioResult:
+    """以 concurrency 個並發工作者送出 requests 個請求，make_request(client, i) 回傳 httpx.Response"""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - start, concurrency)
+
+
+async def _run_all(app, order_ids: List[str], requests: int, concurrency: int, export_requests: int) -> List[ScenarioResult]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        results = [
+            await run_scenario(
+                client, "create",
+                lambda c, i: c.post("/orders/create_order", json=ORDER_PAYLOAD),
+                requests, concurrency,
+            ),
+            await run_scenario(
+                client, "get_by_id",
+                lambda c, i: c.get(f"/orders/get_order_by_id/{order_ids[i * 7919 % len(order_ids)]}"),
+                requests, concurrency,
+            ),
+            await run_scenario(
+                client, "list",
+                lambda c, i: c.get("/orders/get_all_orders", params={"pagination": "cursor", "limit": 50}),
+                requests, concurrency,
+            ),
+            # 每個請求轉換不同的訂單（PENDING -> CONFIRMED），不會因為重複轉換而被略過
+            await run_scenario(
+                client, "update_status",
+                lambda c, i: c.post("/orders/bulk_update_status", json={
+                    "order_ids": [order_ids[i % len(order_ids)]], "status": "CONFIRMED",
+                }),
+                min(requests, len(order_ids)), concurrency,
+            ),
+        ]
+
+        export = await run_scenario(
+            client, "export",
+            lambda c, i: c.get("/orders/export", params={"format": "ndjson"}),
+            export_requests, 1,
+        )
+        rows = len(order_ids) + requests  # 灌入的訂單加上 create 情境新建的訂單
+        export.extra["rows_per_s"] = round(rows / (export.mean_ms / 1000), 1) if export.mean_ms else 0.0
+        results.append(export)
+    return results
+
+
+def run_benchmarks(
+    app,
+    db_uri: str,
+    orders: int = 1000,
+    requests: int = 200,
+    concurrency: int = 10,
+    export_requests: int = 3,
+) -> Dict:
+    """建立資料庫、灌入訂單並執行所有情境，回傳可寫成 JSON 的結果"""
+    database = BenchmarkDatabase(db_uri)
+    try:
+        database.reset()
+        seed_start = time.perf_counter()
+        order_ids = database.seed(orders)
+        seed_duration = time.perf_counter() - seed_start
+        database.install(app)
+        results = asyncio.run(_run_all(app, order_ids, requests, concurrency, export_requests))
+    finally:
+        database.dispose(app)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(db_uri).get_backend_name(),
+            "cache_backend": os.getenv("ORDER_CACHE_BACKEND", "memory"),
+            "orders": orders,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed_s": round(seed_duration, 3),
+        },
+        "scenarios": [asdict(result) for result in results],
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results: Dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def compare_results(baseline: Dict, current: Dict) -> List[Dict]:
+    """逐情境比較吞吐量與延遲，change_pct 為相對基準的變化百分比（延遲為負、吞吐量為正表示變快）"""
+    baseline_by_name = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    rows = []
+    for scenario in current["scenarios"]:
+        before = baseline_by_name.get(scenario["name"])
+        if before is None:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p99_ms"):
+            old, new = before[metric], scenario[metric]
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append({"scenario": scenario["name"], "metric": metric, "baseline": old, "current": new, "change_pct": change})
+    return rows
@@ -0,0 +1,31 @@
+"""
+以極小的資料量執行一次基準測試，確認量測工具本身可以運作（實際量測請用 python -m tests.benchmarks）
+"""
+
+from app.main import app
+from tests.benchmarks.harness import compare_results, percentile, run_benchmarks
+
+SCENARIOS = ["create", "get_by_id", "list", "update_status", "export"]
+
+
+def test_percentile_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_run_benchmarks_smoke(tmp_path):
+    results = run_benchmarks(app, f"sqlite:///{tmp_path / 'bench.db'}", orders=30, requests=10, concurrency=3, export_requests=1)
+
+    assert results["meta"]["orders"] == 30
+    assert [scenario["name"] for scenario in results["scenarios"]] == SCENARIOS
+    for scenario in results["scenarios"]:
+        assert scenario["errors"] == 0
+        assert scenario["p50_ms"] <= scenario["p99_ms"]
+    assert results["scenarios"][-1]["extra"]["rows_per_s"] > 0
+
+    comparison = compare_results(results, results)
+    assert {row["change_pct"] for row in comparison} == {0.0}
@@ -0,0 +1,143 @@
+"""
+共用測試設定：以暫存的 SQLite 資料庫取代 Supabase，讓 orders 模組可以在本機測試
+"""
+
+import asyncio
+import os
+
+# app.core.database 在匯入時就會讀取設定，必須在匯入 app 之前提供資料庫位址
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, enable_sqlite_foreign_keys
+from app.core.metrics import instrument_engine
+from app.core.querylog import collect_budget_violations
+from app.common.deps import (
+    get_async_db,
+    get_async_read_db,
+    get_async_read_sessionmaker,
+    get_async_sessionmaker,
+    get_db,
+)
+from app.main import app
+from app.orders.cache import order_cache
+from app.orders.sequence import order_id_allocator
+from app.products.catalog import product_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_order_cache():
+    """每個測試使用新的資料庫，訂單編號會重複，快取不能跨測試保留"""
+    asyncio.run(order_cache.clear())
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_product_catalog():
+    """每個測試使用新的資料庫，目錄版本號會重複，快照不能跨測試保留"""
+    product_catalog.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_order_id_allocator():
+    """每個測試使用新的資料庫，序號表會重新開始，行程內預留的區段不能跨測試保留"""
+    order_id_allocator.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets():
+    """任何請求超出路由宣告的查詢預算（@query_budget）時讓測試失敗，及早發現逐筆查詢的 N+1 問題"""
+    with collect_budget_violations() as violations:
+        yield violations
+    if violations:
+        pytest.fail("查詢次數超出預算:\n" + "\n".join(
+            f"{v.method} {v.route}: {v.query_count} 條 SQL（預算 {v.budget}）" for v in violations
+        ))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def engine(db_path):
+    """每個測試使用獨立的 SQLite 檔案資料庫"""
+    test_engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    enable_sqlite_foreign_keys(test_engine)
+    instrument_engine(test_engine, "sync")
+    Base.metadata.create_all(bind=test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def async_session_factory(engine, db_path):
+    """與同步 engine 指向同一個 SQLite 檔案的非同步 session factory"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 30})
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine, "async")
+    yield async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    async_engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, async_session_factory):
+    """將 API 的資料庫依賴替換為測試資料庫"""
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: async_session_factory
+    # 測試只有一個資料庫，唯讀查詢也使用同一個
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_sessionmaker] = lambda: async_session_factory
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def order_payload():
+    return {
+        "customer_name": "王小明",
+        "phone": "0912345678",
+        "email": "xiao.ming@example.com",
+        "item": [
+            {"product_id": "cake001", "name": "草莓蛋糕", "quantity": 2, "price": 150},
+            {"product_id": "pudding002", "name": "焦糖布丁", "quantity": 1, "price": 80},
+        ],
+    }
@@ -0,0 +1,167 @@
+"""
+測試快取後端與訂單讀取快取
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.common.cache import MemoryCache, RedisCache, _encode_command, _read_reply
+from app.orders import crud, enums, models
+from app.orders.archive import archive_orders
+from app.orders.cache import get_cached_order, mark_orders_changed
+
+
+class FakeRedisServer:
+    """本機的 Redis 協定替身，只支援快取用到的指令"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                command = await _read_reply(reader)
+                writer.write(self.reply(command))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    def reply(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == b"GET":
+            value = self.data.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = sum(self.data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        if name == b"SCAN":
+            keys = [key for key in self.data if key.startswith(args[2].rstrip(b"*"))]
+            return b"*2\r\n$1\r\n0\r\n" + _encode_command(*keys)
+        return b"-ERR unknown command\r\n"
+
+
+class TestMemoryCache:
+    """MemoryCache 的測試"""
+
+    def test_get_set_delete(self):
+        async def run():
+            cache = MemoryCache()
+            await cache.set("a", b"1")
+            assert await cache.get("a") == b"1"
+            await cache.delete("a")
+            assert await cache.get("a") is None
+
+        asyncio.run(run())
+
+    def test_evicts_least_recently_used(self):
+        async def run():
+            cache = MemoryCache(maxsize=2)
+            await cache.set("a", b"1")
+            await cache.set("b", b"2")
+            await cache.get("a")
+            await cache.set("c", b"3")
+            assert await cache.get("b") is None
+            assert await cache.get("a") == b"1"
+            assert len(cache) == 2
+
+        asyncio.run(run())
+
+    def test_entries_expire_after_ttl(self):
+        async def run():
+            cache = MemoryCache(ttl=0.01)
+            await cache.set("a", b"1")
+            time.sleep(0.02)
+            assert await cache.get("a") is None
+
+        asyncio.run(run())
+
+
+class TestRedisCache:
+    """RedisCache 透過 Redis 協定替身的測試"""
+
+    def test_round_trip_against_stand_in_server(self):
+        async def run():
+            fake = FakeRedisServer()
+            server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            cache = RedisCache(url=f"redis://127.0.0.1:{port}/0", ttl=5)
+            try:
+                await cache.set("order:1", b'{"id":"1"}')
+                assert await cache.get("order:1") == b'{"id":"1"}'
+                assert fake.data == {b"tamago:order:1": b'{"id":"1"}'}
+                await cache.delete("order:1")
+                assert await cache.get("order:1") is None
+                await cache.set("order:2", b"2")
+                await cache.clear()
+                assert fake.data == {}
+            finally:
+                server.close()
+
+        asyncio.run(run())
+
+    def test_unreachable_server_is_a_cache_miss(self):
+        async def run():
+            cache = RedisCache(url="redis://127.0.0.1:1/0")
+            assert await cache.get("order:1") is None
+            await cache.set("order:1", b"1")
+
+        asyncio.run(run())
+
+
+class TestOrderReadCache:
+    """GET /orders/get_order_by_id 的快取與寫入失效"""
+
+    def test_reads_are_served_from_cache_until_write(self, client, db, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+
+        # 繞過 API 直接修改資料庫：快取仍回傳原本的資料
+        db.get(models.Order, order_id).customer_name = "直接修改"
+        db.commit()
+        cached = client.get(f"/orders/get_order_by_id/{order_id}").json()["data"]
+        assert cached["customer_name"] == order_payload["customer_name"]
+
+        # 透過 API 寫入後快取失效
+        order_payload["customer_name"] = "陳大文"
+        client.post(f"/orders/update_order_by_id/{order_id}", json=order_payload)
+        fresh = client.get(f"/orders/get_order_by_id/{order_id}").json()["data"]
+        assert fresh["customer_name"] == "陳大文"
+
+    def test_delete_invalidates_cache(self, client, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+        client.get(f"/orders/get_order_by_id/{order_id}")
+
+        client.post(f"/orders/delete_order_by_id/{order_id}")
+
+        assert client.get(f"/orders/get_order_by_id/{order_id}").status_code == 404
+
+    def test_sync_crud_writes_invalidate_cache(self, client, db, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+
+        # 不經過 async_crud 的同步寫入在 commit 後也讓快取失效
+        crud.update_order_status(db, order_id, enums.OrderStatus.CONFIRMED)
+
+        assert client.get(f"/orders/get_order_by_id/{order_id}").json()["data"]["status"] == "CONFIRMED"
+
+    def test_rolled_back_write_keeps_cache(self, client, db, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+
+        mark_orders_changed(db, [order_id])
+        db.rollback()
+
+        assert asyncio.run(get_cached_order(order_id)) is not None
+
+    def test_archive_invalidates_archived_orders(self, client, db, tmp_path, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+        db.execute(update(models.Order).values(status=enums.OrderStatus.DELIVERED))
+        db.commit()
+        assert asyncio.run(get_cached_order(order_id)) is not None
+
+        archive_orders(db, tmp_path, datetime.now(timezone.utc) + timedelta(days=1))
+
+        assert client.get(f"/orders/get_order_by_id/{order_id}").status_code == 404
@@ -0,0 +1,176 @@
+"""
+測試建立訂單的 Idempotency-Key 與過期 key 的批次清除
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.common.exceptions import BadRequestException, ConflictException, DatabaseException
+from app.idempotency import crud, models
+from app.orders import async_crud as order_crud
+from app.orders.models import Order
+
+
+def _order_count(db):
+    return db.scalar(select(func.count()).select_from(Order))
+
+
+class TestCreateOrderIdempotency:
+    """POST /orders/create_order 的 Idempotency-Key 標頭"""
+
+    def test_replay_returns_stored_response_without_creating_order(self, client, db, order_payload):
+        headers = {"Idempotency-Key": "retry-1"}
+        first = client.post("/orders/create_order", json=order_payload, headers=headers)
+        second = client.post("/orders/create_order", json=order_payload, headers=headers)
+
+        assert first.status_code == second.status_code == 201
+        assert second.content == first.content
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert _order_count(db) == 1
+
+    def test_different_keys_create_separate_orders(self, client, db, order_payload):
+        for key in ("a", "b"):
+            assert client.post("/orders/create_order", json=order_payload, headers={"Idempotency-Key": key}).status_code == 201
+
+        assert _order_count(db) == 2
+
+    def test_same_key_with_different_body_is_rejected(self, client, db, order_payload):
+        headers = {"Idempotency-Key": "retry-1"}
+        client.post("/orders/create_order", json=order_payload, headers=headers)
+        order_payload["customer_name"] = "李大華"
+
+        response = client.post("/orders/create_order", json=order_payload, headers=headers)
+
+        assert response.status_code == 400
+        assert _order_count(db) == 1
+
+    def test_in_progress_key_returns_conflict(self, client, db, order_payload):
+        client.post("/orders/create_order", json=order_payload, headers={"Idempotency-Key": "retry-1"})
+        # 模擬第一次的請求仍在處理中
+        db.query(models.IdempotencyKey).update({"status_code": None, "response_body": None})
+        db.commit()
+
+        response = client.post("/orders/create_order", json=order_payload, headers={"Idempotency-Key": "retry-1"})
+
+        assert response.status_code == 409
+        assert response.json()["error"]["code"] == "CONFLICT"
+
+    def test_abandoned_key_is_retried_after_lease(self, client, db, order_payload):
+        # 取得處理權的行程在建立訂單前結束，key 沒有完成也沒有釋放，租約已到期
+        now = datetime.now(timezone.utc)
+        db.execute(insert(models.IdempotencyKey).values(
+            key="create_order:retry-1", request_hash="h", locked_until=now - timedelta(seconds=1),
+            expires_at=now + timedelta(hours=24),
+        ))
+        db.commit()
+
+        response = client.post("/orders/create_order", json=order_payload, headers={"Idempotency-Key": "retry-1"})
+
+        assert response.status_code == 201
+        assert _order_count(db) == 1
+
+    def test_failed_creation_releases_key(self, client, db, order_payload, monkeypatch):
+        async def failing_create_order(*args):
+            raise DatabaseException("建立新訂單時發生錯誤")
+
+        monkeypatch.setattr(order_crud, "create_order", failing_create_order)
+        headers = {"Idempotency-Key": "retry-1"}
+        assert client.post("/orders/create_order", json=order_payload, headers=headers).status_code == 500
+        assert db.scalar(select(func.count()).select_from(models.IdempotencyKey)) == 0
+
+        # 釋放後可以用同一把 key 重試
+        monkeypatch.undo()
+        assert client.post("/orders/create_order", json=order_payload, headers=headers).status_code == 201
+
+    def test_without_header_is_not_stored(self, client, db, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+
+        assert db.scalar(select(func.count()).select_from(models.IdempotencyKey)) == 0
+
+
+class TestIdempotencyCrud:
+    """claim_key 與 evict_expired_keys"""
+
+    def test_claim_then_replay(self, db):
+        assert crud.claim_key(db, "k", "hash", 60) is None
+        crud.complete_key(db, "k", 201, b'{"ok":true}')
+
+        stored = crud.claim_key(db, "k", "hash", 60)
+
+        assert (stored.status_code, stored.response_body) == (201, b'{"ok":true}')
+
+    def test_claim_mismatched_hash(self, db):
+        crud.claim_key(db, "k", "hash", 60)
+        crud.complete_key(db, "k", 201, b"{}")
+
+        with pytest.raises(BadRequestException):
+            crud.claim_key(db, "k", "other", 60)
+
+    def test_claim_in_progress(self, db):
+        crud.claim_key(db, "k", "hash", 60)
+
+        with pytest.raises(ConflictException):
+            crud.claim_key(db, "k", "hash", 60)
+
+    def test_abandoned_claim_can_be_reclaimed_after_lease(self, db):
+        # 第一次的請求取得處理權後沒有完成（例如行程中途結束）
+        crud.claim_key(db, "k", "hash", 60, lock_seconds=-1)
+
+        assert crud.claim_key(db, "k", "hash", 60) is None
+        crud.complete_key(db, "k", 201, b'{"ok":true}')
+        assert crud.claim_key(db, "k", "hash", 60).status_code == 201
+
+    def test_completed_key_is_not_reclaimed_after_lease(self, db):
+        crud.claim_key(db, "k", "hash", 60, lock_seconds=-1)
+        crud.complete_key(db, "k", 201, b"{}")
+
+        assert crud.claim_key(db, "k", "hash", 60).status_code == 201
+
+    def test_timestamps_are_timezone_aware(self, db):
+        crud.claim_key(db, "k", "hash", 60)
+
+        row = db.get(models.IdempotencyKey, "k")
+        db.refresh(row)
+        now = datetime.now(timezone.utc)
+        assert now < row.locked_until < row.expires_at <= now + timedelta(seconds=60)
+
+    def test_expired_key_can_be_reclaimed(self, db):
+        crud.claim_key(db, "k", "hash", -1)
+        crud.complete_key(db, "k", 201, b"{}")
+
+        assert crud.claim_key(db, "k", "other", 60) is None
+        row = db.get(models.IdempotencyKey, "k")
+        db.refresh(row)
+        assert (row.request_hash, row.status_code) == ("other", None)
+
+    def test_evict_expired_keys_in_batches(self, db):
+        now = datetime.now(timezone.utc)
+        db.execute(insert(models.IdempotencyKey), [
+            {"key": f"old-{n}", "request_hash": "h", "expires_at": now - timedelta(seconds=1)} for n in range(5)
+        ] + [
+            {"key": "live", "request_hash": "h", "expires_at": now + timedelta(hours=1)},
+        ])
+        db.commit()
+
+        assert crud.evict_expired_keys(db, batch_size=2) == 5
+        assert db.scalars(select(models.IdempotencyKey.key)).all() == ["live"]
+
+
+def test_add_locked_until_column(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from app.idempotency.migrations import add_locked_until_column
+
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE idempotency_keys (key VARCHAR PRIMARY KEY, request_hash VARCHAR(64) NOT NULL, "
+            "status_code INTEGER, response_body BLOB, expires_at DATETIME NOT NULL)"
+        ))
+
+    assert add_locked_until_column(old_engine) is True
+    assert add_locked_until_column(old_engine) is False
+    assert "locked_until" in {column["name"] for column in inspect(old_engine).get_columns("idempotency_keys")}
+    old_engine.dispose()
@@ -0,0 +1,199 @@
+"""
+測試庫存管理與下單時的庫存保留
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select
+
+from app.common.exceptions import BadRequestException, ConflictException
+from app.inventory import crud as inventory
+from app.orders import crud, enums, models, schemas
+
+ORDER_ID = "ORD-20250101-0001"
+
+
+def _stock(db, product_id):
+    db.expire_all()
+    return inventory.get_stock(db, product_id).quantity
+
+
+def _order_count(db):
+    return db.scalar(select(func.count()).select_from(models.Order))
+
+
+class TestStockReservation:
+    """訂單寫入在同一個交易中保留、歸還庫存"""
+
+    @pytest.fixture(autouse=True)
+    def stock(self, db):
+        inventory.set_stock(db, "cake001", 5)
+
+    def test_create_order_reserves_stock(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+        # pudding002 沒有庫存資料，不限量
+        assert _stock(db, "cake001") == 3
+
+    def test_insufficient_stock_rolls_back_order(self, db, order_payload):
+        inventory.set_stock(db, "pudding002", 1)
+        order_payload["item"][0]["quantity"] = 6
+
+        with pytest.raises(ConflictException, match="cake001"):
+            crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+        assert _order_count(db) == 0
+        assert (_stock(db, "cake001"), _stock(db, "pudding002")) == (5, 1)
+
+    def test_bulk_create_reserves_per_order(self, db, order_payload):
+        orders = [schemas.OrderCreate(**order_payload)] * 3
+
+        created, rejected = crud.bulk_create_orders(db, orders, [f"ORD-20250101-000{n}" for n in range(3)])
+
+        # 前兩筆各保留 2 個，第三筆只剩 1 個不足
+        assert [order.id for order in created] == ["ORD-20250101-0000", "ORD-20250101-0001"]
+        assert list(rejected) == [2]
+        assert "cake001（剩餘 1，需要 2）" in rejected[2]
+        assert _order_count(db) == 2
+        assert _stock(db, "cake001") == 1
+
+    def test_cancel_releases_stock_once(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+        crud.bulk_update_order_status(db, [ORDER_ID], enums.OrderStatus.CANCELLED)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CANCELLED)
+
+        assert _stock(db, "cake001") == 5
+
+    def test_cancelled_order_cannot_reopen_and_release_again(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CANCELLED)
+
+        with pytest.raises(BadRequestException):
+            crud.update_order_status(db, ORDER_ID, enums.OrderStatus.PENDING)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CANCELLED)
+
+        assert _stock(db, "cake001") == 5
+
+    def test_shipped_order_cannot_be_cancelled(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.SHIPPED)
+
+        with pytest.raises(BadRequestException):
+            crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CANCELLED)
+
+        assert _stock(db, "cake001") == 3
+        assert crud.get_order_by_id(db, ORDER_ID).status == enums.OrderStatus.SHIPPED
+
+    def test_return_releases_stock(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.SHIPPED)
+
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.RETURNED)
+
+        assert _stock(db, "cake001") == 5
+
+    def test_update_items_applies_difference(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        order_payload["item"][0]["quantity"] = 5
+
+        crud.update_order_by_id(db, ORDER_ID, schemas.OrderCreate(**order_payload))
+        assert _stock(db, "cake001") == 0
+
+        order_payload["item"][0]["quantity"] = 6
+        with pytest.raises(ConflictException):
+            crud.update_order_by_id(db, ORDER_ID, schemas.OrderCreate(**order_payload))
+
+    def test_delete_pending_order_releases_stock(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+        crud.delete_order_by_id(db, ORDER_ID)
+
+        assert _stock(db, "cake001") == 5
+
+    def test_delete_delivered_order_keeps_stock(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.SHIPPED)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.DELIVERED)
+
+        crud.delete_order_by_id(db, ORDER_ID)
+
+        # 已出貨的商品不會回到庫存
+        assert _stock(db, "cake001") == 3
+
+    def test_update_items_of_shipped_order_keeps_stock(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.SHIPPED)
+        order_payload["item"][0]["quantity"] = 1
+
+        crud.update_order_by_id(db, ORDER_ID, schemas.OrderCreate(**order_payload))
+
+        assert _stock(db, "cake001") == 3
+
+    def test_concurrent_checkouts_never_oversell(self, db, session_factory, order_payload):
+        order_payload["item"] = [{"product_id": "cake001", "name": "草莓蛋糕", "quantity": 1, "price": 150}]
+
+        def checkout(n):
+            with session_factory() as session:
+                try:
+                    crud.create_order(session, schemas.OrderCreate(**order_payload), f"ORD-20250101-{n:04d}")
+                    return True
+                except ConflictException:
+                    return False
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(checkout, range(40)))
+
+        assert results.count(True) == 5
+        assert _order_count(db) == 5
+        assert _stock(db, "cake001") == 0
+
+
+class TestInventoryApi:
+    """/inventory 路由"""
+
+    def test_set_get_and_adjust(self, client):
+        assert client.put("/inventory/cake001", json={"quantity": 3}).json()["data"]["quantity"] == 3
+        assert client.post("/inventory/cake001/adjust", json={"delta": 2}).json()["data"]["quantity"] == 5
+        assert client.get("/inventory/cake001").json()["data"]["quantity"] == 5
+        assert [stock["product_id"] for stock in client.get("/inventory").json()["data"]] == ["cake001"]
+
+    def test_adjust_below_zero_conflicts(self, client):
+        client.put("/inventory/cake001", json={"quantity": 1})
+
+        response = client.post("/inventory/cake001/adjust", json={"delta": -2})
+
+        assert response.status_code == 409
+        assert client.get("/inventory/cake001").json()["data"]["quantity"] == 1
+
+    def test_updated_at_is_timezone_aware(self, db):
+        inventory.set_stock(db, "cake001", 3)
+
+        assert _stock(db, "cake001") == 3
+        assert inventory.get_stock(db, "cake001").updated_at.tzinfo is not None
+
+    def test_untracked_product(self, client):
+        assert client.get("/inventory/cake001").status_code == 404
+        assert client.delete("/inventory/cake001").status_code == 404
+
+    def test_bulk_create_with_mixed_stock(self, client, order_payload):
+        client.put("/inventory/cake001", json={"quantity": 3})
+        large = dict(order_payload, item=[dict(order_payload["item"][0], quantity=3)])
+
+        response = client.post("/orders/bulk_create", json=[order_payload, large, order_payload])
+
+        assert response.status_code == 201
+        data = response.json()["data"]
+        assert (data["created"], data["failed"]) == (1, 2)
+        assert [result["success"] for result in data["results"]] == [True, False, False]
+        assert "cake001" in data["results"][1]["errors"][0]
+        assert client.get("/inventory/cake001").json()["data"]["quantity"] == 1
+
+    def test_checkout_out_of_stock_returns_conflict(self, client, order_payload):
+        client.put("/inventory/cake001", json={"quantity": 1})
+
+        response = client.post("/orders/create_order", json=order_payload)
+
+        assert response.status_code == 409
+        assert "cake001" in response.json()["error"]["message"]
@@ -0,0 +1,96 @@
+"""
+測試請求與資料庫查詢監控指標
+"""
+
+import re
+
+from sqlalchemy import text
+
+from app.core.metrics import (
+    POOL_CHECKOUT_WAIT,
+    REQUEST_DB_QUERIES,
+    REQUEST_DURATION,
+    REQUESTS_TOTAL,
+    Histogram,
+    RequestStats,
+    _request_stats,
+)
+
+ORDER_ROUTE = "/orders/get_order_by_id/{order_id}"
+
+
+class TestHistogram:
+    """Prometheus 文字格式輸出"""
+
+    def test_render_cumulative_buckets(self):
+        histogram = Histogram("test_seconds", "測試", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(3, "/a")
+
+        assert histogram.render() == [
+            "# HELP test_seconds 測試",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{route="/a",le="0.1"} 1',
+            'test_seconds_bucket{route="/a",le="1.0"} 2',
+            'test_seconds_bucket{route="/a",le="+Inf"} 3',
+            'test_seconds_sum{route="/a"} 3.55',
+            'test_seconds_count{route="/a"} 3',
+        ]
+
+
+class TestMetricsMiddleware:
+    """中介層與 engine 事件"""
+
+    def test_server_timing_header_counts_queries(self, client, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+
+        response = client.get(f"/orders/get_order_by_id/{order_id}")
+
+        timing = response.headers["server-timing"]
+        assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", pool;dur=[\d.]+', timing)
+
+    def test_route_template_labels(self, client, order_payload):
+        order_id = client.post("/orders/create_order", json=order_payload).json()["data"]["id"]
+        before = REQUEST_DURATION.count("GET", ORDER_ROUTE)
+        ok_before = REQUESTS_TOTAL.get("GET", ORDER_ROUTE, "200")
+        missing_before = REQUESTS_TOTAL.get("GET", ORDER_ROUTE, "404")
+
+        client.get(f"/orders/get_order_by_id/{order_id}")
+        client.get("/orders/get_order_by_id/missing")
+
+        assert REQUEST_DURATION.count("GET", ORDER_ROUTE) == before + 2
+        assert REQUESTS_TOTAL.get("GET", ORDER_ROUTE, "200") == ok_before + 1
+        assert REQUESTS_TOTAL.get("GET", ORDER_ROUTE, "404") == missing_before + 1
+
+    def test_queries_in_run_sync_are_attributed_to_request(self, client, order_payload):
+        before = REQUEST_DB_QUERIES.count("POST", "/orders/create_order")
+
+        response = client.post("/orders/create_order", json=order_payload)
+
+        assert REQUEST_DB_QUERIES.count("POST", "/orders/create_order") == before + 1
+        queries = int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+        assert queries >= 3  # 配發序號、寫入訂單與品項、更新報表彙總
+
+    def test_pool_checkout_is_measured(self, db):
+        stats = RequestStats()
+        before = POOL_CHECKOUT_WAIT.count("sync")
+        token = _request_stats.set(stats)
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            _request_stats.reset(token)
+
+        assert POOL_CHECKOUT_WAIT.count("sync") == before + 1
+        assert stats.query_count == 1
+        assert stats.pool_wait > 0
+
+    def test_metrics_endpoint(self, client):
+        client.get("/")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
@@ -0,0 +1,144 @@
+"""
+測試已結案舊訂單的冷資料封存
+"""
+
+import gzip
+import threading
+from datetime import datetime
+
+import orjson
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.orders import archive, crud, enums, models, schemas
+from app.orders.archive import archive_cutoff, archive_orders, archive_parts, iter_archived_orders, read_month
+from app.reports import models as report_models
+from app.reports.rollup import BUSINESS_TZ, rebuild_rollups
+
+CUTOFF = datetime(2025, 3, 1, tzinfo=BUSINESS_TZ)
+
+
+def _taipei(*args):
+    return datetime(*args, tzinfo=BUSINESS_TZ)
+
+
+@pytest.fixture
+def orders(db, order_payload):
+    """一月兩筆、二月一筆、三月一筆訂單，除了一月的第二筆都已送達"""
+    created = [
+        ("ORD-20250105-0001", _taipei(2025, 1, 5, 10), enums.OrderStatus.DELIVERED),
+        ("ORD-20250120-0001", _taipei(2025, 1, 20, 10), enums.OrderStatus.SHIPPED),
+        ("ORD-20250228-0001", _taipei(2025, 2, 28, 23, 59), enums.OrderStatus.DELIVERED),
+        # 台灣時間三月一日零時（UTC 仍是二月），不在封存範圍內
+        ("ORD-20250301-0001", _taipei(2025, 3, 1, 0), enums.OrderStatus.DELIVERED),
+    ]
+    for order_id, created_at, status in created:
+        crud.create_order(db, schemas.OrderCreate(**order_payload), order_id)
+        db.execute(update(models.Order).where(models.Order.id == order_id).values(created_at=created_at, status=status))
+    db.commit()
+    return created
+
+
+def _remaining(db):
+    return db.scalars(select(models.Order.id).order_by(models.Order.id)).all()
+
+
+class TestArchiveOrders:
+    """封存 cutoff 以前建立、已結案的訂單"""
+
+    def test_moves_closed_orders_into_monthly_files(self, db, tmp_path, orders):
+        assert archive_orders(db, tmp_path, CUTOFF) == 2
+
+        assert _remaining(db) == ["ORD-20250120-0001", "ORD-20250301-0001"]
+        assert db.scalar(select(func.count()).select_from(models.OrderItem)) == 4
+        [january] = read_month(tmp_path, "2025-01")
+        assert january["id"] == "ORD-20250105-0001"
+        assert january["status"] == "DELIVERED"
+        assert january["created_at"] == "2025-01-05T02:00:00+00:00"
+        assert january["item"][0]["product_id"] == "cake001"
+        # 2 × 150 + 1 × 80
+        assert january["total_amount"] == 380
+        assert [order["id"] for order in iter_archived_orders(tmp_path)] == ["ORD-20250105-0001", "ORD-20250228-0001"]
+
+    def test_later_runs_add_parts_to_existing_month(self, db, tmp_path, orders):
+        archive_orders(db, tmp_path, CUTOFF, batch_size=1)
+        db.execute(update(models.Order).where(models.Order.id == "ORD-20250120-0001").values(status=enums.OrderStatus.DELIVERED))
+        db.commit()
+
+        assert archive_orders(db, tmp_path, CUTOFF) == 1
+        assert len(archive_parts(tmp_path, "2025-01")) == 2
+        assert [order["id"] for order in read_month(tmp_path, "2025-01")] == ["ORD-20250105-0001", "ORD-20250120-0001"]
+
+    def test_concurrent_jobs_on_same_month_keep_all_orders(self, db, engine, tmp_path, orders, monkeypatch):
+        db.execute(update(models.Order).where(models.Order.id == "ORD-20250120-0001").values(status=enums.OrderStatus.DELIVERED))
+        db.commit()
+        # 工作 A 只封存一月五日的訂單，工作 B 封存整個一月；A 在 B 寫完並 commit 之後才寫檔
+        b_written = threading.Event()
+        write_part = archive._write_part
+
+        def interleaved_write_part(directory, month, rows):
+            if threading.current_thread().name == "job-a":
+                assert b_written.wait(timeout=10)
+            return write_part(directory, month, rows)
+
+        monkeypatch.setattr(archive, "_write_part", interleaved_write_part)
+        Session = sessionmaker(bind=engine)
+        counts = {}
+
+        def job(name, cutoff):
+            with Session() as session:
+                counts[name] = archive_orders(session, tmp_path, cutoff)
+            if name == "job-b":
+                b_written.set()
+
+        threads = [
+            threading.Thread(target=job, name="job-a", args=("job-a", _taipei(2025, 1, 10))),
+            threading.Thread(target=job, name="job-b", args=("job-b", _taipei(2025, 2, 1))),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        assert counts == {"job-a": 1, "job-b": 2}
+        assert len(archive_parts(tmp_path, "2025-01")) == 2
+        assert [order["id"] for order in read_month(tmp_path, "2025-01")] == ["ORD-20250105-0001", "ORD-20250120-0001"]
+        assert _remaining(db) == ["ORD-20250228-0001", "ORD-20250301-0001"]
+
+    def test_rollups_survive_archival_and_rebuild(self, db, tmp_path, orders):
+        def sales():
+            rows = db.scalars(select(report_models.DailySales).order_by(report_models.DailySales.day))
+            return [(row.order_count, row.revenue) for row in rows]
+
+        rebuild_rollups(db)
+        before = sales()
+        archive_orders(db, tmp_path, CUTOFF)
+
+        assert sales() == before
+        rebuild_rollups(db, iter_archived_orders(tmp_path))
+        assert sales() == before
+
+    def test_missing_directory_has_no_archived_orders(self, tmp_path):
+        assert list(iter_archived_orders(tmp_path / "missing")) == []
+
+    def test_legacy_parts_derive_total_amount_from_items(self, tmp_path):
+        items = [{"product_id": "cake001", "name": "草莓蛋糕", "quantity": 2, "price": 150}]
+        row = {
+            "id": "ORD-20250105-0001", "customer_name": "王小明", "phone": "0912345678", "email": "a@example.com",
+            "item": items, "created_at": "2025-01-05T02:00:00+00:00", "updated_at": None,
+            "status": "DELIVERED", "payment_status": "PAID",
+        }
+        legacy = {column: [row[column]] for column in row}
+        (tmp_path / "orders-2025-01-ORD-20250105-0001-0000.json.gz").write_bytes(gzip.compress(orjson.dumps(
+            {"format": archive.LEGACY_ARCHIVE_FORMAT, "month": "2025-01", "columns": legacy}
+        )))
+
+        [january] = read_month(tmp_path, "2025-01")
+
+        assert january["total_amount"] == 300
+
+
+def test_archive_cutoff_is_start_of_month():
+    assert archive_cutoff(12, _taipei(2025, 3, 15, 12)) == _taipei(2024, 3, 1)
+    assert archive_cutoff(3, _taipei(2025, 2, 1, 0, 30)) == _taipei(2024, 11, 1)
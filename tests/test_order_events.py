@@ -0,0 +1,165 @@
+"""
+測試訂單異動的 outbox 與即時事件推送
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from sqlalchemy import insert, select
+
+from app.common.exceptions import NotFoundException
+from app.orders import crud, enums, models, outbox, schemas
+from app.orders.events import OrderEventBroker, format_event, stream_order_events
+
+ORDER_ID = "ORD-20250101-0001"
+
+
+def _events(db):
+    return db.scalars(select(models.OrderEvent).order_by(models.OrderEvent.id)).all()
+
+
+def _run_with_engine(async_session_factory, coroutine):
+    """在同一個事件迴圈中執行測試並關閉 aiosqlite 連線，避免連線的背景執行緒留到迴圈結束之後"""
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await async_session_factory.kw["bind"].dispose()
+
+    return asyncio.run(run())
+
+
+async def _write(write, *args):
+    """在執行緒中寫入：SQLite 的寫入要等監聽者的讀取交易結束，不能卡住監聽者所在的事件迴圈"""
+    return await asyncio.to_thread(write, *args)
+
+
+class TestOutbox:
+    """orders 的寫入在同一個交易中附加事件"""
+
+    def test_writes_append_events(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.bulk_update_order_status(db, [ORDER_ID], enums.OrderStatus.CONFIRMED)
+        crud.update_payment_status(db, ORDER_ID, enums.PaymentStatus.PAID)
+        crud.delete_order_by_id(db, ORDER_ID)
+
+        events = _events(db)
+        assert [event.event_type for event in events] == [
+            enums.OrderEventType.CREATED,
+            enums.OrderEventType.STATUS_CHANGED,
+            enums.OrderEventType.PAYMENT_CHANGED,
+            enums.OrderEventType.DELETED,
+        ]
+        payload = orjson.loads(events[1].payload)
+        assert (payload["id"], payload["status"]) == (ORDER_ID, "CONFIRMED")
+
+    def test_failed_write_appends_nothing(self, db):
+        with pytest.raises(NotFoundException):
+            crud.update_order_status(db, "missing", enums.OrderStatus.SHIPPED)
+
+        assert _events(db) == []
+
+    def test_skipped_bulk_transition_appends_nothing(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.bulk_update_order_status(db, [ORDER_ID], enums.OrderStatus.DELIVERED)
+
+        assert len(_events(db)) == 1
+
+    def test_purge_in_batches(self, db):
+        now = datetime.now(timezone.utc)
+        db.execute(insert(models.OrderEvent), [
+            {"order_id": f"ORD-{n}", "event_type": enums.OrderEventType.CREATED, "payload": b"{}", "created_at": now - timedelta(days=10)}
+            for n in range(5)
+        ] + [{"order_id": "ORD-new", "event_type": enums.OrderEventType.CREATED, "payload": b"{}", "created_at": now}])
+        db.commit()
+
+        assert outbox.purge_order_events(db, now - timedelta(days=1), batch_size=2) == 5
+        assert [event.order_id for event in _events(db)] == ["ORD-new"]
+
+
+class TestOrderEventBroker:
+    """單一監聽者將新事件分送給所有訂閱者"""
+
+    def test_fan_out_to_subscribers(self, db, async_session_factory, order_payload):
+        broker = OrderEventBroker(async_session_factory, poll_interval=0.01)
+
+        async def run():
+            async with broker.subscribe() as first, broker.subscribe() as second:
+                await asyncio.sleep(0.05)  # 等監聽者讀到目前的事件編號
+                await _write(crud.create_order, db, schemas.OrderCreate(**order_payload), ORDER_ID)
+                return await asyncio.wait_for(first.get(), 5), await asyncio.wait_for(second.get(), 5)
+
+        first, second = _run_with_engine(async_session_factory, run())
+
+        assert first == second
+        event_id, frame = first
+        assert frame.startswith(b"id: %d\nevent: created\ndata: " % event_id)
+        assert broker._task is None  # 最後一個訂閱者離開後停止監聽
+
+    def test_slow_subscriber_is_disconnected(self, async_session_factory):
+        broker = OrderEventBroker(async_session_factory, queue_size=1)
+        event = models.OrderEvent(id=1, order_id=ORDER_ID, event_type=enums.OrderEventType.CREATED, payload=b"{}")
+        queue = asyncio.Queue(1)
+        broker._subscribers.add(queue)
+
+        broker.publish([event, event])
+
+        assert queue.get_nowait() == (None, b"")
+        assert queue not in broker._subscribers
+
+    def test_stream_replays_missed_events_then_goes_live(self, db, async_session_factory, order_payload):
+        for n in (1, 2):
+            crud.create_order(db, schemas.OrderCreate(**order_payload), f"ORD-20250101-000{n}")
+        first_id = _events(db)[0].id
+        broker = OrderEventBroker(async_session_factory, poll_interval=0.01)
+
+        async def run():
+            stream = stream_order_events(broker, async_session_factory, last_event_id=first_id)
+            try:
+                frames = [await stream.__anext__(), await stream.__anext__()]
+                await _write(crud.create_order, db, schemas.OrderCreate(**order_payload), "ORD-20250101-0003")
+                frames.append(await asyncio.wait_for(stream.__anext__(), 5))
+                return frames
+            finally:
+                await stream.aclose()
+
+        frames = _run_with_engine(async_session_factory, run())
+
+        events = _events(db)
+        assert frames == [b"retry: 3000\n\n", format_event(events[1]), format_event(events[2])]
+
+    def test_stream_resume_delivers_late_committed_lower_ids(self, db, async_session_factory, order_payload):
+        for n in (1, 2, 3):
+            crud.create_order(db, schemas.OrderCreate(**order_payload), f"ORD-20250101-000{n}")
+        first, late, replayed = _events(db)
+        late_frame = format_event(late)
+        # 模擬較小的編號較晚 commit：補查時還看不到 late，之後才由分送器送來
+        db.delete(late)
+        db.commit()
+        broker = OrderEventBroker(async_session_factory, poll_interval=60)
+
+        async def run():
+            stream = stream_order_events(broker, async_session_factory, last_event_id=first.id)
+            try:
+                frames = [await stream.__anext__(), await stream.__anext__()]
+                broker.publish([replayed, late])
+                frames.append(await asyncio.wait_for(stream.__anext__(), 5))
+                return frames
+            finally:
+                await stream.aclose()
+
+        frames = _run_with_engine(async_session_factory, run())
+
+        # replayed 已在補查時送出，不重複；late 的編號比補查到的最大編號小，仍要送出
+        assert frames == [b"retry: 3000\n\n", format_event(replayed), late_frame]
+
+    def test_low_water_mark(self, async_session_factory):
+        broker = OrderEventBroker(async_session_factory)
+        assert broker.low_water_mark() is None
+
+        broker._last_id = 10
+        assert broker.low_water_mark() == 11
+        broker._gaps = {7: 0.0, 9: 0.0}
+        assert broker.low_water_mark() == 7
@@ -0,0 +1,59 @@
+"""
+測試正規化的訂單品項明細（order_items）
+"""
+
+from sqlalchemy import func, select
+
+from app.orders import crud, models, schemas
+
+
+def _count_items(db):
+    return db.scalar(select(func.count()).select_from(models.OrderItem))
+
+
+class TestOrderItems:
+    """OrderItem 寫入、回填與彙總查詢的測試"""
+
+    def test_create_and_update_write_line_items(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), "ORD-20250101-0001")
+        assert _count_items(db) == 2
+
+        order_payload["item"] = [{"product_id": "cake001", "name": "草莓蛋糕", "quantity": 5, "price": 150}]
+        crud.update_order_by_id(db, "ORD-20250101-0001", schemas.OrderCreate(**order_payload))
+
+        items = db.scalars(select(models.OrderItem)).all()
+        assert [(item.product_id, item.quantity) for item in items] == [("cake001", 5)]
+
+    def test_delete_order_cascades_to_line_items(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), "ORD-20250101-0001")
+
+        crud.delete_order_by_id(db, "ORD-20250101-0001")
+
+        assert _count_items(db) == 0
+
+    def test_backfill_from_item_json(self, db, order_payload):
+        for n in range(3):
+            db.add(models.Order(
+                id=f"ORD-20240101-000{n}",
+                customer_name=order_payload["customer_name"],
+                phone=order_payload["phone"],
+                email=order_payload["email"],
+                item=order_payload["item"],
+            ))
+        db.commit()
+
+        assert crud.backfill_order_items(db, batch_size=2) == 3
+        assert _count_items(db) == 6
+        # 重複執行不會重複回填
+        assert crud.backfill_order_items(db) == 0
+
+    def test_product_sales_route(self, client, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+        client.post("/orders/create_order", json=order_payload)
+
+        response = client.get("/orders/product_sales", params={"product_id": "cake001"})
+
+        assert response.status_code == 200
+        assert response.json()["data"] == [
+            {"product_id": "cake001", "quantity": 4, "revenue": 600, "order_count": 2}
+        ]
@@ -0,0 +1,103 @@
+"""
+測試訂單編號配發器
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.orders import models
+from app.orders.sequence import OrderIdAllocator, format_order_id, order_day, sync_order_sequences
+
+
+def _today():
+    return order_day()
+
+
+def test_order_day_follows_business_timezone():
+    # UTC 前一天 20:00 已是台灣時間隔天 04:00
+    assert order_day(datetime(2025, 1, 1, 20, tzinfo=timezone.utc)) == "20250102"
+    assert order_day(datetime(2025, 1, 1, 15, 59, tzinfo=timezone.utc)) == "20250101"
+
+
+class TestOrderIdAllocator:
+    """OrderIdAllocator 的測試"""
+
+    def test_sequential_ids_keep_format(self, db):
+        """測試逐筆配發維持 ORD-YYYYMMDD-XXXX 格式且連續"""
+        allocator = OrderIdAllocator(in_transaction=True)
+        ids = [allocator.next_id(db) for _ in range(3)]
+        db.commit()
+
+        assert ids == [format_order_id(_today(), n) for n in (1, 2, 3)]
+
+    def test_rollback_releases_number(self, db):
+        """測試交易內模式下交易回滾時序號一併回滾（不跳號）"""
+        allocator = OrderIdAllocator(in_transaction=True)
+        allocator.next_id(db)
+        db.rollback()
+
+        assert allocator.next_id(db) == format_order_id(_today(), 1)
+
+    def test_block_mode_reserves_range_once(self, db):
+        """測試區段模式一次預留整段序號，之後在行程內配發"""
+        allocator = OrderIdAllocator(block_size=10)
+        ids = allocator.next_ids(db, 3) + [allocator.next_id(db)]
+
+        assert ids == [format_order_id(_today(), n) for n in (1, 2, 3, 4)]
+        sequence = db.get(models.OrderSequence, _today())
+        assert sequence.last_value == 10
+
+    def test_block_mode_does_not_hold_sequence_row_in_caller_transaction(self, db, session_factory):
+        """測試預設模式以獨立短交易預留序號：呼叫端交易尚未 commit 時，其他連線仍可配發"""
+        allocator = OrderIdAllocator()
+        first = allocator.next_id(db)
+
+        with session_factory() as other:
+            second = OrderIdAllocator().next_id(other)
+        db.rollback()
+
+        assert (first, second) == (format_order_id(_today(), 1), format_order_id(_today(), 2))
+        assert db.get(models.OrderSequence, _today()).last_value == 2
+
+    def test_concurrent_allocation_has_no_duplicates(self, session_factory):
+        """測試多執行緒、多個配發器同時配發時不會產生重複編號"""
+        allocators = [OrderIdAllocator(in_transaction=True), OrderIdAllocator(), OrderIdAllocator(block_size=7)]
+
+        def allocate(i):
+            allocator = allocators[i % len(allocators)]
+            with session_factory() as session:
+                order_id = allocator.next_id(session)
+                session.commit()
+                return order_id
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            ids = list(pool.map(allocate, range(300)))
+
+        assert len(set(ids)) == 300
+
+    def test_sync_order_sequences_continues_existing_orders(self, db, order_payload):
+        """測試升級時依既有訂單同步序號，避免與舊訂單編號衝突"""
+        day = _today()
+        db.add(models.Order(
+            id=format_order_id(day, 42),
+            customer_name=order_payload["customer_name"],
+            phone=order_payload["phone"],
+            email=order_payload["email"],
+            item=order_payload["item"],
+        ))
+        db.commit()
+
+        assert sync_order_sequences(db) == 1
+        assert OrderIdAllocator().next_id(db) == format_order_id(day, 43)
+
+
+class TestCreateOrderRoute:
+    """POST /orders/create_order 的測試"""
+
+    def test_create_order_assigns_sequential_ids(self, client, order_payload):
+        first = client.post("/orders/create_order", json=order_payload)
+        second = client.post("/orders/create_order", json=order_payload)
+
+        assert first.status_code == 201
+        assert first.json()["data"]["id"] == format_order_id(_today(), 1)
+        assert second.json()["data"]["id"] == format_order_id(_today(), 2)
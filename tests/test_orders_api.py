@@ -0,0 +1,369 @@
+"""
+測試 orders API 路由（透過非同步資料庫 session）
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+
+def _create(client, payload):
+    return client.post("/orders/create_order", json=payload).json()["data"]
+
+
+class TestOrdersApi:
+    """orders 路由的端對端測試"""
+
+    def test_get_order_by_id(self, client, order_payload):
+        order = _create(client, order_payload)
+
+        response = client.get(f"/orders/get_order_by_id/{order['id']}")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["customer_name"] == order_payload["customer_name"]
+
+    def test_get_missing_order_returns_404(self, client):
+        response = client.get("/orders/get_order_by_id/ORD-19990101-0001")
+
+        assert response.status_code == 404
+        assert response.json()["error"]["code"] == "NOT_FOUND"
+
+    def test_get_all_orders(self, client, order_payload):
+        for _ in range(3):
+            _create(client, order_payload)
+
+        response = client.get("/orders/get_all_orders", params={"limit": 2})
+
+        assert response.status_code == 200
+        assert len(response.json()["data"]) == 2
+
+    def test_update_order_by_id(self, client, order_payload):
+        order = _create(client, order_payload)
+        order_payload["customer_name"] = "陳大文"
+
+        response = client.post(f"/orders/update_order_by_id/{order['id']}", json=order_payload)
+
+        assert response.status_code == 200
+        assert response.json()["data"]["customer_name"] == "陳大文"
+
+    def test_delete_order_by_id(self, client, order_payload):
+        order = _create(client, order_payload)
+
+        response = client.post(f"/orders/delete_order_by_id/{order['id']}")
+
+        assert response.status_code == 200
+        assert client.get(f"/orders/get_order_by_id/{order['id']}").status_code == 404
+
+    def test_get_all_orders_cursor_pagination(self, client, order_payload):
+        created_ids = [_create(client, order_payload)["id"] for _ in range(5)]
+
+        seen_ids = []
+        params = {"pagination": "cursor", "limit": 2}
+        while True:
+            page = client.get("/orders/get_all_orders", params=params).json()["data"]
+            seen_ids.extend(order["id"] for order in page["items"])
+            if page["next_cursor"] is None:
+                break
+            params = {"cursor": page["next_cursor"], "limit": 2}
+
+        # 新到舊排序、不重複也不遺漏
+        assert seen_ids == list(reversed(created_ids))
+
+    def test_get_all_orders_rejects_invalid_cursor(self, client):
+        response = client.get("/orders/get_all_orders", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+    def test_export_orders_ndjson(self, client, order_payload):
+        created_ids = [_create(client, order_payload)["id"] for _ in range(3)]
+
+        response = client.get("/orders/export", params={"format": "ndjson"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == created_ids
+        assert lines[0]["item"] == order_payload["item"]
+
+    def test_export_orders_csv_has_one_line_per_item(self, client, order_payload):
+        _create(client, order_payload)
+        _create(client, order_payload)
+
+        response = client.get("/orders/export", params={"format": "csv"})
+
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert len(rows) == 4
+        assert rows[0]["product_id"] == "cake001"
+        assert rows[0]["subtotal"] == "300"
+
+    def test_export_orders_csv_keeps_orders_without_items(self, client, order_payload):
+        first_id = _create(client, order_payload)["id"]
+        empty_id = _create(client, dict(order_payload, item=[]))["id"]
+
+        response = client.get("/orders/export", params={"format": "csv"})
+
+        rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert [row["order_id"] for row in rows] == [first_id, first_id, empty_id]
+        assert rows[2]["customer_name"] == order_payload["customer_name"]
+        assert [rows[2][column] for column in ("product_id", "product_name", "quantity", "price", "subtotal")] == [""] * 5
+
+    def test_bulk_create_reports_per_item_results(self, client, order_payload):
+        invalid = dict(order_payload, email="not-an-email")
+
+        response = client.post("/orders/bulk_create", json=[order_payload, invalid, order_payload])
+
+        assert response.status_code == 201
+        data = response.json()["data"]
+        assert (data["created"], data["failed"]) == (2, 1)
+        assert [result["success"] for result in data["results"]] == [True, False, True]
+        assert data["results"][1]["errors"][0].startswith("email")
+
+        first_id = data["results"][0]["order"]["id"]
+        third_id = data["results"][2]["order"]["id"]
+        assert first_id.endswith("-0001") and third_id.endswith("-0002")
+        stored = client.get(f"/orders/get_order_by_id/{third_id}").json()["data"]
+        assert stored["item"] == order_payload["item"]
+        assert stored["status"] == "PENDING"
+
+    def test_bulk_create_writes_orders_and_items(self, client, engine, order_payload):
+        client.post("/orders/bulk_create", json=[order_payload] * 5)
+
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM orders").scalar() == 5
+            assert conn.exec_driver_sql("SELECT count(*) FROM order_items").scalar() == 10
+
+    def test_bulk_update_status_enforces_transitions(self, client, order_payload):
+        ids = [_create(client, order_payload)["id"] for _ in range(3)]
+        client.post("/orders/bulk_update_status", json={"order_ids": [ids[0]], "status": "CANCELLED"})
+
+        response = client.post(
+            "/orders/bulk_update_status",
+            json={"order_ids": ids + ["ORD-19990101-0001"], "status": "SHIPPED"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert sorted(order["id"] for order in data["updated"]) == ids[1:]
+        assert all(order["status"] == "SHIPPED" for order in data["updated"])
+        assert data["skipped"] == [
+            {"id": ids[0], "reason": "invalid_transition", "current": "CANCELLED"},
+            {"id": "ORD-19990101-0001", "reason": "not_found", "current": None},
+        ]
+        assert client.get(f"/orders/get_order_by_id/{ids[1]}").json()["data"]["status"] == "SHIPPED"
+
+    def test_bulk_update_payment_status(self, client, order_payload):
+        ids = [_create(client, order_payload)["id"] for _ in range(2)]
+
+        paid = client.post("/orders/bulk_update_payment_status", json={"order_ids": ids, "payment_status": "PAID"})
+        back = client.post("/orders/bulk_update_payment_status", json={"order_ids": ids, "payment_status": "UNPAID"})
+
+        assert len(paid.json()["data"]["updated"]) == 2
+        assert [order["reason"] for order in back.json()["data"]["skipped"]] == ["invalid_transition"] * 2
+
+
+class TestOrderSearch:
+    """依顧客姓名、電話、電子郵件搜尋訂單"""
+
+    @pytest.fixture
+    def customers(self, client, order_payload):
+        people = [
+            ("王小明", "0912345678", "xiao.ming@example.com"),
+            ("陳大文", "0987654321", "tai.man@example.com"),
+            ("王美麗", "0222223333", "mei_li@shop.tw"),
+        ]
+        return [
+            _create(client, {**order_payload, "customer_name": name, "phone": phone, "email": email})["id"]
+            for name, phone, email in people
+        ]
+
+    def _search(self, client, **params):
+        response = client.get("/orders/search", params=params)
+        assert response.status_code == 200
+        return [order["customer_name"] for order in response.json()["data"]]
+
+    def test_partial_name(self, client, customers):
+        assert self._search(client, q="王小明") == ["王小明"]
+        assert self._search(client, q="大文", field="name") == []
+        assert self._search(client, q="陳大文", field="name") == ["陳大文"]
+
+    def test_two_characters_match_prefix(self, client, customers):
+        # 2 個字取不出三連字，只比對開頭（走前綴索引）
+        assert self._search(client, q="王小") == ["王小明"]
+        assert self._search(client, q="小明", field="name") == []
+        assert self._search(client, q="ME", field="email") == ["王美麗"]
+        assert self._search(client, q="02", field="phone") == ["王美麗"]
+
+    def test_phone_ignores_separators(self, client, customers):
+        assert self._search(client, q="0987-654", field="phone") == ["陳大文"]
+        assert self._search(client, q="(02) 2222", field="phone") == ["王美麗"]
+
+    def test_stored_phone_separators_are_ignored(self, client, order_payload):
+        _create(client, {**order_payload, "customer_name": "林小華", "phone": "(02) 2345-6789"})
+
+        assert self._search(client, q="0223456", field="phone") == ["林小華"]
+        assert self._search(client, q="02-2345-67", field="phone") == ["林小華"]
+
+    def test_email_case_insensitive(self, client, customers):
+        assert self._search(client, q="EXAMPLE.COM", field="email") == ["陳大文", "王小明"]
+
+    def test_like_wildcards_are_literal(self, client, customers):
+        assert self._search(client, q="i_l", field="email") == ["王美麗"]
+        assert self._search(client, q="%@", field="email") == []
+
+    def test_field_restricts_columns(self, client, customers):
+        assert self._search(client, q="0912", field="email") == []
+        assert self._search(client, q="0912") == ["王小明"]
+
+    def test_query_too_short(self, client):
+        assert client.get("/orders/search", params={"q": "王"}).status_code == 422
+
+    def test_trigram_indexes_are_postgresql_only(self, engine):
+        from sqlalchemy import inspect
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateIndex
+
+        from app.orders.models import Order
+
+        indexes = {index.name: index for index in Order.__table__.indexes}
+        digits = "replace(replace(replace(replace(phone, ' ', ''), '-', ''), '(', ''), ')', '')"
+        assert str(CreateIndex(indexes["ix_orders_phone_digits_trgm"]).compile(dialect=postgresql.dialect())) == (
+            f"CREATE INDEX ix_orders_phone_digits_trgm ON orders USING gin ({digits} gin_trgm_ops)"
+        )
+        assert str(CreateIndex(indexes["ix_orders_customer_name_prefix"]).compile(dialect=postgresql.dialect())) == (
+            "CREATE INDEX ix_orders_customer_name_prefix ON orders (lower(customer_name) text_pattern_ops)"
+        )
+        created = {index["name"] for index in inspect(engine).get_indexes("orders")}
+        assert not created & {"ix_orders_phone_digits_trgm", "ix_orders_phone_digits_prefix", "ix_orders_customer_name_prefix"}
+
+
+class TestOrderChanges:
+    """/orders/changes 增量同步"""
+
+    @pytest.fixture(autouse=True)
+    def no_settle_delay(self, monkeypatch):
+        from app.orders import router
+
+        monkeypatch.setattr(router, "CHANGES_SETTLE_SECONDS", 0)
+
+    def _changes(self, client, **params):
+        response = client.get("/orders/changes", params=params)
+        assert response.status_code == 200
+        return response.json()["data"]
+
+    def test_full_sync_then_only_changes(self, client, order_payload):
+        first, second = _create(client, order_payload)["id"], _create(client, order_payload)["id"]
+        initial = self._changes(client)
+        assert [order["id"] for order in initial["orders"]] == [first, second]
+        assert initial["has_more"] is False
+
+        client.post("/orders/bulk_update_status", json={"order_ids": [first], "status": "CONFIRMED"})
+        client.post(f"/orders/delete_order_by_id/{second}")
+        changes = self._changes(client, since=initial["next_cursor"])
+
+        assert [(order["id"], order["status"]) for order in changes["orders"]] == [(first, "CONFIRMED")]
+        assert changes["deleted"] == [second]
+        assert self._changes(client, since=changes["next_cursor"]) == {
+            "orders": [], "deleted": [], "next_cursor": changes["next_cursor"], "has_more": False,
+        }
+
+    def test_pages_through_changes(self, client, order_payload):
+        ids = [_create(client, order_payload)["id"] for _ in range(3)]
+
+        page = self._changes(client, limit=2)
+        rest = self._changes(client, since=page["next_cursor"], limit=2)
+
+        assert page["has_more"] is True
+        assert [order["id"] for order in page["orders"] + rest["orders"]] == ids
+        assert rest["has_more"] is False
+
+    def test_recent_writes_wait_for_settle_window(self, client, order_payload, monkeypatch):
+        from app.orders import router
+
+        _create(client, order_payload)
+        monkeypatch.setattr(router, "CHANGES_SETTLE_SECONDS", 60)
+
+        assert self._changes(client)["orders"] == []
+
+    def test_invalid_cursor(self, client):
+        assert client.get("/orders/changes", params={"since": "not-a-cursor"}).status_code == 400
+
+
+class TestDateRangeFilters:
+    """date_start/date_end 為營業日（台灣時間），迄日當天全部包含在內"""
+
+    @pytest.fixture
+    def orders(self, client, engine, order_payload):
+        from sqlalchemy import update
+
+        from app.orders.models import Order
+        from app.reports.rollup import BUSINESS_TZ
+
+        created = {
+            "early": datetime(2025, 1, 5, 0, 0, tzinfo=BUSINESS_TZ),
+            "late": datetime(2025, 1, 5, 23, 59, tzinfo=BUSINESS_TZ),
+            "next_day": datetime(2025, 1, 6, 0, 0, tzinfo=BUSINESS_TZ),
+        }
+        ids = {name: _create(client, order_payload)["id"] for name in created}
+        with engine.begin() as conn:
+            for name, created_at in created.items():
+                conn.execute(update(Order).where(Order.id == ids[name]).values(created_at=created_at))
+        return ids
+
+    def _ids(self, client, **params):
+        response = client.get("/orders/get_all_orders", params=params)
+        assert response.status_code == 200
+        return {order["id"] for order in response.json()["data"]}
+
+    def test_end_date_is_inclusive(self, client, orders):
+        assert self._ids(client, date_start="2025-01-05", date_end="2025-01-05") == {orders["early"], orders["late"]}
+        assert self._ids(client, date_start="2025-01-06") == {orders["next_day"]}
+
+    def test_created_at_is_timezone_aware(self, client, orders):
+        listed = client.get("/orders/get_all_orders", params={"date_start": "2025-01-05", "date_end": "2025-01-05"}).json()["data"]
+
+        assert sorted(order["created_at"] for order in listed) == ["2025-01-04T16:00:00+00:00", "2025-01-05T15:59:00+00:00"]
+
+    def test_invalid_dates(self, client):
+        assert client.get("/orders/get_all_orders", params={"date_start": "2025-13-01"}).status_code == 422
+        response = client.get("/orders/export", params={"date_start": "2025-02-01", "date_end": "2025-01-01"})
+        assert response.status_code == 400
+
+
+class TestFieldProjection:
+    """fields= 與 view=summary 只回傳（並只查詢）需要的欄位"""
+
+    def test_summary_view(self, client, order_payload):
+        order = _create(client, order_payload)
+
+        [summary] = client.get("/orders/get_all_orders", params={"view": "summary"}).json()["data"]
+
+        assert list(summary) == ["id", "customer_name", "status", "total_amount", "created_at"]
+        assert (summary["id"], summary["total_amount"]) == (order["id"], 380)
+
+    def test_fields_with_cursor_pagination(self, client, order_payload):
+        ids = [_create(client, order_payload)["id"] for _ in range(3)]
+
+        page = client.get("/orders/get_all_orders", params={"pagination": "cursor", "limit": 2, "fields": "status,id,status"}).json()["data"]
+        rest = client.get("/orders/get_all_orders", params={"cursor": page["next_cursor"], "fields": "status,id"}).json()["data"]
+
+        assert page["items"][0] == {"status": "PENDING", "id": ids[2]}
+        assert [order["id"] for order in page["items"] + rest["items"]] == ids[::-1]
+
+    def test_unknown_field(self, client):
+        response = client.get("/orders/get_all_orders", params={"fields": "id,secret"})
+
+        assert response.status_code == 400
+        assert "secret" in response.json()["error"]["message"]
+
+    def test_total_amount_follows_item_updates(self, client, order_payload):
+        order = _create(client, order_payload)
+        order_payload["item"] = order_payload["item"][:1]
+
+        client.post(f"/orders/update_order_by_id/{order['id']}", json=order_payload)
+
+        [summary] = client.get("/orders/get_all_orders", params={"fields": "total_amount"}).json()["data"]
+        assert summary == {"total_amount": 300}
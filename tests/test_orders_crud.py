@@ -0,0 +1,147 @@
+"""
+測試 orders CRUD 寫入路徑的資料庫往返次數
+"""
+
+import re
+
+import pytest
+
+from app.common.exceptions import NotFoundException
+from app.core.querylog import count_queries
+from app.orders import crud, enums, schemas
+
+ORDER_ID = "ORD-20250101-0001"
+
+
+@pytest.fixture
+def order(db, order_payload):
+    return crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+
+def _orders_statements(statements):
+    """讀寫 orders 資料表的語句（不含品項明細、報表、outbox 等其他資料表）"""
+    return [statement for statement in statements if re.search(r"\borders\b", statement)]
+
+
+class TestSingleStatementWrites:
+    """單筆寫入以一次 UPDATE/DELETE ... RETURNING 完成"""
+
+    def test_update_order_status_statement_budget(self, db, engine, order):
+        with count_queries(engine) as statements:
+            updated = crud.update_order_status(db, ORDER_ID, enums.OrderStatus.SHIPPED)
+
+        # UPDATE orders 之外只有一條報表狀態計數的 upsert 與一條 outbox 事件
+        assert len(statements) == 3
+        assert _orders_statements(statements) == [statements[0]]
+        assert statements[0].startswith("UPDATE orders")
+        assert statements[1].startswith("INSERT INTO report_daily_status_counts")
+        assert statements[2].startswith("INSERT INTO order_events")
+        assert updated.status == enums.OrderStatus.SHIPPED
+
+    def test_update_payment_status_statement_budget(self, db, engine, order):
+        with count_queries(engine) as statements:
+            updated = crud.update_payment_status(db, ORDER_ID, enums.PaymentStatus.PAID)
+
+        # UPDATE orders 與 outbox 事件
+        assert len(statements) == 2
+        assert _orders_statements(statements) == [statements[0]]
+        assert statements[0].startswith("UPDATE orders")
+        assert updated.payment_status == enums.PaymentStatus.PAID
+
+    def test_update_order_by_id_skips_select_and_refresh(self, db, engine, order, order_payload):
+        order_payload["customer_name"] = "陳大文"
+        with count_queries(engine) as statements:
+            updated = crud.update_order_by_id(db, ORDER_ID, schemas.OrderCreate(**order_payload))
+
+        # UPDATE orders、DELETE 舊品項明細、INSERT 新品項明細、outbox 事件；品項沒變，報表彙總差額為零不需寫入
+        assert [statement.split()[0] for statement in statements] == ["UPDATE", "DELETE", "INSERT", "INSERT"]
+        assert updated.customer_name == "陳大文"
+
+    def test_delete_order_statement_budget(self, db, engine, order):
+        with count_queries(engine) as statements:
+            deleted = crud.delete_order_by_id(db, ORDER_ID)
+
+        # DELETE orders 之外是兩張報表彙總表的 upsert、歸還庫存、outbox 事件與刪除紀錄
+        assert len(statements) == 6
+        assert _orders_statements(statements) == [statements[0]]
+        assert statements[0].startswith("DELETE FROM orders")
+        assert deleted.id == ORDER_ID
+
+    @pytest.mark.parametrize("write", [
+        lambda db: crud.update_order_status(db, "missing", enums.OrderStatus.SHIPPED),
+        lambda db: crud.update_payment_status(db, "missing", enums.PaymentStatus.PAID),
+        lambda db: crud.delete_order_by_id(db, "missing"),
+    ])
+    def test_missing_order_raises_not_found(self, db, write):
+        with pytest.raises(NotFoundException):
+            write(db)
+
+
+class TestUpdatedAtMigration:
+    """既有的 orders 資料表補上 updated_at 欄位"""
+
+    def test_adds_and_backfills_column(self, tmp_path):
+        from sqlalchemy import create_engine, text
+        from app.orders.migrations import add_updated_at_column
+
+        old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with old_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE orders (id VARCHAR PRIMARY KEY, created_at DATETIME)"))
+            conn.execute(text("INSERT INTO orders VALUES ('ORD-20250101-0001', '2025-01-01 10:00:00.000000')"))
+
+        assert add_updated_at_column(old_engine) is True
+        assert add_updated_at_column(old_engine) is False
+        with old_engine.connect() as conn:
+            assert conn.execute(text("SELECT updated_at FROM orders")).scalar() == "2025-01-01 02:00:00"
+        old_engine.dispose()
+
+
+class TestCreatedAtMigration:
+    """既有 orders 資料表補上 total_amount，created_at 轉為 UTC 並改由資料庫填入"""
+
+    def test_rebuilds_sqlite_table(self, tmp_path):
+        from sqlalchemy import create_engine, inspect, text
+        from app.core.database import enable_sqlite_foreign_keys
+        from app.orders.migrations import add_total_amount_column, convert_created_at_to_utc
+
+        old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        enable_sqlite_foreign_keys(old_engine)
+        with old_engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE orders (id VARCHAR PRIMARY KEY, customer_name VARCHAR NOT NULL, phone VARCHAR NOT NULL, "
+                "email VARCHAR NOT NULL, item JSON NOT NULL, created_at DATETIME, status VARCHAR(9), "
+                "payment_status VARCHAR(8), updated_at DATETIME NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id VARCHAR NOT NULL REFERENCES orders (id) ON DELETE CASCADE, "
+                "product_id VARCHAR NOT NULL, name VARCHAR NOT NULL, quantity INTEGER NOT NULL, price INTEGER NOT NULL)"
+            ))
+            conn.execute(text(
+                "INSERT INTO orders VALUES ('ORD-20250101-0001', '王小明', '0912345678', 'a@example.com', "
+                "'[{\"product_id\": \"cake001\", \"name\": \"草莓蛋糕\", \"quantity\": 2, \"price\": 150}]', "
+                "'2025-01-01 10:00:00.000000', 'PENDING', 'UNPAID', '2025-01-01 02:00:00.000000')"
+            ))
+            conn.execute(text("INSERT INTO order_items VALUES (1, 'ORD-20250101-0001', 'cake001', '草莓蛋糕', 1, 150)"))
+
+        assert add_total_amount_column(old_engine) is True
+        assert add_total_amount_column(old_engine) is False
+        assert convert_created_at_to_utc(old_engine) is True
+        assert convert_created_at_to_utc(old_engine) is False
+        with old_engine.begin() as conn:
+            assert conn.execute(text("SELECT created_at, total_amount FROM orders")).one() == ("2025-01-01 02:00:00.000000", 300)
+            assert conn.execute(text("SELECT count(*) FROM order_items")).scalar() == 1
+            conn.execute(text(
+                "INSERT INTO orders (id, customer_name, phone, email, item, updated_at) "
+                "VALUES ('ORD-20250101-0002', '陳大文', '0987654321', 'b@example.com', '[]', '2025-01-01 00:00:00')"
+            ))
+            assert conn.execute(text("SELECT created_at FROM orders WHERE id = 'ORD-20250101-0002'")).scalar() is not None
+        assert "ix_orders_created_at_id" in {index["name"] for index in inspect(old_engine).get_indexes("orders")}
+        old_engine.dispose()
+
+
+def test_projection_does_not_select_item(db, engine, order):
+    with count_queries(engine) as statements:
+        [row] = crud.get_all_orders(db, columns=["id", "total_amount"])
+
+    assert tuple(row) == (ORDER_ID, 380)
+    assert "item" not in statements[0].split("FROM")[0]
@@ -0,0 +1,131 @@
+"""
+測試商品目錄與下單時以目錄填入品項的名稱與單價
+"""
+
+import pytest
+
+from app.core.querylog import count_queries
+from app.products import crud, schemas
+from app.products.catalog import ProductCatalog
+
+
+@pytest.fixture
+def catalog(client):
+    for product in (
+        {"id": "cake001", "name": "草莓蛋糕", "price": 160},
+        {"id": "pudding002", "name": "焦糖布丁", "price": 85},
+    ):
+        assert client.post("/products", json=product).status_code == 201
+
+
+class TestProductsApi:
+    """/products 路由"""
+
+    def test_create_get_and_list(self, client, catalog):
+        assert client.get("/products/cake001").json()["data"]["price"] == 160
+        assert [product["id"] for product in client.get("/products").json()["data"]] == ["cake001", "pudding002"]
+
+    def test_duplicate_id_conflicts(self, client, catalog):
+        response = client.post("/products", json={"id": "cake001", "name": "重複", "price": 1})
+
+        assert response.status_code == 409
+        assert response.json()["error"]["code"] == "CONFLICT"
+
+    def test_deactivate_hides_from_default_list(self, client, catalog):
+        client.delete("/products/cake001")
+
+        assert [product["id"] for product in client.get("/products").json()["data"]] == ["pudding002"]
+        listed = client.get("/products", params={"include_inactive": True}).json()["data"]
+        assert [product["is_active"] for product in listed] == [False, True]
+
+    def test_updated_at_is_timezone_aware(self, db):
+        crud.create_product(db, schemas.ProductCreate(id="cake001", name="草莓蛋糕", price=160))
+        db.expire_all()
+
+        assert crud.get_product(db, "cake001").updated_at.tzinfo is not None
+
+    def test_update_missing_product(self, client):
+        assert client.patch("/products/missing", json={"price": 1}).status_code == 404
+
+
+class TestPriceResolution:
+    """下單時品項的名稱與單價以商品目錄為準"""
+
+    def test_create_order_ignores_client_prices(self, client, catalog, order_payload):
+        order_payload["item"][0].update(name="便宜蛋糕", price=1)
+        del order_payload["item"][1]["name"], order_payload["item"][1]["price"]
+
+        response = client.post("/orders/create_order", json=order_payload)
+
+        assert response.status_code == 201
+        assert response.json()["data"]["item"] == [
+            {"product_id": "cake001", "name": "草莓蛋糕", "quantity": 2, "price": 160},
+            {"product_id": "pudding002", "name": "焦糖布丁", "quantity": 1, "price": 85},
+        ]
+
+    def test_unknown_or_inactive_product_is_rejected(self, client, catalog, order_payload):
+        client.delete("/products/pudding002")
+        order_payload["item"].append({"product_id": "tart003", "quantity": 1})
+
+        response = client.post("/orders/create_order", json=order_payload)
+
+        assert response.status_code == 400
+        assert "pudding002, tart003" in response.json()["error"]["message"]
+
+    def test_price_change_applies_to_next_order(self, client, catalog, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+        client.patch("/products/cake001", json={"price": 200})
+
+        order = client.post("/orders/create_order", json=order_payload).json()["data"]
+
+        assert order["item"][0]["price"] == 200
+
+    def test_bulk_create_reports_unknown_products_per_order(self, client, catalog, order_payload):
+        unknown = dict(order_payload, item=[{"product_id": "tart003", "quantity": 1}])
+
+        data = client.post("/orders/bulk_create", json=[order_payload, unknown]).json()["data"]
+
+        assert [result["success"] for result in data["results"]] == [True, False]
+        assert "tart003" in data["results"][1]["errors"][0]
+        assert data["results"][0]["order"]["item"][1]["price"] == 85
+
+    def test_empty_catalog_requires_client_prices(self, client, order_payload):
+        assert client.post("/orders/create_order", json=order_payload).status_code == 201
+
+        del order_payload["item"][0]["price"]
+        assert client.post("/orders/create_order", json=order_payload).status_code == 400
+
+    def test_rejects_non_positive_quantity(self, client, order_payload):
+        order_payload["item"][0]["quantity"] = 0
+
+        assert client.post("/orders/create_order", json=order_payload).status_code == 422
+
+
+class TestCatalogSnapshot:
+    """行程內的目錄快照依版本號重新載入"""
+
+    def test_reuses_snapshot_within_check_interval(self, db, engine):
+        catalog = ProductCatalog(check_interval=60)
+        crud.create_product(db, schemas.ProductCreate(id="cake001", name="草莓蛋糕", price=160))
+
+        with count_queries(engine) as statements:
+            first = catalog.get(db)
+            second = catalog.get(db)
+
+        # 第一次讀版本號與整份目錄，之後在間隔內不查詢
+        assert len(statements) == 2
+        assert second is first and first.prices == {"cake001": ("草莓蛋糕", 160)}
+
+    def test_reloads_only_when_version_changes(self, db, engine):
+        catalog = ProductCatalog(check_interval=0)
+        crud.create_product(db, schemas.ProductCreate(id="cake001", name="草莓蛋糕", price=160))
+        first = catalog.get(db)
+
+        with count_queries(engine) as statements:
+            assert catalog.get(db) is first
+        assert len(statements) == 1
+
+        crud.update_product(db, "cake001", schemas.ProductUpdate(price=180))
+        second = catalog.get(db)
+        assert second.version == first.version + 1
+        assert second.prices["cake001"] == ("草莓蛋糕", 180)
@@ -0,0 +1,80 @@
+"""
+測試查詢預算與慢查詢記錄
+"""
+
+import logging
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.metrics import MetricsMiddleware
+from app.core.querylog import collect_budget_violations, log_slow_queries, query_budget
+
+
+@pytest.fixture
+def budget_client(engine):
+    """一個會執行兩條 SQL、但只宣告一條預算的路由"""
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    @query_budget(1)
+    async def read_item(item_id: str):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    test_app = FastAPI()
+    test_app.add_middleware(MetricsMiddleware)
+    test_app.include_router(router)
+    return TestClient(test_app)
+
+
+class TestQueryBudget:
+    """超出 @query_budget 的請求會被記錄"""
+
+    def test_violation_is_collected(self, budget_client, enforce_query_budgets):
+        with collect_budget_violations() as violations:
+            response = budget_client.get("/items/1")
+
+        assert response.status_code == 200
+        assert [(v.route, v.budget, v.query_count) for v in violations] == [("/items/{item_id}", 1, 2)]
+        # 這個違規是刻意製造的，不讓共用的預算檢查判定測試失敗
+        enforce_query_budgets.clear()
+
+    def test_create_order_with_many_items_stays_within_budget(self, client, order_payload):
+        # 品項明細若改回逐筆 INSERT，查詢數會隨品項數成長而超出預算
+        order_payload["item"] = [
+            {"product_id": f"p{n:03d}", "name": f"商品{n}", "quantity": 1, "price": 10} for n in range(30)
+        ]
+        with collect_budget_violations() as violations:
+            response = client.post("/orders/create_order", json=order_payload)
+
+        assert response.status_code == 201
+        assert violations == []
+
+    def test_all_order_routes_declare_a_budget(self):
+        from app.main import app
+
+        missing = [
+            route.path for route in app.routes
+            if route.path.startswith(("/orders", "/reports")) and not hasattr(route.endpoint, "query_budget")
+        ]
+        assert missing == []
+
+
+class TestSlowQueryLog:
+    """慢查詢連同執行計畫寫入日誌"""
+
+    def test_logs_statement_with_plan(self, engine, caplog):
+        log_slow_queries(engine, threshold_ms=0)
+
+        with caplog.at_level(logging.WARNING, logger="app.core.querylog"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT id FROM orders WHERE created_at > :start"), {"start": "2025-01-01"})
+
+        [record] = [r for r in caplog.records if "SELECT id FROM orders" in r.getMessage()]
+        assert "執行計畫" in record.getMessage()
+        assert "ix_orders_created_at_id" in record.getMessage()
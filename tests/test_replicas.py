@@ -0,0 +1,131 @@
+"""
+測試讀取副本路由
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.requests import Request
+
+from app.common import deps
+from app.core.replicas import READ_PRIMARY_COOKIE, ReadYourWritesMiddleware, ReplicaSet, read_primary_requested
+
+PRIMARY, REPLICA_A, REPLICA_B = "primary", "replica_a", "replica_b"
+
+
+def _request(cookies: str = "") -> Request:
+    headers = [(b"cookie", cookies.encode())] if cookies else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestReplicaSet:
+    """輪流分配、暫停失敗的副本與退回主資料庫"""
+
+    def test_round_robin_with_primary_last(self):
+        replicas = ReplicaSet(PRIMARY, [REPLICA_A, REPLICA_B])
+
+        picks = [replicas.pick() for _ in range(4)]
+
+        assert picks == [REPLICA_A, REPLICA_B, REPLICA_A, REPLICA_B]
+        assert replicas.candidates()[-1] == (None, PRIMARY)
+
+    def test_down_replica_is_skipped_until_retry(self):
+        replicas = ReplicaSet(PRIMARY, [REPLICA_A, REPLICA_B], retry_after=60)
+
+        replicas.mark_down(0)
+
+        assert [replicas.pick() for _ in range(3)] == [REPLICA_B] * 3
+        with patch("app.core.replicas.time.monotonic", return_value=time.monotonic() + 61):
+            assert REPLICA_A in [replicas.pick() for _ in range(2)]
+
+    def test_all_down_falls_back_to_primary(self):
+        replicas = ReplicaSet(PRIMARY, [REPLICA_A])
+        replicas.mark_down(0)
+
+        assert replicas.pick() == PRIMARY
+
+    def test_primary_only_and_no_replicas(self):
+        assert ReplicaSet(PRIMARY, [REPLICA_A]).pick(primary_only=True) == PRIMARY
+        assert ReplicaSet(PRIMARY, []).pick() == PRIMARY
+
+
+class TestReadYourWrites:
+    """寫入後的 cookie 讓讀取改走主資料庫"""
+
+    def test_cookie_expiry(self):
+        assert read_primary_requested({READ_PRIMARY_COOKIE: str(time.time() + 5)})
+        assert not read_primary_requested({READ_PRIMARY_COOKIE: str(time.time() - 1)})
+        assert not read_primary_requested({READ_PRIMARY_COOKIE: "garbage"})
+        assert not read_primary_requested({})
+
+    def test_middleware_sets_cookie_on_successful_write(self):
+        test_app = FastAPI()
+        test_app.add_middleware(ReadYourWritesMiddleware, replica_set=ReplicaSet(PRIMARY, [REPLICA_A]), window=5)
+        test_app.post("/write")(lambda: {"ok": True})
+        test_app.post("/fail", status_code=400)(lambda: {"ok": False})
+        test_app.get("/read")(lambda: {"ok": True})
+        client = TestClient(test_app)
+
+        assert READ_PRIMARY_COOKIE in client.post("/write").headers["set-cookie"]
+        assert "set-cookie" not in client.post("/fail").headers
+        assert "set-cookie" not in client.get("/read").headers
+
+    def test_middleware_is_inactive_without_replicas(self):
+        test_app = FastAPI()
+        test_app.add_middleware(ReadYourWritesMiddleware, replica_set=ReplicaSet(PRIMARY, []), window=5)
+        test_app.post("/write")(lambda: {"ok": True})
+
+        assert "set-cookie" not in TestClient(test_app).post("/write").headers
+
+
+class _UnreachableSession:
+    """連線時失敗的副本 session"""
+
+    async def connection(self):
+        raise OSError("connection refused")
+
+    async def close(self):
+        pass
+
+
+class TestGetAsyncReadDb:
+    """get_async_read_db 在副本無法連線時退回主資料庫"""
+
+    def test_unreachable_replica_falls_back_to_primary(self, async_session_factory):
+        replicas = ReplicaSet(async_session_factory, [_UnreachableSession])
+
+        async def run():
+            generator = deps.get_async_read_db(_request())
+            db = await generator.__anext__()
+            bind = db.bind
+            await generator.aclose()
+            await async_session_factory.kw["bind"].dispose()
+            return bind
+
+        with patch.object(deps, "replica_set", replicas):
+            bind = asyncio.run(run())
+
+        assert bind is async_session_factory.kw["bind"]
+        assert replicas.pick() is async_session_factory  # 失敗的副本已暫停使用
+
+    def test_recent_writer_reads_primary(self, async_session_factory):
+        replica = async_sessionmaker()
+        replicas = ReplicaSet(async_session_factory, [replica])
+
+        async def run():
+            generator = deps.get_async_read_db(_request(f"{READ_PRIMARY_COOKIE}={time.time() + 5}"))
+            db = await generator.__anext__()
+            result = (db.bind, db.info["read_primary"])
+            await generator.aclose()
+            await async_session_factory.kw["bind"].dispose()
+            return result
+
+        with patch.object(deps, "replica_set", replicas):
+            bind, read_primary = asyncio.run(run())
+
+        assert bind is async_session_factory.kw["bind"]
+        assert read_primary is True
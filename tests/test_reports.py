@@ -0,0 +1,151 @@
+"""
+測試報表彙總表的增量更新與 /reports 路由
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import event, select
+
+from app.orders import crud, enums, schemas
+from app.reports import models
+from app.reports.crud import get_daily_report
+from app.reports.rollup import business_day, rebuild_rollups
+
+ORDER_ID = "ORD-20250101-0001"
+
+
+def _product_rows(db):
+    rows = db.scalars(select(models.DailyProductSales).order_by(models.DailyProductSales.product_id))
+    return {row.product_id: (row.quantity, row.revenue) for row in rows}
+
+
+def _sales(db):
+    return [(row.order_count, row.revenue) for row in db.scalars(select(models.DailySales))]
+
+
+class TestRollupMaintenance:
+    """訂單寫入在同一個交易中更新彙總表"""
+
+    def test_create_order_adds_to_rollups(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+
+        assert _sales(db) == [(1, 380)]
+        assert _product_rows(db) == {"cake001": (2, 300), "pudding002": (1, 80)}
+        [report] = get_daily_report(db)
+        assert report.status_counts == {"PENDING": 1}
+
+    def test_bulk_create_merges_rows_per_day(self, db, order_payload):
+        orders = [schemas.OrderCreate(**order_payload)] * 3
+        crud.bulk_create_orders(db, orders, [f"ORD-20250101-000{n}" for n in range(3)])
+
+        assert _sales(db) == [(3, 1140)]
+        assert _product_rows(db) == {"cake001": (6, 900), "pudding002": (3, 240)}
+
+    def test_update_items_applies_difference(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        order_payload["item"] = [{"product_id": "cake001", "name": "草莓蛋糕", "quantity": 5, "price": 150}]
+
+        crud.update_order_by_id(db, ORDER_ID, schemas.OrderCreate(**order_payload))
+
+        assert _sales(db) == [(1, 750)]
+        assert _product_rows(db) == {"cake001": (5, 750), "pudding002": (0, 0)}
+
+    def test_delete_order_subtracts(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CANCELLED)
+
+        crud.delete_order_by_id(db, ORDER_ID)
+
+        assert _sales(db) == [(0, 0)]
+        # 狀態異動是歷史事件，刪除訂單不會扣除
+        [report] = get_daily_report(db)
+        assert report.status_counts == {"PENDING": 1, "CANCELLED": 1}
+
+    def test_status_changes_are_counted(self, db, order_payload):
+        ids = [f"ORD-20250101-000{n}" for n in range(3)]
+        crud.bulk_create_orders(db, [schemas.OrderCreate(**order_payload)] * 3, ids)
+        crud.update_order_status(db, ids[0], enums.OrderStatus.SHIPPED)
+        crud.update_order_status(db, ids[0], enums.OrderStatus.DELIVERED)
+
+        # ids[0] 已是 DELIVERED，不允許轉換為 CONFIRMED，不計入
+        crud.bulk_update_order_status(db, ids, enums.OrderStatus.CONFIRMED)
+
+        [report] = get_daily_report(db)
+        assert report.status_counts == {"PENDING": 3, "SHIPPED": 1, "DELIVERED": 1, "CONFIRMED": 2}
+
+    def test_repeated_status_is_not_counted(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CONFIRMED)
+
+        crud.update_order_status(db, ORDER_ID, enums.OrderStatus.CONFIRMED)
+        crud.bulk_update_order_status(db, [ORDER_ID], enums.OrderStatus.CONFIRMED)
+
+        [report] = get_daily_report(db)
+        assert report.status_counts == {"PENDING": 1, "CONFIRMED": 1}
+
+    def test_rebuild_matches_incremental(self, db, order_payload):
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+        order_payload["item"] = [{"product_id": "cake001", "name": "草莓蛋糕", "quantity": 1, "price": 150}]
+        crud.create_order(db, schemas.OrderCreate(**order_payload), "ORD-20250101-0002")
+        incremental = (_sales(db), _product_rows(db))
+
+        assert rebuild_rollups(db) == 1
+        assert (_sales(db), _product_rows(db)) == incremental
+
+
+def test_upserts_rows_in_key_order(db, engine, order_payload):
+    order_payload["item"].reverse()
+    parameters = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.startswith("INSERT INTO report_daily_product_sales"):
+            parameters.extend(params)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        crud.create_order(db, schemas.OrderCreate(**order_payload), ORDER_ID)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # 依 (day, product_id) 排序後寫入，所有交易以相同順序鎖定資料列
+    product_ids = [value for value in parameters if value in ("cake001", "pudding002")]
+    assert product_ids == ["cake001", "pudding002"]
+
+
+def test_business_day_uses_taiwan_time():
+    assert business_day(datetime(2025, 1, 1, 23, 30)) == date(2025, 1, 1)
+    assert business_day(datetime(2025, 1, 1, 16, 30, tzinfo=timezone.utc)) == date(2025, 1, 2)
+    assert business_day(datetime(2025, 1, 2, 0, 30, tzinfo=timezone(timedelta(hours=8)))) == date(2025, 1, 2)
+
+
+class TestReportRoutes:
+    """/reports 路由只讀取彙總表"""
+
+    def test_daily_report(self, client, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+        client.post("/orders/create_order", json=order_payload)
+        today = business_day().isoformat()
+
+        response = client.get("/reports/daily", params={"date_start": today, "date_end": today})
+
+        assert response.status_code == 200
+        assert response.json()["data"] == [
+            {"day": today, "order_count": 2, "revenue": 760, "status_counts": {"PENDING": 2}}
+        ]
+
+    def test_daily_report_outside_range_is_empty(self, client, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+
+        response = client.get("/reports/daily", params={"date_end": "2000-01-01"})
+
+        assert response.json()["data"] == []
+
+    def test_product_report_orders_by_revenue(self, client, order_payload):
+        client.post("/orders/create_order", json=order_payload)
+        order_payload["item"] = [{"product_id": "pudding002", "name": "焦糖布丁", "quantity": 10, "price": 80}]
+        client.post("/orders/create_order", json=order_payload)
+
+        response = client.get("/reports/products", params={"limit": 1})
+
+        assert response.status_code == 200
+        assert response.json()["data"] == [{"product_id": "pudding002", "quantity": 11, "revenue": 880}]
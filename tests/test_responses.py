@@ -0,0 +1,69 @@
+"""
+測試 orjson 快速回應與 FastAPI 預設編碼的輸出一致
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.common.responses import (
+    create_success_json_response,
+    create_success_raw_response,
+    create_success_response,
+)
+from app.orders import models, schemas
+from app.orders.enums import OrderStatus, PaymentStatus
+from app.orders.serializers import order_to_dict, order_to_json
+
+TIMESTAMP = "2025-01-01T12:00:00.123456"
+
+
+def _default_body(data, **kwargs):
+    """FastAPI 預設路徑：create_success_response -> jsonable_encoder -> JSONResponse"""
+    return JSONResponse(jsonable_encoder(create_success_response(data, timestamp=TIMESTAMP, **kwargs))).body
+
+
+@pytest.fixture(params=[
+    datetime(2025, 1, 1, 8, 30, 15, 250000),
+    datetime(2025, 1, 1, 8, 30, 15),
+    datetime(2025, 1, 1, 8, 30, 15, 1, tzinfo=timezone(timedelta(hours=8))),
+])
+def order(request, order_payload):
+    return models.Order(
+        id="ORD-20250101-0001",
+        customer_name=order_payload["customer_name"],
+        phone=order_payload["phone"],
+        email=order_payload["email"],
+        item=order_payload["item"],
+        created_at=request.param,
+        status=OrderStatus.SHIPPED,
+        payment_status=PaymentStatus.PAID,
+    )
+
+
+class TestFastResponses:
+    """快速回應與原本信封格式逐位元組相同"""
+
+    def test_order_serializer_matches_order_out(self, order):
+        expected = _default_body(schemas.OrderOut.model_validate(order).model_dump(), message="成功")
+        actual = create_success_json_response(order_to_dict(order), message="成功", timestamp=TIMESTAMP).body
+
+        assert actual == expected
+
+    def test_list_response_matches(self, order):
+        expected = _default_body([schemas.OrderOut.model_validate(order).model_dump()] * 3, status_code=201)
+        actual = create_success_json_response([order_to_dict(order)] * 3, status_code=201, timestamp=TIMESTAMP)
+
+        assert actual.body == expected
+        assert actual.status_code == 201
+
+    def test_raw_response_embeds_serialized_json(self, order):
+        expected = _default_body(schemas.OrderOut.model_validate(order).model_dump(), message="訂單")
+        actual = create_success_raw_response(order_to_json(order), message="訂單", timestamp=TIMESTAMP).body
+
+        assert actual == expected
+
+    def test_none_data(self):
+        assert create_success_json_response(None, timestamp=TIMESTAMP).body == _default_body(None)